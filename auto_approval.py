@@ -0,0 +1,118 @@
+import datetime
+import logging
+import random
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from sqlalchemy import select, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot import bot
+from broadcast import broadcast
+from config import MAX_CAR_PASSES, MAX_TRUCK_PASSES
+from db.models import TemporaryPass, Resident, Contractor
+from db.pass_index import refresh_plates
+from db.statistics import count_pass
+from db.util import get_active_admins_and_managers_tg_ids, get_active_admins_managers_sb_tg_ids
+from db.writer import submit_write
+from handlers.handlers_admin_user_management import admin_reply_keyboard
+from scheduler import job_handler, schedule_job
+
+AUTO_APPROVAL_JOB = 'auto_approve_temp_pass'
+# Через сколько секунд после подачи заявки проверяются лимиты
+AUTO_APPROVAL_DELAY = (180, 720)
+
+
+def is_auto_approvable(vehicle_type: str, weight_category: str = None, length_category: str = None) -> bool:
+    """Автоматически одобряются легковые и малые грузовые (легкие и короткие) машины"""
+    if vehicle_type == 'car':
+        return True
+    return vehicle_type == 'truck' and weight_category == 'light' and length_category == 'short'
+
+
+def schedule_auto_approval(session: AsyncSession, pass_id: int):
+    """Планирует проверку лимитов для заявки (в той же транзакции, что и сама заявка)"""
+    run_at = datetime.datetime.now() + datetime.timedelta(seconds=random.randint(*AUTO_APPROVAL_DELAY))
+    schedule_job(session, AUTO_APPROVAL_JOB, pass_id, run_at)
+
+
+@job_handler(AUTO_APPROVAL_JOB)
+async def evaluate_temp_pass_quota(pass_id: int):
+    """
+    Одобряет заявку на временный пропуск, если у владельца не превышен лимит
+    одобренных пропусков того же типа ТС на пересекающиеся даты.
+    Если заявку уже рассмотрели вручную, ничего не делает.
+    """
+    # Проверка лимита и одобрение - одной операцией писателя: между ними никто не пишет
+    async def evaluate(session):
+        temp_pass = await session.get(TemporaryPass, pass_id)
+        if not temp_pass or temp_pass.status != 'pending':
+            return None
+
+        if temp_pass.owner_type == 'resident':
+            owner = await session.get(Resident, temp_pass.resident_id)
+            owner_condition = TemporaryPass.resident_id == temp_pass.resident_id
+        else:
+            owner = await session.get(Contractor, temp_pass.contractor_id)
+            owner_condition = TemporaryPass.contractor_id == temp_pass.contractor_id
+        if not owner:
+            return None
+
+        count = await session.scalar(
+            select(func.count(TemporaryPass.id)).where(
+                owner_condition,
+                TemporaryPass.vehicle_type == temp_pass.vehicle_type,
+                TemporaryPass.status == 'approved',
+                TemporaryPass.visit_date <= temp_pass.valid_until,  # Проверка начала существующего <= конца нового
+                TemporaryPass.valid_until >= temp_pass.visit_date  # Проверка конца существующего >= начала нового
+            )
+        )
+        limit = MAX_CAR_PASSES if temp_pass.vehicle_type == 'car' else MAX_TRUCK_PASSES
+        approved = count < limit
+        if approved:
+            # Заявку могли рассмотреть вручную до того, как писатель дошел до этой операции
+            result = await session.execute(
+                update(TemporaryPass)
+                .where(TemporaryPass.id == pass_id, TemporaryPass.status == 'pending')
+                .values(status='approved', time_registration=datetime.datetime.now())
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                return None
+        return temp_pass, owner, approved
+
+    evaluated = await submit_write(evaluate)
+    if evaluated is None:
+        return
+    temp_pass, owner, approved = evaluated
+    if approved:
+        count_pass('temporary', 'pending', 'approved')
+
+    car_number = temp_pass.car_number
+    if temp_pass.owner_type == 'resident':
+        approved_text = f'Пропуск от резидента {owner.fio} на машину с номером {car_number} одобрен автоматически.'
+        pending_text = (f'Поступила заявка на временный пропуск от резидента {owner.fio}.\n'
+                        f'(Пропуска > Временные пропуска > На утверждении)')
+    else:
+        approved_text = (f'Пропуск от подрядчика {owner.company}_{owner.position} '
+                         f'на машину с номером {car_number} одобрен автоматически.')
+        pending_text = (f'Поступила заявка на временный пропуск от подрядчика {owner.fio}.\n'
+                        f'(Пропуска > Временные пропуска > На утверждении)')
+
+    if not approved:
+        broadcast(await get_active_admins_and_managers_tg_ids(), pending_text, reply_markup=admin_reply_keyboard)
+        return
+
+    await refresh_plates(car_number)
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="Оформить временный пропуск", callback_data="create_temporary_pass")],
+        [InlineKeyboardButton(text="Назад", callback_data="back_to_main_menu")]
+    ])
+    try:
+        await bot.send_message(
+            owner.tg_id,
+            f"✅ Ваш временный пропуск одобрен на машину с номером {car_number}",
+            reply_markup=keyboard
+        )
+    except Exception as e:
+        logging.error(f"Не удалось отправить сообщение владельцу: {e}")
+    broadcast(await get_active_admins_managers_sb_tg_ids(), approved_text, reply_markup=admin_reply_keyboard)
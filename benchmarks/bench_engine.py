@@ -0,0 +1,131 @@
+"""
+Одновременные чтение и запись: движок по умолчанию (rollback journal, один пул)
+против профиля db/engine.py (WAL, synchronous=NORMAL, mmap, отдельный пул читателя).
+Читатели ищут пропуска по номеру, как КПП, писатели добавляют заявки и коммитят каждую.
+
+Запуск из корня проекта (нужны переменные окружения из .env):
+    python benchmarks/bench_engine.py [--passes 50000] [--readers 8] [--writers 4] [--seconds 10]
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker  # noqa: E402
+
+from db.engine import create_engine  # noqa: E402
+from db.models import Base, TemporaryPass  # noqa: E402
+from db.pass_lookup import find_passes_by_plate_keys  # noqa: E402
+from plates import split_plate  # noqa: E402
+
+LETTERS = 'АВЕКМНОРСТУХ'
+
+
+def random_plate(rnd: random.Random) -> str:
+    return (f'{rnd.choice(LETTERS)}{rnd.randint(0, 999):03}'
+            f'{rnd.choice(LETTERS)}{rnd.choice(LETTERS)}{rnd.randint(1, 199)}')
+
+
+def pass_row(rnd: random.Random, today: datetime.date) -> dict:
+    car_number = random_plate(rnd)
+    plate_key, plate_region = split_plate(car_number)
+    visit_date = today + datetime.timedelta(days=rnd.randint(-3, 3))
+    return dict(owner_type='resident', resident_id=rnd.randint(1, 1000), vehicle_type='car',
+                car_number=car_number, plate_key=plate_key, plate_region=plate_region, car_brand='Lada',
+                purpose='Гости', visit_date=visit_date, valid_until=visit_date + datetime.timedelta(days=2),
+                status=rnd.choice(('approved', 'pending')), created_at=datetime.datetime.now())
+
+
+async def fill(engine, count: int, rnd: random.Random):
+    today = datetime.date.today()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for start in range(0, count, 5000):
+            await conn.execute(insert(TemporaryPass),
+                               [pass_row(rnd, today) for _ in range(min(5000, count - start))])
+
+
+async def run_load(read_engine, write_engine, plate_keys: list, readers: int, writers: int, seconds: float) -> dict:
+    ReadSession = async_sessionmaker(read_engine, expire_on_commit=False)
+    WriteSession = async_sessionmaker(write_engine, expire_on_commit=False)
+    stop_at = time.perf_counter() + seconds
+    today = datetime.date.today()
+    read_latencies = []
+    stats = {'writes': 0, 'locked': 0}
+
+    async def reader(seed: int):
+        rnd = random.Random(seed)
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            async with ReadSession() as session:
+                await find_passes_by_plate_keys(session, [rnd.choice(plate_keys)], today)
+            read_latencies.append(time.perf_counter() - started)
+
+    async def writer(seed: int):
+        rnd = random.Random(seed)
+        while time.perf_counter() < stop_at:
+            try:
+                async with WriteSession() as session:
+                    session.add(TemporaryPass(**pass_row(rnd, today)))
+                    await session.commit()
+                stats['writes'] += 1
+            except OperationalError:
+                stats['locked'] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(reader(i) for i in range(readers)), *(writer(1000 + i) for i in range(writers)))
+    elapsed = time.perf_counter() - started
+    read_latencies.sort()
+    return {
+        'reads/s': len(read_latencies) / elapsed,
+        'writes/s': stats['writes'] / elapsed,
+        'locked': stats['locked'],
+        'read p50, ms': read_latencies[len(read_latencies) // 2] * 1000 if read_latencies else 0,
+        'read p99, ms': read_latencies[int(len(read_latencies) * 0.99)] * 1000 if read_latencies else 0,
+    }
+
+
+async def bench_profile(name: str, tmp: str, args) -> dict:
+    url = f'sqlite+aiosqlite:///{os.path.join(tmp, f"{name}.db")}'
+    if name == 'default':
+        read_engine = write_engine = create_async_engine(url)
+    else:
+        write_engine = create_engine(url)
+        read_engine = create_engine(url, read_only=True)
+    engines = {read_engine, write_engine}
+    try:
+        rnd = random.Random(1)
+        await fill(write_engine, args.passes, rnd)
+        plate_keys = [split_plate(random_plate(rnd))[0] for _ in range(1000)]
+        return await run_load(read_engine, write_engine, plate_keys, args.readers, args.writers, args.seconds)
+    finally:
+        for engine in engines:
+            await engine.dispose()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--passes', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f'{args.passes} пропусков, читателей: {args.readers}, писателей: {args.writers}, {args.seconds:g} с')
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('default', 'profile'):
+            result = await bench_profile(name, tmp, args)
+            print(f'{name:8}', ', '.join(f'{key}: {value:.1f}' if isinstance(value, float) else f'{key}: {value}'
+                                         for key, value in result.items()))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Пропускная способность import.py: проверка (--dry-run), первая загрузка и повторная
+загрузка того же файла (ON CONFLICT DO UPDATE) для листа временных пропусков.
+
+Запуск из корня проекта (нужны переменные окружения из .env):
+    python benchmarks/bench_import.py [--rows 500000] [--formats csv xlsx]
+"""
+import argparse
+import asyncio
+import csv
+import datetime
+import importlib
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from db.models import Base, TemporaryPass  # noqa: E402
+
+importer = importlib.import_module('import')
+
+LETTERS = 'АВЕКМНОРСТУХ'
+HEADERS = ['id', 'owner_type', 'resident_id', 'vehicle_type', 'car_number', 'car_brand', 'purpose',
+           'destination', 'visit_date', 'status', 'created_at']
+
+
+def generate_rows(count: int, rnd: random.Random):
+    today = datetime.date.today()
+    for pass_id in range(1, count + 1):
+        plate = (f'{rnd.choice(LETTERS)}{rnd.randint(0, 999):03}'
+                 f'{rnd.choice(LETTERS)}{rnd.choice(LETTERS)}{rnd.randint(1, 199)}')
+        visit_date = today + datetime.timedelta(days=rnd.randint(-30, 7))
+        yield (pass_id, 'resident', rnd.randint(1, 1000), 'car', plate, 'Lada', 'Гости',
+               str(rnd.randint(1, 500)), visit_date, 'approved', datetime.datetime.now())
+
+
+def write_sheet(path: str, file_format: str, count: int, rnd: random.Random):
+    if file_format == 'csv':
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(HEADERS)
+            writer.writerows(generate_rows(count, rnd))
+    else:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('temporary_pass')
+        ws.append(HEADERS)
+        for row in generate_rows(count, rnd):
+            ws.append(row)
+        wb.save(path)
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run(rows: int, file_format: str):
+    table = TemporaryPass.__table__
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f'temporary_pass.{file_format}')
+        started = time.perf_counter()
+        write_sheet(path, file_format, rows, random.Random(1))
+        print(f'{file_format}: {rows} строк, файл {os.path.getsize(path) / 2 ** 20:.0f} МБ '
+              f'записан за {time.perf_counter() - started:.1f} с')
+
+        engine = create_async_engine(f'sqlite+aiosqlite:///{os.path.join(tmp, "bench.db")}')
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        for title, dry_run in (('dry-run', True), ('insert', False), ('upsert', False)):
+            started = time.perf_counter()
+            await importer.import_table(engine, table, path, tmp, {}, dry_run=dry_run)
+            elapsed = time.perf_counter() - started
+            print(f'  {title:>8}: {elapsed:.1f} с, {rows / elapsed:.0f} строк/с, max RSS {max_rss_mb():.0f} МБ')
+
+        async with engine.connect() as conn:
+            print(f'  строк в таблице: {await conn.scalar(select(func.count()).select_from(table))}')
+        await engine.dispose()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--formats', nargs='+', default=['csv', 'xlsx'], choices=['csv', 'xlsx'])
+    args = parser.parse_args()
+    for file_format in args.formats:
+        await run(args.rows, file_format)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
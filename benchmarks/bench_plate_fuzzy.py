@@ -0,0 +1,101 @@
+"""
+Нечеткий поиск номера с опечаткой (db/pass_index.fuzzy_plates, индекс симметричных удалений)
+против полного перебора действующих номеров с расчетом расстояния Левенштейна.
+
+Запуск из корня проекта (нужны переменные окружения из .env):
+    python benchmarks/bench_plate_fuzzy.py [--sizes 10000 100000] [--lookups 200]
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker  # noqa: E402
+
+from bench_plate_lookup import fill, percentile  # noqa: E402
+from db import pass_index  # noqa: E402
+from db.models import Base  # noqa: E402
+from fuzzy import levenshtein  # noqa: E402
+from plates import PLATE_LETTERS, normalize_plate  # noqa: E402
+
+
+def typo(plate: str, rnd: random.Random) -> str:
+    """Одна или две опечатки: замена, пропуск или лишний символ"""
+    for _ in range(rnd.choice((1, 1, 2))):
+        position = rnd.randrange(len(plate))
+        char = rnd.choice(PLATE_LETTERS if plate[position].isalpha() else '0123456789')
+        action = rnd.choice(('replace', 'delete', 'insert'))
+        if action == 'replace':
+            plate = plate[:position] + char + plate[position + 1:]
+        elif action == 'delete':
+            plate = plate[:position] + plate[position + 1:]
+        else:
+            plate = plate[:position] + char + plate[position:]
+    return plate
+
+
+async def run(size: int, lookups: int, rnd: random.Random):
+    today = datetime.date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{os.path.join(tmp, "bench.db")}')
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await fill(session_maker, size, rnd)
+
+        pass_index.ReadSessionLocal = session_maker
+        started = time.perf_counter()
+        await pass_index.rebuild_pass_index(today)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        valid_plates = sorted({
+            pass_match.canonical_plate for passes in pass_index._index.values() for pass_match in passes
+        })
+        queries = [typo(plate, rnd) for plate in rnd.sample(valid_plates, lookups)]
+
+        scan_timings, scan_found = [], 0
+        for query in queries:
+            started = time.perf_counter()
+            plate = normalize_plate(query)
+            scan_found += sum(1 for valid in valid_plates if levenshtein(plate, valid) <= pass_index.FUZZY_DISTANCE)
+            scan_timings.append((time.perf_counter() - started) * 1000)
+
+        fuzzy_timings, fuzzy_found, recalled = [], 0, 0
+        for query in queries:
+            started = time.perf_counter()
+            candidates = await pass_index.fuzzy_plates(query)
+            fuzzy_timings.append((time.perf_counter() - started) * 1000)
+            fuzzy_found += len(candidates)
+            recalled += bool(candidates)
+
+        print(f'passes={size} valid plates={len(valid_plates)} lookups={lookups} index build={build_ms:.0f} ms')
+        print(f'      scan: p50={statistics.median(scan_timings):.3f} ms '
+              f'p99={percentile(scan_timings, 0.99):.3f} ms found={scan_found}')
+        print(f'  deletion: p50={statistics.median(fuzzy_timings):.3f} ms '
+              f'p99={percentile(fuzzy_timings, 0.99):.3f} ms found={fuzzy_found} '
+              f'queries with candidates={recalled}/{lookups}')
+
+        await engine.dispose()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    for size in args.sizes:
+        await run(size, args.lookups, rnd)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
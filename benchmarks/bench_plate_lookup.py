@@ -0,0 +1,193 @@
+"""
+Сравнение поиска пропусков по номеру: пять отдельных запросов (старый вариант)
+против одного UNION ALL запроса из db/pass_lookup.py.
+
+Запуск из корня проекта (нужны переменные окружения из .env):
+    python benchmarks/bench_plate_lookup.py [--passes 100000] [--lookups 500]
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, func, or_, and_, insert, text  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker  # noqa: E402
+
+from config import PASS_TIME, FUTURE_LIMIT  # noqa: E402
+from db.models import Base, Resident, Contractor, PermanentPass, TemporaryPass  # noqa: E402
+from db.pass_lookup import find_passes_by_number  # noqa: E402
+from plates import split_plate  # noqa: E402
+
+LETTERS = 'АВЕКМНОРСТУХ'
+
+
+def random_plate(rnd: random.Random) -> str:
+    return (f"{rnd.choice(LETTERS)}{rnd.randint(0, 999):03d}"
+            f"{rnd.choice(LETTERS)}{rnd.choice(LETTERS)}{rnd.randint(1, 199)}")
+
+
+async def fill(session_maker, passes: int, rnd: random.Random) -> list[str]:
+    today = datetime.date.today()
+    residents = max(passes // 50, 1)
+    contractors = max(passes // 200, 1)
+    plates = [random_plate(rnd) for _ in range(passes // 2)]
+
+    async with session_maker() as session:
+        await session.execute(insert(Resident), [
+            {'phone': f'8{i:010d}', 'fio': f'Резидент {i}', 'plot_number': str(i), 'status': True}
+            for i in range(residents)
+        ])
+        await session.execute(insert(Contractor), [
+            {'phone': f'9{i:010d}', 'fio': f'Подрядчик {i}', 'company': 'ООО', 'position': 'прораб',
+             'status': True}
+            for i in range(contractors)
+        ])
+
+        permanent_count = passes * 3 // 10
+        permanent = []
+        for _ in range(permanent_count):
+            car_number = rnd.choice(plates)
+            plate_key, plate_region = split_plate(car_number)
+            permanent.append({
+                'resident_id': rnd.randint(1, residents) if rnd.random() < 0.9 else None,
+                'car_brand': 'Lada', 'car_model': 'Vesta', 'car_number': car_number,
+                'plate_key': plate_key, 'plate_region': plate_region,
+                'car_owner': 'Владелец', 'destination': 'КПП',
+                'status': rnd.choice(('approved', 'approved', 'pending', 'rejected')),
+            })
+        await session.execute(insert(PermanentPass), permanent)
+
+        temporary = []
+        for number in range(passes - permanent_count):
+            owner_type = rnd.choice(('resident', 'resident', 'contractor', 'staff'))
+            car_number = rnd.choice(plates)
+            plate_key, plate_region = split_plate(car_number)
+            visit_date = today + datetime.timedelta(days=rnd.randint(-365, FUTURE_LIMIT + 3))
+            temporary.append({
+                'owner_type': owner_type,
+                'resident_id': rnd.randint(1, residents) if owner_type == 'resident' else None,
+                'contractor_id': rnd.randint(1, contractors) if owner_type == 'contractor' else None,
+                'vehicle_type': rnd.choice(('car', 'truck')),
+                'car_number': car_number,
+                'plate_key': plate_key,
+                'plate_region': plate_region,
+                'car_brand': 'ГАЗ',
+                'cargo_type': 'нет',
+                'purpose': 'доставка',
+                'destination': 'участок',
+                'visit_date': visit_date,
+                'valid_until': visit_date + datetime.timedelta(days=PASS_TIME),
+                'status': rnd.choice(('approved', 'approved', 'pending', 'rejected')),
+            })
+            # Вставляем порциями, чтобы не держать в памяти миллион словарей
+            if len(temporary) == 50_000 or number == passes - permanent_count - 1:
+                await session.execute(insert(TemporaryPass), temporary)
+                temporary = []
+        await session.commit()
+        # Как после миграции analyze: статистика для планировщика
+        await session.execute(text('ANALYZE'))
+    return plates
+
+
+async def legacy_lookup(session, car_number: str, today: datetime.date) -> int:
+    """Старый вариант: отдельный запрос на каждый вид пропуска"""
+    found = 0
+    future_limit = today + datetime.timedelta(days=FUTURE_LIMIT)
+    temp_condition = or_(
+        and_(
+            TemporaryPass.visit_date <= today,
+            func.date(TemporaryPass.visit_date, f'+{PASS_TIME} days') >= today
+        ),
+        and_(
+            TemporaryPass.visit_date > today,
+            TemporaryPass.visit_date <= future_limit
+        )
+    )
+    result = await session.execute(
+        select(PermanentPass, Resident).join(Resident, PermanentPass.resident_id == Resident.id)
+        .where(PermanentPass.car_number == car_number, PermanentPass.status == 'approved')
+    )
+    found += len(result.all())
+    result = await session.execute(
+        select(PermanentPass).where(PermanentPass.car_number == car_number, PermanentPass.status == 'approved',
+                                    PermanentPass.resident_id.is_(None))
+    )
+    found += len(result.scalars().all())
+    result = await session.execute(
+        select(TemporaryPass, Resident).join(Resident, TemporaryPass.resident_id == Resident.id)
+        .where(TemporaryPass.car_number == car_number, TemporaryPass.status == 'approved', temp_condition)
+    )
+    found += len(result.all())
+    result = await session.execute(
+        select(TemporaryPass, Contractor).join(Contractor, TemporaryPass.contractor_id == Contractor.id)
+        .where(TemporaryPass.car_number == car_number, TemporaryPass.status == 'approved', temp_condition)
+    )
+    found += len(result.all())
+    result = await session.execute(
+        select(TemporaryPass).where(TemporaryPass.car_number == car_number, TemporaryPass.status == 'approved',
+                                    TemporaryPass.owner_type == 'staff', temp_condition)
+    )
+    found += len(result.scalars().all())
+    return found
+
+
+async def single_lookup(session, car_number: str, today: datetime.date) -> int:
+    return len(await find_passes_by_number(session, car_number, today))
+
+
+async def measure(session_maker, lookup, plates: list[str], today: datetime.date) -> tuple[list[float], int]:
+    timings = []
+    found = 0
+    for plate in plates:
+        started = time.perf_counter()
+        async with session_maker() as session:
+            found += await lookup(session, plate, today)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, found
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--passes', type=int, default=100_000)
+    parser.add_argument('--lookups', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    today = datetime.date.today()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{os.path.join(tmp, "bench.db")}')
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        plates = await fill(session_maker, args.passes, rnd)
+        lookups = [rnd.choice(plates) for _ in range(args.lookups)]
+
+        # Прогрев кэша страниц SQLite
+        await measure(session_maker, single_lookup, lookups[:20], today)
+
+        print(f'passes={args.passes} lookups={args.lookups}')
+        for name, lookup in (('5 queries', legacy_lookup), ('union all', single_lookup)):
+            timings, found = await measure(session_maker, lookup, lookups, today)
+            print(f'{name:>10}: p50={statistics.median(timings):.2f} ms '
+                  f'p99={percentile(timings, 0.99):.2f} ms found={found}')
+
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
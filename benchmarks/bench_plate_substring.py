@@ -0,0 +1,81 @@
+"""
+Поиск пропусков по части номера: ILIKE '%...%' по таблицам пропусков
+против n-граммного индекса из db/pass_index.py.
+
+Запуск из корня проекта (нужны переменные окружения из .env):
+    python benchmarks/bench_plate_substring.py [--sizes 10000 100000 1000000] [--lookups 100]
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker  # noqa: E402
+
+from bench_plate_lookup import fill, percentile  # noqa: E402
+from db import pass_index  # noqa: E402
+from db.models import Base  # noqa: E402
+from db.pass_lookup import find_passes_by_digits  # noqa: E402
+
+
+async def run(size: int, lookups: int, rnd: random.Random):
+    today = datetime.date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{os.path.join(tmp, "bench.db")}')
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        plates = await fill(session_maker, size, rnd)
+        # Три цифры номера - типичный запрос охраны
+        parts = [plate[1:4] for plate in rnd.sample(plates, lookups)]
+
+        # Индекс строится по той же временной БД
+        pass_index.ReadSessionLocal = session_maker
+        started = time.perf_counter()
+        await pass_index.rebuild_pass_index(today)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        ilike_timings, ilike_found = [], 0
+        for part in parts:
+            started = time.perf_counter()
+            async with session_maker() as session:
+                ilike_found += len(await find_passes_by_digits(session, part, today))
+            ilike_timings.append((time.perf_counter() - started) * 1000)
+
+        index_timings, index_found = [], 0
+        for part in parts:
+            started = time.perf_counter()
+            index_found += len(await pass_index.search_plates(part))
+            index_timings.append((time.perf_counter() - started) * 1000)
+
+        print(f'passes={size} lookups={lookups} index build={build_ms:.0f} ms')
+        print(f'     ilike: p50={statistics.median(ilike_timings):.3f} ms '
+              f'p99={percentile(ilike_timings, 0.99):.3f} ms found={ilike_found}')
+        print(f'    ngrams: p50={statistics.median(index_timings):.3f} ms '
+              f'p99={percentile(index_timings, 0.99):.3f} ms found={index_found}')
+
+        await engine.dispose()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--lookups', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    for size in args.sizes:
+        await run(size, args.lookups, rnd)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramNetworkError, \
+    TelegramServerError
+
+from bot import bot
+from db.util import update_user_blocked
+
+# Лимиты Telegram: не больше ~30 сообщений в секунду от бота и ~1 сообщения в секунду в один чат
+GLOBAL_RATE = 30
+PER_CHAT_INTERVAL = 1.0
+# Сколько сообщений отправляется одновременно
+WORKERS = 8
+QUEUE_SIZE = 10000
+# Сколько раз повторяем отправку после сетевой ошибки или ошибки сервера Telegram
+MAX_ATTEMPTS = 3
+
+
+class TokenBucket:
+    """Ведро токенов: в среднем rate операций в секунду, всплеск до capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class Notification:
+    chat_id: int
+    text: str
+    kwargs: dict = field(default_factory=dict)
+    attempts: int = 0
+
+
+_queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+# chat_id -> момент (time.monotonic), раньше которого в этот чат писать нельзя
+_chat_next_send: dict[int, float] = {}
+_workers: list[asyncio.Task] = []
+
+
+def broadcast(tg_ids, text: str, **kwargs):
+    """
+    Ставит сообщение в очередь рассылки для каждого получателя и сразу возвращается.
+    kwargs передаются в bot.send_message (например, reply_markup).
+    """
+    for tg_id in tg_ids:
+        try:
+            _queue.put_nowait(Notification(tg_id, text, kwargs))
+        except asyncio.QueueFull:
+            logging.error(f'Очередь рассылки переполнена, сообщение для {tg_id} не отправлено')
+
+
+async def _wait_for_chat(chat_id: int):
+    """Соблюдает интервал между сообщениями в один чат"""
+    now = time.monotonic()
+    send_at = max(now, _chat_next_send.get(chat_id, 0))
+    _chat_next_send[chat_id] = send_at + PER_CHAT_INTERVAL
+    if send_at > now:
+        await asyncio.sleep(send_at - now)
+
+
+async def _send(notification: Notification):
+    await _wait_for_chat(notification.chat_id)
+    await _bucket.acquire()
+    notification.attempts += 1
+    try:
+        await bot.send_message(notification.chat_id, notification.text, **notification.kwargs)
+    except TelegramRetryAfter as e:
+        # Telegram просит подождать: отправим это же сообщение после паузы
+        logging.warning(f'Рассылка: flood control, ждем {e.retry_after} с')
+        _chat_next_send[notification.chat_id] = time.monotonic() + e.retry_after
+        await asyncio.sleep(e.retry_after)
+        await _queue.put(notification)
+    except TelegramForbiddenError:
+        # Пользователь заблокировал бота
+        await update_user_blocked(notification.chat_id)
+    except (TelegramNetworkError, TelegramServerError) as e:
+        if notification.attempts < MAX_ATTEMPTS:
+            await _queue.put(notification)
+        else:
+            logging.error(f'Рассылка: не удалось отправить сообщение {notification.chat_id}: {e}')
+    except Exception as e:
+        logging.error(f'Рассылка: не удалось отправить сообщение {notification.chat_id}: {e}')
+
+
+async def _worker():
+    while True:
+        notification = await _queue.get()
+        try:
+            await _send(notification)
+        finally:
+            _queue.task_done()
+
+
+def start_broadcast(workers: int = WORKERS):
+    """Запускает воркеры рассылки. Вызывается один раз при старте бота."""
+    for _ in range(workers):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def wait_broadcast():
+    """Дожидается отправки всех сообщений из очереди"""
+    await _queue.join()
+
+
+async def stop_broadcast():
+    """Останавливает воркеры рассылки. Неотправленные сообщения очереди теряются."""
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -11,3 +11,14 @@ MAX_CAR_PASSES = int(os.environ.get("MAX_CAR_PASSES"))
 PASS_TIME = int(os.environ.get("PASS_TIME"))
 FUTURE_LIMIT = int(os.environ.get("FUTURE_LIMIT"))
 RAZRAB = int(os.environ.get("RAZRAB"))
+
+# База данных: строка подключения и настройки SQLite (db/engine.py)
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite+aiosqlite:///db/database.db")
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", 16384))
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+READ_POOL_SIZE = int(os.environ.get("READ_POOL_SIZE", 5))
+
+# Снимок действующих пропусков для работы КПП без бота (snapshot.py) и как часто проверять, не устарел ли он
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", "db/passes.snapshot")
+SNAPSHOT_INTERVAL = int(os.environ.get("SNAPSHOT_INTERVAL", 10))
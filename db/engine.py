@@ -0,0 +1,47 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from config import DATABASE_URL, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE, SQLITE_BUSY_TIMEOUT_MS, READ_POOL_SIZE
+
+
+# Профиль соединений с БД. Для SQLite при каждом подключении выставляются:
+#   journal_mode=WAL     - читатели не ждут писателя, а писатель - читателей;
+#   synchronous=NORMAL   - в режиме WAL fsync только при checkpoint, коммит не теряет целостность;
+#   cache_size, mmap_size - кэш страниц соединения и чтение файла БД через mmap;
+#   busy_timeout         - сколько ждать занятую БД, прежде чем вернуть "database is locked".
+# Соединения только для чтения (read_only=True) дополнительно получают query_only:
+# это отдельный пул для поиска на КПП, статистики и выгрузок, запись через него невозможна.
+
+
+def sqlite_pragmas(read_only: bool = False) -> list[str]:
+    pragmas = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}',
+        f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}',
+        f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}',
+    ]
+    if read_only:
+        # Режим журнала хранится в файле БД и выставляется пишущими соединениями
+        pragmas = pragmas[1:] + ['PRAGMA query_only=ON']
+    return pragmas
+
+
+def create_engine(url: str = DATABASE_URL, read_only: bool = False, **kwargs) -> AsyncEngine:
+    """Движок с профилем соединений. Для читателя по умолчанию пул из READ_POOL_SIZE соединений."""
+    if read_only:
+        kwargs.setdefault('pool_size', READ_POOL_SIZE)
+    engine = create_async_engine(url, **kwargs)
+    if engine.dialect.name != 'sqlite':
+        return engine
+
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine.sync_engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
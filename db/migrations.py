@@ -0,0 +1,151 @@
+import asyncio
+import datetime
+import logging
+
+from sqlalchemy import text
+
+from config import PASS_TIME
+from plates import split_plate
+
+
+# Версия схемы хранится в PRAGMA user_version. Каждая миграция выполняется один раз,
+# новые миграции добавляются в конец списка MIGRATIONS. Миграция не должна зависеть от текущих
+# моделей (db/models.py): только явный DDL, иначе обновление старой БД сломается после изменения моделей.
+# Ручной запуск из корня проекта: python -m db.migrations
+
+
+def _columns(conn, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(text(f'PRAGMA table_info({table})'))}
+
+
+def _add_column(conn, table: str, column: str, column_type: str):
+    """create_all не добавляет колонки в существующие таблицы, поэтому добавляем их здесь"""
+    if column not in _columns(conn, table):
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}'))
+
+
+def _backfill_plate_keys(conn, table: str):
+    rows = conn.execute(text(f'SELECT id, car_number FROM {table} WHERE car_number IS NOT NULL')).all()
+    params = []
+    for pass_id, car_number in rows:
+        plate_key, plate_region = split_plate(car_number)
+        params.append({'id': pass_id, 'plate_key': plate_key, 'plate_region': plate_region})
+    if params:
+        conn.execute(
+            text(f'UPDATE {table} SET plate_key = :plate_key, plate_region = :plate_region WHERE id = :id'),
+            params
+        )
+
+
+def add_plate_keys(conn):
+    """Канонический ключ номера и код региона для пропусков"""
+    for table in ('permanent_pass', 'temporary_pass'):
+        _add_column(conn, table, 'plate_key', 'VARCHAR(20)')
+        _add_column(conn, table, 'plate_region', 'VARCHAR(3)')
+        _backfill_plate_keys(conn, table)
+
+
+# Индексы схемы версии 2. Список заморожен: миграция не читает текущие модели, иначе на старой БД
+# она попробует создать индексы по колонкам, которые добавят только следующие миграции.
+INDEXES_V2 = [
+    'CREATE INDEX IF NOT EXISTS ix_manager_phone ON manager (phone)',
+    'CREATE INDEX IF NOT EXISTS ix_manager_tg_id ON manager (tg_id)',
+    'CREATE INDEX IF NOT EXISTS ix_security_phone ON security (phone)',
+    'CREATE INDEX IF NOT EXISTS ix_security_tg_id ON security (tg_id)',
+    'CREATE INDEX IF NOT EXISTS ix_resident_phone ON resident (phone)',
+    'CREATE INDEX IF NOT EXISTS ix_resident_tg_id ON resident (tg_id)',
+    'CREATE INDEX IF NOT EXISTS ix_contractor_phone ON contractor (phone)',
+    'CREATE INDEX IF NOT EXISTS ix_contractor_tg_id ON contractor (tg_id)',
+    'CREATE INDEX IF NOT EXISTS ix_registration_request_tg_id_created_at ON registration_request (tg_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_registration_request_resident_id_status ON registration_request (resident_id, status)',
+    'CREATE INDEX IF NOT EXISTS ix_contractor_registration_request_tg_id_created_at '
+    'ON contractor_registration_request (tg_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_contractor_registration_request_contractor_id_status '
+    'ON contractor_registration_request (contractor_id, status)',
+    'CREATE INDEX IF NOT EXISTS ix_permanent_pass_status_plate_key ON permanent_pass (status, plate_key)',
+    'CREATE INDEX IF NOT EXISTS ix_permanent_pass_status_created_at ON permanent_pass (status, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_permanent_pass_resident_id_created_at ON permanent_pass (resident_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_temporary_pass_status_plate_key ON temporary_pass (status, plate_key)',
+    'CREATE INDEX IF NOT EXISTS ix_temporary_pass_status_visit_date ON temporary_pass (status, visit_date)',
+    'CREATE INDEX IF NOT EXISTS ix_temporary_pass_status_created_at ON temporary_pass (status, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_temporary_pass_resident_quota '
+    'ON temporary_pass (resident_id, vehicle_type, status, visit_date)',
+    'CREATE INDEX IF NOT EXISTS ix_temporary_pass_contractor_quota '
+    'ON temporary_pass (contractor_id, vehicle_type, status, visit_date)',
+    'CREATE INDEX IF NOT EXISTS ix_appeal_status_created_at ON appeal (status, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_appeal_resident_id_created_at ON appeal (resident_id, created_at)',
+]
+
+
+def create_indexes(conn):
+    """Индексы по горячим колонкам: create_all создает индексы только вместе с новой таблицей"""
+    for ddl in INDEXES_V2:
+        conn.execute(text(ddl))
+
+
+def add_valid_until(conn):
+    """Дата окончания временного пропуска вместо func.date(visit_date, '+N days') в условиях"""
+    _add_column(conn, 'temporary_pass', 'valid_until', 'DATE')
+    conn.execute(text(
+        f"UPDATE temporary_pass SET valid_until = date(visit_date, '+{PASS_TIME} days') WHERE visit_date IS NOT NULL"
+    ))
+    # Индекс по visit_date заменен индексом по valid_until
+    conn.execute(text('DROP INDEX IF EXISTS ix_temporary_pass_status_visit_date'))
+    conn.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_temporary_pass_status_valid_until ON temporary_pass (status, valid_until)'
+    ))
+
+
+def analyze(conn):
+    """Обновляет статистику, чтобы планировщик SQLite начал выбирать новые индексы"""
+    conn.execute(text('ANALYZE'))
+
+
+# Таблицы схемы версии 5. deferred_job появляется через create_all вместе с планировщиком
+UPDATED_AT_TABLES = (
+    'user', 'manager', 'security', 'resident', 'contractor', 'registration_request',
+    'contractor_registration_request', 'resident_contractor_request', 'contractor_contractor_request',
+    'permanent_pass', 'temporary_pass', 'appeal', 'deferred_job',
+)
+
+
+def add_updated_at(conn):
+    """Время последнего изменения строки для инкрементальной выгрузки (export.py --since)"""
+    # Какие старые строки менялись, неизвестно - помечаем все временем миграции, чтобы следующая
+    # инкрементальная выгрузка забрала их один раз целиком. Формат - как у DateTime в SQLAlchemy.
+    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+    existing = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    for table in UPDATED_AT_TABLES:
+        if table not in existing:
+            continue
+        _add_column(conn, table, 'updated_at', 'DATETIME')
+        conn.execute(text(f'UPDATE "{table}" SET updated_at = :now WHERE updated_at IS NULL'), {'now': now})
+
+
+MIGRATIONS = [
+    add_plate_keys,
+    create_indexes,
+    add_valid_until,
+    analyze,
+    add_updated_at,
+]
+
+
+def run_migrations(conn):
+    """Применяет миграции, которые еще не применялись к этой БД"""
+    version = conn.execute(text('PRAGMA user_version')).scalar()
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        migration(conn)
+        conn.execute(text(f'PRAGMA user_version = {number}'))
+        logging.info(f'Применена миграция {number}: {migration.__name__}')
+
+
+if __name__ == '__main__':
+    from db.models import create_tables, engine
+
+    async def _main():
+        await create_tables()
+        await engine.dispose()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
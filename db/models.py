@@ -1,20 +1,32 @@
-from sqlalchemy import BigInteger, String, Boolean, ForeignKey
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase, mapped_column, Mapped, relationship
+from sqlalchemy import BigInteger, String, Boolean, ForeignKey, Index
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import DeclarativeBase, mapped_column, Mapped, relationship, validates
 import atexit
 import datetime
 
+from config import DATABASE_URL, PASS_TIME
+from db.engine import create_engine
+from db.migrations import run_migrations
+from plates import split_plate
 
-con_string = 'sqlite+aiosqlite:///db/database.db'
 
-engine = create_async_engine(con_string)
+con_string = DATABASE_URL
+
+engine = create_engine()
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+# Отдельный пул только для чтения: поиск на КПП, статистика, отчеты
+read_engine = create_engine(read_only=True)
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False)
 
 atexit.register(engine.dispose)
+atexit.register(read_engine.dispose)
 
 
 class Base(DeclarativeBase):
-    pass
+    # Время последнего изменения строки, есть во всех таблицах - для инкрементальной выгрузки (export.py --since)
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        default=datetime.datetime.now, onupdate=datetime.datetime.now, nullable=True
+    )
 
 
 class User(Base):
@@ -31,9 +43,9 @@ class Manager(Base):
     __tablename__ = 'manager'
     id: Mapped[int] = mapped_column(primary_key=True)
     start_key: Mapped[str] = mapped_column(String(20), nullable=True)
-    phone: Mapped[str] = mapped_column(String(20), nullable=True)
+    phone: Mapped[str] = mapped_column(String(20), nullable=True, index=True)
     fio: Mapped[str] = mapped_column(nullable=True)
-    tg_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    tg_id: Mapped[int] = mapped_column(BigInteger, nullable=True, index=True)
     username: Mapped[str] = mapped_column(nullable=True)
     first_name: Mapped[str] = mapped_column(nullable=True)
     last_name: Mapped[str] = mapped_column(nullable=True)
@@ -46,9 +58,9 @@ class Security(Base):
     __tablename__ = 'security'
     id: Mapped[int] = mapped_column(primary_key=True)
     start_key: Mapped[str] = mapped_column(String(20), nullable=True)
-    phone: Mapped[str] = mapped_column(String(20), nullable=True)
+    phone: Mapped[str] = mapped_column(String(20), nullable=True, index=True)
     fio: Mapped[str] = mapped_column(nullable=True)
-    tg_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    tg_id: Mapped[int] = mapped_column(BigInteger, nullable=True, index=True)
     username: Mapped[str] = mapped_column(nullable=True)
     first_name: Mapped[str] = mapped_column(nullable=True)
     last_name: Mapped[str] = mapped_column(nullable=True)
@@ -61,10 +73,10 @@ class Resident(Base):
     __tablename__ = 'resident'
     id: Mapped[int] = mapped_column(primary_key=True)
     start_key: Mapped[str] = mapped_column(String(20), nullable=True)
-    phone: Mapped[str] = mapped_column(String(20), nullable=True)
+    phone: Mapped[str] = mapped_column(String(20), nullable=True, index=True)
     fio: Mapped[str] = mapped_column(nullable=True)
     plot_number: Mapped[str] = mapped_column(nullable=True)
-    tg_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    tg_id: Mapped[int] = mapped_column(BigInteger, nullable=True, index=True)
     username: Mapped[str] = mapped_column(nullable=True)
     first_name: Mapped[str] = mapped_column(nullable=True)
     last_name: Mapped[str] = mapped_column(nullable=True)
@@ -78,13 +90,13 @@ class Contractor(Base):
     __tablename__ = 'contractor'
     id: Mapped[int] = mapped_column(primary_key=True)
     start_key: Mapped[str] = mapped_column(String(20), nullable=True)
-    phone: Mapped[str] = mapped_column(String(20), nullable=True)
+    phone: Mapped[str] = mapped_column(String(20), nullable=True, index=True)
     work_types: Mapped[str] = mapped_column(nullable=True)  # Добавлено
     company: Mapped[str] = mapped_column(nullable=True)  # Добавлено
     position: Mapped[str] = mapped_column(nullable=True)  # Добавлено
     fio: Mapped[str] = mapped_column(nullable=True)
     affiliation: Mapped[str] = mapped_column(nullable=True)
-    tg_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    tg_id: Mapped[int] = mapped_column(BigInteger, nullable=True, index=True)
     username: Mapped[str] = mapped_column(nullable=True)
     first_name: Mapped[str] = mapped_column(nullable=True)
     last_name: Mapped[str] = mapped_column(nullable=True)
@@ -97,6 +109,10 @@ class Contractor(Base):
 
 class RegistrationRequest(Base):
     __tablename__ = 'registration_request'
+    __table_args__ = (
+        Index('ix_registration_request_tg_id_created_at', 'tg_id', 'created_at'),
+        Index('ix_registration_request_resident_id_status', 'resident_id', 'status'),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     resident_id: Mapped[int] = mapped_column(ForeignKey('resident.id'))
     fio: Mapped[str] = mapped_column(nullable=True)
@@ -117,6 +133,10 @@ Resident.requests = relationship("RegistrationRequest", back_populates="resident
 
 class ContractorRegistrationRequest(Base):
     __tablename__ = 'contractor_registration_request'
+    __table_args__ = (
+        Index('ix_contractor_registration_request_tg_id_created_at', 'tg_id', 'created_at'),
+        Index('ix_contractor_registration_request_contractor_id_status', 'contractor_id', 'status'),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     company: Mapped[str] = mapped_column(nullable=True)  # Добавлено
     position: Mapped[str] = mapped_column(nullable=True)  # Добавлено
@@ -162,11 +182,18 @@ class ContractorContractorRequest(Base):
 
 class PermanentPass(Base):
     __tablename__ = 'permanent_pass'
+    __table_args__ = (
+        Index('ix_permanent_pass_status_plate_key', 'status', 'plate_key'),  # поиск на КПП
+        Index('ix_permanent_pass_status_created_at', 'status', 'created_at'),  # списки в админке
+        Index('ix_permanent_pass_resident_id_created_at', 'resident_id', 'created_at'),  # пропуска резидента
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     resident_id: Mapped[int] = mapped_column(ForeignKey('resident.id'), nullable=True)
     car_brand: Mapped[str] = mapped_column(nullable=True)      # Марка машины
     car_model: Mapped[str] = mapped_column(nullable=True)     # Модель машины
     car_number: Mapped[str] = mapped_column(nullable=True)    # Номер машины
+    plate_key: Mapped[str] = mapped_column(String(20), nullable=True)   # Канонический номер без региона
+    plate_region: Mapped[str] = mapped_column(String(3), nullable=True)  # Код региона
     car_owner: Mapped[str] = mapped_column(nullable=True)     # Кому принадлежит машина?
     status: Mapped[str] = mapped_column(default='pending')    # pending/approved/rejected
     resident_comment: Mapped[str] = mapped_column(nullable=True)   # Комментарий резиденту
@@ -176,9 +203,21 @@ class PermanentPass(Base):
     time_registration: Mapped[datetime.datetime] = mapped_column(nullable=True)
     resident = relationship("Resident")
 
+    @validates('car_number')
+    def _set_plate_key(self, key, car_number):
+        self.plate_key, self.plate_region = split_plate(car_number) if car_number else (None, None)
+        return car_number
+
 
 class TemporaryPass(Base):
     __tablename__ = 'temporary_pass'
+    __table_args__ = (
+        Index('ix_temporary_pass_status_plate_key', 'status', 'plate_key'),  # поиск на КПП
+        Index('ix_temporary_pass_status_valid_until', 'status', 'valid_until'),  # действующие пропуска
+        Index('ix_temporary_pass_status_created_at', 'status', 'created_at'),  # списки в админке
+        Index('ix_temporary_pass_resident_quota', 'resident_id', 'vehicle_type', 'status', 'visit_date'),  # лимиты резидента
+        Index('ix_temporary_pass_contractor_quota', 'contractor_id', 'vehicle_type', 'status', 'visit_date'),  # лимиты подрядчика
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     owner_type: Mapped[str] = mapped_column(String(20))  # resident/contractor
@@ -188,10 +227,13 @@ class TemporaryPass(Base):
     weight_category: Mapped[str] = mapped_column(String(20), nullable=True)  # light/heavy
     length_category: Mapped[str] = mapped_column(String(20), nullable=True)  # short/long
     car_number: Mapped[str] = mapped_column(String(20))
+    plate_key: Mapped[str] = mapped_column(String(20), nullable=True)   # Канонический номер без региона
+    plate_region: Mapped[str] = mapped_column(String(3), nullable=True)  # Код региона
     car_brand: Mapped[str] = mapped_column(String(50))
     cargo_type: Mapped[str] = mapped_column(String(100), nullable=True)
     purpose: Mapped[str] = mapped_column(String(100))
     visit_date: Mapped[datetime.date] = mapped_column()
+    valid_until: Mapped[datetime.date] = mapped_column(nullable=True)  # Последний день действия: visit_date + PASS_TIME
     owner_comment: Mapped[str] = mapped_column(nullable=True)
     resident_comment: Mapped[str] = mapped_column(nullable=True)
     security_comment: Mapped[str] = mapped_column(nullable=True)
@@ -203,9 +245,23 @@ class TemporaryPass(Base):
     resident = relationship("Resident")
     contractor = relationship("Contractor")
 
+    @validates('car_number')
+    def _set_plate_key(self, key, car_number):
+        self.plate_key, self.plate_region = split_plate(car_number) if car_number else (None, None)
+        return car_number
+
+    @validates('visit_date')
+    def _set_valid_until(self, key, visit_date):
+        self.valid_until = visit_date + datetime.timedelta(days=PASS_TIME) if visit_date else None
+        return visit_date
+
 
 class Appeal(Base):
     __tablename__ = 'appeal'
+    __table_args__ = (
+        Index('ix_appeal_status_created_at', 'status', 'created_at'),
+        Index('ix_appeal_resident_id_created_at', 'resident_id', 'created_at'),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     request_text: Mapped[str] = mapped_column(nullable=False)
     response_text: Mapped[str] = mapped_column(nullable=True)
@@ -219,6 +275,24 @@ class Appeal(Base):
     responser = relationship("User")
 
 
+class DeferredJob(Base):
+    """Отложенная задача: выполнить kind для объекта object_id не раньше run_at"""
+    __tablename__ = 'deferred_job'
+    __table_args__ = (
+        Index('ix_deferred_job_status_run_at', 'status', 'run_at'),  # выборка готовых задач
+    )
+    id: Mapped[int] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(String(50))
+    object_id: Mapped[int] = mapped_column()
+    run_at: Mapped[datetime.datetime] = mapped_column()
+    status: Mapped[str] = mapped_column(String(20), default='pending')  # pending/done/failed
+    attempts: Mapped[int] = mapped_column(default=0)
+    last_error: Mapped[str] = mapped_column(nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(default=datetime.datetime.now)
+    finished_at: Mapped[datetime.datetime] = mapped_column(nullable=True)
+
+
 async def create_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
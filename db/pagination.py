@@ -0,0 +1,132 @@
+import datetime
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import Select, and_, or_, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import PAGE_SIZE
+
+
+# Постраничный вывод списков по ключу (created_at, id) вместо OFFSET.
+# Страница выбирается условием по ключу, поэтому любая страница стоит столько же, сколько первая,
+# а вместо COUNT(*) читается одна лишняя строка (limit + 1).
+#
+# Курсор - короткая строка для callback_data: направление, created_at в микросекундах и id (hex):
+#   n<created_at>.<id> - страница, начинающаяся с этой строки (вниз по списку);
+#   p<created_at>.<id> - страница перед этой строкой (вверх по списку).
+NEXT = 'n'
+PREV = 'p'
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+@dataclass
+class Page:
+    rows: list
+    # Курсор первой строки страницы - для повторного показа той же страницы (None - первая страница)
+    start: Optional[str]
+    prev_cursor: Optional[str]
+    next_cursor: Optional[str]
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(direction: str, key: tuple) -> str:
+    created_at, row_id = key
+    return f'{direction}{(created_at - _EPOCH) // _MICROSECOND:x}.{row_id:x}'
+
+
+def decode_cursor(cursor: str) -> tuple[str, tuple]:
+    direction = cursor[0]
+    if direction not in (NEXT, PREV):
+        raise ValueError(f'Некорректный курсор {cursor!r}')
+    created_at, row_id = cursor[1:].split('.')
+    return direction, (_EPOCH + int(created_at, 16) * _MICROSECOND, int(row_id, 16))
+
+
+# Лишнее условие created_at >=/<= нужно SQLite: по одному OR с параметрами он не строит
+# диапазон по индексу (status, created_at) и просматривает все строки статуса.
+def _newer(model, key: tuple):
+    created_at, row_id = key
+    return and_(
+        model.created_at >= created_at,
+        or_(model.created_at > created_at, and_(model.created_at == created_at, model.id > row_id))
+    )
+
+
+def _older(model, key: tuple):
+    created_at, row_id = key
+    return and_(
+        model.created_at <= created_at,
+        or_(model.created_at < created_at, and_(model.created_at == created_at, model.id < row_id))
+    )
+
+
+def _not_newer(model, key: tuple):
+    created_at, row_id = key
+    return and_(
+        model.created_at <= created_at,
+        or_(model.created_at < created_at, and_(model.created_at == created_at, model.id <= row_id))
+    )
+
+
+async def fetch_page(session: AsyncSession, query: Select, model, cursor: Optional[str] = None,
+                     limit: int = PAGE_SIZE) -> Page:
+    """
+    Страница списка query (без order_by), отсортированного от новых к старым.
+    model - первая сущность запроса. Если в запросе одна сущность, rows - объекты модели, иначе - строки.
+    """
+    newest_first = (model.created_at.desc(), model.id.desc())
+    oldest_first = (model.created_at.asc(), model.id.asc())
+    single = len(query.column_descriptions) == 1
+
+    def row_key(row) -> tuple:
+        obj = row if single else row[0]
+        return obj.created_at, obj.id
+
+    async def select_rows(condition, order) -> list:
+        result = await session.execute(query.where(condition).order_by(*order).limit(limit + 1))
+        return list(result.scalars()) if single else list(result.all())
+
+    async def probe(condition, order) -> Optional[tuple]:
+        """Ключ ближайшей строки за пределами страницы"""
+        result = await session.execute(
+            query.with_only_columns(model.created_at, model.id).where(condition).order_by(*order).limit(1)
+        )
+        row = result.first()
+        return tuple(row) if row else None
+
+    direction, key = decode_cursor(cursor) if cursor else (NEXT, None)
+
+    if direction == PREV:
+        rows = await select_rows(_newer(model, key), oldest_first)
+        if len(rows) <= limit:
+            # Выше меньше целой страницы - это первая страница
+            return await fetch_page(session, query, model, None, limit)
+        rows = rows[:limit][::-1]
+        has_prev = True
+        next_key = await probe(_older(model, row_key(rows[-1])), newest_first)
+    else:
+        condition = _not_newer(model, key) if key else true()
+        rows = await select_rows(condition, newest_first)
+        if key and not rows:
+            # Строки, с которых начиналась страница, удалены или сменили статус
+            return await fetch_page(session, query, model, None, limit)
+        next_key = row_key(rows[limit]) if len(rows) > limit else None
+        rows = rows[:limit]
+        has_prev = bool(key) and await probe(_newer(model, row_key(rows[0])), oldest_first) is not None
+
+    first_key = row_key(rows[0]) if rows else None
+    return Page(
+        rows=rows,
+        start=encode_cursor(NEXT, first_key) if has_prev else None,
+        prev_cursor=encode_cursor(PREV, first_key) if has_prev else None,
+        next_cursor=encode_cursor(NEXT, next_key) if next_key else None,
+    )
@@ -0,0 +1,238 @@
+import asyncio
+import datetime
+import logging
+from typing import Optional
+
+from sqlalchemy import select, union
+
+from db.models import ReadSessionLocal, PermanentPass, TemporaryPass
+from db.pass_lookup import PassMatch, PASS_KINDS, find_valid_passes, find_passes_by_plate_keys
+from fuzzy import DeletionIndex
+from plates import normalize_plate, split_plate
+
+
+# Ключ номера (канонический номер без региона) -> действующие на сегодня пропуска
+_index: dict[str, list[PassMatch]] = {}
+# N-грамма (1-3 символа) канонического номера с регионом -> ключи номеров, в которых она встречается
+_ngrams: dict[str, set[str]] = {}
+# Дата, на которую построен индекс
+_built_for: Optional[datetime.date] = None
+# Растет при каждом изменении индекса - по нему кэши, построенные из индекса, узнают об устаревании
+_version = 0
+_lock = asyncio.Lock()
+
+NGRAM_SIZE = 3
+# Допустимое число опечаток и сколько похожих номеров показывать
+FUZZY_DISTANCE = 2
+FUZZY_LIMIT = 10
+
+# Нечеткий поиск по опечаткам: канонические номера с регионом и ключи номеров без региона
+_plates_fuzzy = DeletionIndex(FUZZY_DISTANCE)
+_keys_fuzzy = DeletionIndex(FUZZY_DISTANCE)
+
+
+def _plate_ngrams(plate: str, size: int) -> set[str]:
+    return {plate[i:i + size] for i in range(len(plate) - size + 1)}
+
+
+def _all_ngrams(plate: str) -> set[str]:
+    return {ngram for size in range(1, NGRAM_SIZE + 1) for ngram in _plate_ngrams(plate, size)}
+
+
+def _set_plate(plate_key: str, passes: list[PassMatch]):
+    """Заменяет пропуска по ключу номера вместе с его n-граммами"""
+    for plate in {pass_match.canonical_plate for pass_match in _index.pop(plate_key, [])}:
+        _plates_fuzzy.remove(plate)
+        for ngram in _all_ngrams(plate):
+            plate_keys = _ngrams.get(ngram)
+            if plate_keys is not None:
+                plate_keys.discard(plate_key)
+                if not plate_keys:
+                    del _ngrams[ngram]
+
+    if not passes:
+        _keys_fuzzy.remove(plate_key)
+        return
+    _index[plate_key] = sorted(passes, key=lambda pass_match: PASS_KINDS.index(pass_match.kind))
+    _keys_fuzzy.add(plate_key)
+    for plate in {pass_match.canonical_plate for pass_match in passes}:
+        _plates_fuzzy.add(plate)
+        for ngram in _all_ngrams(plate):
+            _ngrams.setdefault(ngram, set()).add(plate_key)
+
+
+def _group_by_plate_key(passes: list[PassMatch]) -> dict[str, list[PassMatch]]:
+    grouped = {}
+    for pass_match in passes:
+        if pass_match.plate_key:
+            grouped.setdefault(pass_match.plate_key, []).append(pass_match)
+    return grouped
+
+
+async def rebuild_pass_index(today: Optional[datetime.date] = None):
+    """Полностью перестраивает индекс действующих пропусков на указанную дату"""
+    global _index, _ngrams, _plates_fuzzy, _keys_fuzzy, _built_for, _version
+    today = today or datetime.datetime.now().date()
+    async with _lock:
+        async with ReadSessionLocal() as session:
+            passes = await find_valid_passes(session, today)
+        _index = {}
+        _ngrams = {}
+        _plates_fuzzy = DeletionIndex(FUZZY_DISTANCE)
+        _keys_fuzzy = DeletionIndex(FUZZY_DISTANCE)
+        for plate_key, plate_passes in _group_by_plate_key(passes).items():
+            _set_plate(plate_key, plate_passes)
+        _built_for = today
+        _version += 1
+    logging.info(f'Индекс пропусков построен на {today}: {len(passes)} пропусков')
+
+
+async def _ensure_fresh():
+    """Перестраивает индекс, если он еще не построен или сменились сутки"""
+    if _built_for != datetime.datetime.now().date():
+        await rebuild_pass_index()
+
+
+async def refresh_plates(*car_numbers):
+    """
+    Перечитывает из БД пропуска на указанные номера.
+    Вызывается после коммита, который создал, одобрил, отклонил, изменил или удалил пропуск.
+    При смене номера нужно передавать и старый, и новый номер.
+    """
+    global _version
+    plate_keys = {split_plate(car_number)[0] for car_number in car_numbers if car_number}
+    if not plate_keys or _built_for is None:
+        return
+
+    async with _lock:
+        async with ReadSessionLocal() as session:
+            passes = await find_passes_by_plate_keys(session, plate_keys, _built_for)
+
+        grouped = _group_by_plate_key(passes)
+        for plate_key in plate_keys:
+            _set_plate(plate_key, grouped.get(plate_key, []))
+        _version += 1
+
+
+async def refresh_owner_plates(resident_id: Optional[int] = None, contractor_id: Optional[int] = None):
+    """
+    Перечитывает одобренные пропуска резидента или подрядчика.
+    Вызывается после коммита, который изменил ФИО, участок или компанию владельца: они есть в карточках пропусков.
+    """
+    if resident_id is not None:
+        query = union(
+            select(PermanentPass.car_number).where(PermanentPass.resident_id == resident_id,
+                                                   PermanentPass.status == 'approved'),
+            select(TemporaryPass.car_number).where(TemporaryPass.resident_id == resident_id,
+                                                   TemporaryPass.status == 'approved'),
+        )
+    else:
+        query = select(TemporaryPass.car_number).where(TemporaryPass.contractor_id == contractor_id,
+                                                       TemporaryPass.status == 'approved')
+    async with ReadSessionLocal() as session:
+        car_numbers = (await session.scalars(query)).all()
+    await refresh_plates(*car_numbers)
+
+
+async def lookup_plate(car_number: str) -> list[PassMatch]:
+    """
+    Действующие пропуска на номер - из памяти, без обращения к БД.
+    Если регион не указан, подходят номера с любым регионом.
+    """
+    await _ensure_fresh()
+    plate_key, plate_region = split_plate(car_number)
+    return [
+        pass_match for pass_match in _index.get(plate_key, [])
+        if plate_region is None or pass_match.plate_region == plate_region
+    ]
+
+
+async def search_plates(part: str) -> list[PassMatch]:
+    """
+    Действующие пропуска, номер которых содержит указанную часть.
+    Кандидаты берутся пересечением списков n-грамм, затем проверяется вхождение подстроки.
+    """
+    await _ensure_fresh()
+    part = normalize_plate(part)
+    if not part:
+        return []
+
+    size = min(len(part), NGRAM_SIZE)
+    candidates = None
+    for ngram in sorted(_plate_ngrams(part, size), key=lambda ngram: len(_ngrams.get(ngram, ()))):
+        plate_keys = _ngrams.get(ngram)
+        if not plate_keys:
+            return []
+        candidates = set(plate_keys) if candidates is None else candidates & plate_keys
+        if not candidates:
+            return []
+
+    passes = [
+        pass_match for plate_key in candidates for pass_match in _index[plate_key]
+        if part in pass_match.canonical_plate
+    ]
+    passes.sort(key=lambda pass_match: (PASS_KINDS.index(pass_match.kind), pass_match.canonical_plate))
+    return passes
+
+
+async def fuzzy_plates(car_number: str, max_distance: int = FUZZY_DISTANCE) -> list[tuple[int, PassMatch]]:
+    """
+    Действующие пропуска на номера, отличающиеся от введенного не больше чем на max_distance символов:
+    [(число отличий, пропуск)], сначала ближайшие. Если регион не введен, номера сравниваются без региона.
+    """
+    await _ensure_fresh()
+    plate = normalize_plate(car_number)
+    if not plate:
+        return []
+
+    # Ключ номера -> {канонический номер (None - любой регион): расстояние}
+    found: dict[str, dict[Optional[str], int]] = {}
+    for distance, canonical_plate in _plates_fuzzy.search(plate, max_distance):
+        found.setdefault(split_plate(canonical_plate)[0], {})[canonical_plate] = distance
+    if split_plate(plate)[1] is None:
+        for distance, plate_key in _keys_fuzzy.search(plate, max_distance):
+            found.setdefault(plate_key, {})[None] = distance
+
+    candidates = []
+    for plate_key, plates in found.items():
+        for pass_match in _index.get(plate_key, []):
+            distances = [distance for canonical_plate, distance in plates.items()
+                         if canonical_plate in (None, pass_match.canonical_plate)]
+            if distances:
+                candidates.append((min(distances), pass_match))
+    candidates.sort(key=lambda candidate: (
+        candidate[0], PASS_KINDS.index(candidate[1].kind), candidate[1].canonical_plate
+    ))
+    return candidates[:FUZZY_LIMIT]
+
+
+async def valid_passes(kinds=PASS_KINDS) -> tuple[tuple, list[PassMatch]]:
+    """
+    Все действующие пропуска указанных видов - из памяти.
+    Вместе с ними возвращает версию индекса, на которой они получены: (дата, номер изменения).
+    """
+    await _ensure_fresh()
+    passes = [
+        pass_match for plate_passes in _index.values() for pass_match in plate_passes
+        if pass_match.kind in kinds
+    ]
+    passes.sort(key=lambda pass_match: (PASS_KINDS.index(pass_match.kind), pass_match.canonical_plate))
+    return (_built_for, _version), passes
+
+
+async def index_version() -> tuple:
+    """Текущая версия индекса: (дата, номер изменения). После смены суток индекс сначала перестраивается."""
+    await _ensure_fresh()
+    return _built_for, _version
+
+
+async def rebuild_at_midnight():
+    """Фоновая задача: перестраивает индекс сразу после смены суток"""
+    while True:
+        now = datetime.datetime.now()
+        midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+        await asyncio.sleep((midnight - now).total_seconds() + 1)
+        try:
+            await rebuild_pass_index()
+        except Exception as e:
+            logging.error(f'Не удалось перестроить индекс пропусков: {e}')
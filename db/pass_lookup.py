@@ -0,0 +1,209 @@
+import datetime
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import select, union_all, case, func, or_, and_, null
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import FUTURE_LIMIT
+from db.models import PermanentPass, TemporaryPass, Resident, Contractor
+from plates import normalize_plate, split_plate
+
+
+# Виды пропусков в том порядке, в котором они выводятся охране
+PASS_KINDS = (
+    'resident_permanent',
+    'staff_permanent',
+    'resident_temporary',
+    'contractor_temporary',
+    'staff_temporary',
+)
+PERMANENT_KINDS = frozenset(PASS_KINDS[:2])
+TEMPORARY_KINDS = frozenset(PASS_KINDS[2:])
+
+
+@dataclass
+class PassMatch:
+    """Действующий пропуск вместе с данными владельца"""
+    kind: str
+    id: int
+    car_number: str
+    plate_key: Optional[str]
+    plate_region: Optional[str]
+    car_brand: Optional[str]
+    car_model: Optional[str]
+    car_owner: Optional[str]
+    vehicle_type: Optional[str]
+    cargo_type: Optional[str]
+    purpose: Optional[str]
+    destination: Optional[str]
+    visit_date: Optional[datetime.date]
+    valid_until: Optional[datetime.date]
+    owner_comment: Optional[str]
+    security_comment: Optional[str]
+    fio: Optional[str]
+    plot_number: Optional[str]
+    company: Optional[str]
+    position: Optional[str]
+
+    @property
+    def is_permanent(self) -> bool:
+        return self.kind in PERMANENT_KINDS
+
+    @property
+    def canonical_plate(self) -> str:
+        """Канонический номер вместе с регионом"""
+        return (self.plate_key or '') + (self.plate_region or '')
+
+
+def temporary_pass_validity(today: datetime.date):
+    """Условие действия временного пропуска: идет сейчас или начнется в пределах FUTURE_LIMIT"""
+    future_limit = today + datetime.timedelta(days=FUTURE_LIMIT)
+    return and_(
+        TemporaryPass.visit_date <= future_limit,
+        TemporaryPass.valid_until >= today
+    )
+
+
+def valid_passes_query(today: datetime.date, plate_condition=None, kinds=PASS_KINDS):
+    """
+    Один UNION ALL запрос по всем видам действующих пропусков.
+    plate_condition - функция, получающая модель пропуска и возвращающая условие отбора.
+    """
+    queries = []
+
+    if TEMPORARY_KINDS & set(kinds):
+        # Временные пропуска: выбираем первой, чтобы типы колонок (visit_date) брались отсюда
+        temp_query = select(
+            case(
+                (Resident.id.isnot(None), 'resident_temporary'),
+                (Contractor.id.isnot(None), 'contractor_temporary'),
+                else_='staff_temporary'
+            ).label('kind'),
+            TemporaryPass.id.label('id'),
+            TemporaryPass.car_number.label('car_number'),
+            TemporaryPass.plate_key.label('plate_key'),
+            TemporaryPass.plate_region.label('plate_region'),
+            TemporaryPass.car_brand.label('car_brand'),
+            null().label('car_model'),
+            null().label('car_owner'),
+            TemporaryPass.vehicle_type.label('vehicle_type'),
+            TemporaryPass.cargo_type.label('cargo_type'),
+            TemporaryPass.purpose.label('purpose'),
+            TemporaryPass.destination.label('destination'),
+            TemporaryPass.visit_date.label('visit_date'),
+            TemporaryPass.valid_until.label('valid_until'),
+            TemporaryPass.owner_comment.label('owner_comment'),
+            TemporaryPass.security_comment.label('security_comment'),
+            func.coalesce(Resident.fio, Contractor.fio).label('fio'),
+            Resident.plot_number.label('plot_number'),
+            Contractor.company.label('company'),
+            Contractor.position.label('position'),
+        ) \
+            .outerjoin(Resident, TemporaryPass.resident_id == Resident.id) \
+            .outerjoin(Contractor, TemporaryPass.contractor_id == Contractor.id) \
+            .where(
+            TemporaryPass.status == 'approved',
+            temporary_pass_validity(today),
+            or_(
+                Resident.id.isnot(None),
+                Contractor.id.isnot(None),
+                TemporaryPass.owner_type == 'staff'
+            )
+        )
+        if plate_condition is not None:
+            temp_query = temp_query.where(plate_condition(TemporaryPass))
+        queries.append(temp_query)
+
+    if PERMANENT_KINDS & set(kinds):
+        perm_query = select(
+            case(
+                (PermanentPass.resident_id.is_(None), 'staff_permanent'),
+                else_='resident_permanent'
+            ).label('kind'),
+            PermanentPass.id.label('id'),
+            PermanentPass.car_number.label('car_number'),
+            PermanentPass.plate_key.label('plate_key'),
+            PermanentPass.plate_region.label('plate_region'),
+            PermanentPass.car_brand.label('car_brand'),
+            PermanentPass.car_model.label('car_model'),
+            PermanentPass.car_owner.label('car_owner'),
+            null().label('vehicle_type'),
+            null().label('cargo_type'),
+            null().label('purpose'),
+            PermanentPass.destination.label('destination'),
+            null().label('visit_date'),
+            null().label('valid_until'),
+            null().label('owner_comment'),
+            PermanentPass.security_comment.label('security_comment'),
+            Resident.fio.label('fio'),
+            Resident.plot_number.label('plot_number'),
+            null().label('company'),
+            null().label('position'),
+        ) \
+            .outerjoin(Resident, PermanentPass.resident_id == Resident.id) \
+            .where(
+            PermanentPass.status == 'approved',
+            or_(PermanentPass.resident_id.is_(None), Resident.id.isnot(None))
+        )
+        if plate_condition is not None:
+            perm_query = perm_query.where(plate_condition(PermanentPass))
+        queries.append(perm_query)
+
+    if len(queries) == 1:
+        return queries[0]
+    return union_all(*queries)
+
+
+async def _fetch_passes(session: AsyncSession, query, kinds=PASS_KINDS) -> list[PassMatch]:
+    result = await session.execute(query)
+    passes = [PassMatch(**row._mapping) for row in result.all()]
+    passes = [pass_match for pass_match in passes if pass_match.kind in kinds]
+    passes.sort(key=lambda pass_match: PASS_KINDS.index(pass_match.kind))
+    return passes
+
+
+def plate_match_condition(model, car_number: str):
+    """
+    Условие точного совпадения номера по каноническому ключу.
+    Если регион не указан, подходят номера с любым регионом.
+    """
+    plate_key, plate_region = split_plate(car_number)
+    if plate_region is None:
+        return model.plate_key == plate_key
+    return and_(model.plate_key == plate_key, model.plate_region == plate_region)
+
+
+async def find_passes_by_number(session: AsyncSession, car_number: str,
+                                today: Optional[datetime.date] = None) -> list[PassMatch]:
+    """Все действующие пропуска с точным совпадением номера - один запрос к БД"""
+    today = today or datetime.datetime.now().date()
+    query = valid_passes_query(today, lambda model: plate_match_condition(model, car_number))
+    return await _fetch_passes(session, query)
+
+
+async def find_passes_by_plate_keys(session: AsyncSession, plate_keys,
+                                    today: Optional[datetime.date] = None) -> list[PassMatch]:
+    """Все действующие пропуска с любым из указанных ключей номера"""
+    today = today or datetime.datetime.now().date()
+    query = valid_passes_query(today, lambda model: model.plate_key.in_(list(plate_keys)))
+    return await _fetch_passes(session, query)
+
+
+async def find_passes_by_digits(session: AsyncSession, digits: str,
+                                today: Optional[datetime.date] = None) -> list[PassMatch]:
+    """Все действующие пропуска, номер которых содержит указанную часть"""
+    today = today or datetime.datetime.now().date()
+    part = normalize_plate(digits)
+    query = valid_passes_query(
+        today,
+        lambda model: (model.plate_key + func.coalesce(model.plate_region, '')).contains(part, autoescape=True)
+    )
+    return await _fetch_passes(session, query)
+
+
+async def find_valid_passes(session: AsyncSession, today: Optional[datetime.date] = None,
+                            kinds=PASS_KINDS) -> list[PassMatch]:
+    """Все действующие пропуска указанных видов"""
+    today = today or datetime.datetime.now().date()
+    return await _fetch_passes(session, valid_passes_query(today, kinds=kinds), kinds)
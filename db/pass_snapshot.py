@@ -0,0 +1,70 @@
+import asyncio
+import datetime
+import logging
+from typing import Optional
+
+from config import SNAPSHOT_PATH, SNAPSHOT_INTERVAL
+from db.pass_index import index_version, lookup_plate, valid_passes
+from db.pass_lookup import PassMatch
+from executor import run_in_thread
+from snapshot import Snapshot, SnapshotError, open_snapshot, write_snapshot
+
+
+# Снимок действующих пропусков на диске (формат - snapshot.py).
+# Бот открывает последний снимок при старте и переписывает его после каждого изменения индекса
+# пропусков (проверка раз в SNAPSHOT_INTERVAL секунд). Если индекс недоступен (не удалось перестроить
+# из БД), поиск на КПП отвечает по снимку.
+
+_snapshot: Optional[Snapshot] = None
+# Версия индекса, с которой записан текущий снимок
+_written_version: Optional[tuple] = None
+
+
+def load_snapshot():
+    """Открывает снимок с диска, если он есть - без чтения записей"""
+    global _snapshot
+    try:
+        _snapshot = open_snapshot(SNAPSHOT_PATH)
+    except SnapshotError as e:
+        logging.error(f'Снимок пропусков не открыт: {e}')
+        return
+    if _snapshot is not None:
+        logging.info(f'Открыт снимок пропусков от {_snapshot.generated_at}: {len(_snapshot)} пропусков')
+
+
+async def write_pass_snapshot():
+    """Записывает снимок по текущему индексу пропусков и переключается на него"""
+    global _snapshot, _written_version
+    version, passes = await valid_passes()
+    await run_in_thread(write_snapshot, SNAPSHOT_PATH, passes, version[0])
+    previous, _snapshot = _snapshot, Snapshot(SNAPSHOT_PATH)
+    _written_version = version
+    if previous is not None:
+        previous.close()
+
+
+async def keep_snapshot_fresh():
+    """Фоновая задача: переписывает снимок, когда меняется индекс пропусков"""
+    while True:
+        try:
+            if await index_version() != _written_version:
+                await write_pass_snapshot()
+        except Exception as e:
+            logging.error(f'Не удалось записать снимок пропусков: {e}')
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+
+
+async def lookup_plate_or_snapshot(car_number: str) -> list[PassMatch]:
+    """Поиск по индексу пропусков, а если индекс недоступен - по последнему снимку"""
+    try:
+        return await lookup_plate(car_number)
+    except Exception as e:
+        if _snapshot is None:
+            raise
+        logging.error(f'Индекс пропусков недоступен, поиск по снимку от {_snapshot.generated_at}: {e}')
+        # Снимок мог быть построен в прошлые сутки - истекшие временные пропуска отбрасываем
+        today = datetime.datetime.now().date()
+        return [
+            PassMatch(**record) for record in _snapshot.lookup(car_number)
+            if record['valid_until'] is None or record['valid_until'] >= today
+        ]
@@ -0,0 +1,84 @@
+from sqlalchemy import select, literal, union_all
+
+from config import ADMIN_IDS
+from db.models import Manager, Security, Resident, Contractor
+from db.session import session_scope
+
+
+# Роли, которые хранятся в БД (администраторы задаются через ADMIN_IDS)
+ROLE_MODELS = {
+    'manager': Manager,
+    'security': Security,
+    'resident': Resident,
+    'contractor': Contractor,
+}
+# Производные роли: администратор из ADMIN_IDS и сотрудник УК (администратор или менеджер)
+ADMIN = 'admin'
+STAFF = 'staff'
+
+# tg_id -> множество активных ролей пользователя
+_roles: dict[int, frozenset[str]] = {}
+
+
+async def _fetch_roles(tg_ids=None) -> dict[int, set[str]]:
+    """Одним запросом получает активные роли (всех пользователей или только указанных)"""
+    queries = []
+    for role, model in ROLE_MODELS.items():
+        query = select(literal(role).label('role'), model.tg_id.label('tg_id')).where(
+            model.status == True,
+            model.tg_id.isnot(None)
+        )
+        if tg_ids is not None:
+            query = query.where(model.tg_id.in_(tg_ids))
+        queries.append(query)
+
+    async with session_scope() as session:
+        result = await session.execute(union_all(*queries))
+
+    roles = {}
+    for role, tg_id in result.all():
+        roles.setdefault(tg_id, set()).add(role)
+    return roles
+
+
+async def load_roles():
+    """Полностью загружает реестр ролей из БД. Вызывается один раз при старте бота."""
+    global _roles
+    roles = await _fetch_roles()
+    _roles = {tg_id: frozenset(user_roles) for tg_id, user_roles in roles.items()}
+
+
+async def refresh_roles(*tg_ids):
+    """
+    Перечитывает роли указанных пользователей.
+    Вызывается после коммита, изменившего status или tg_id у менеджера, СБ, резидента или подрядчика.
+    """
+    tg_ids = {tg_id for tg_id in tg_ids if tg_id is not None}
+    if not tg_ids:
+        return
+
+    roles = await _fetch_roles(tg_ids)
+    for tg_id in tg_ids:
+        if tg_id in roles:
+            _roles[tg_id] = frozenset(roles[tg_id])
+        else:
+            _roles.pop(tg_id, None)
+
+
+def get_roles(tg_id: int) -> frozenset[str]:
+    """Возвращает роли пользователя без обращения к БД"""
+    return _roles.get(tg_id, frozenset())
+
+
+def has_role(tg_id: int, role: str) -> bool:
+    return role in _roles.get(tg_id, ())
+
+
+def resolve_roles(tg_id: int) -> frozenset[str]:
+    """Роли пользователя вместе с производными admin и staff"""
+    roles = _roles.get(tg_id, frozenset())
+    if tg_id in ADMIN_IDS:
+        return roles | {ADMIN, STAFF}
+    if 'manager' in roles:
+        return roles | {STAFF}
+    return roles
@@ -0,0 +1,81 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from db.models import AsyncSessionLocal, engine
+
+
+# Единица работы: одна сессия и одно соединение на обновление Telegram.
+# SessionMiddleware (middlewares.py) открывает единицу работы на время обработки обновления,
+# а хендлеры, db/util.py и реестры получают ее сессию через session_scope(). Соединение берется
+# из пула при первом обращении к БД и держится до конца обновления, промежуточные коммиты
+# хендлеров его не возвращают. В конце обновления сессия коммитится (при ошибке - откатывается).
+# Вне обновления (планировщик, рассылка, старт бота) session_scope() открывает отдельную сессию.
+
+
+class _UnitOfWork:
+    def __init__(self):
+        # Задача, обрабатывающая обновление: задачи, запущенные из хендлера, наследуют контекст,
+        # но не должны использовать эту сессию параллельно с ней
+        self.task = asyncio.current_task()
+        self.connection: Optional[AsyncConnection] = None
+        self.session: Optional[AsyncSession] = None
+
+    async def get_session(self) -> AsyncSession:
+        if self.session is None:
+            self.connection = await engine.connect()
+            self.session = AsyncSessionLocal(bind=self.connection)
+        return self.session
+
+    async def finish(self, commit: bool):
+        if self.session is None:
+            return
+        try:
+            if commit:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+        finally:
+            await self.session.close()
+            await self.connection.close()
+
+
+_current: ContextVar[Optional[_UnitOfWork]] = ContextVar('unit_of_work', default=None)
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[None]:
+    """Единица работы на время обработки одного обновления: коммит в конце, откат при ошибке"""
+    unit = _UnitOfWork()
+    token = _current.set(unit)
+    try:
+        yield
+    except BaseException:
+        _current.reset(token)
+        await unit.finish(commit=False)
+        raise
+    _current.reset(token)
+    await unit.finish(commit=True)
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """
+    Сессия текущего обновления, если она есть, иначе - новая сессия.
+    Сессию обновления не закрывает; при ошибке внутри блока откатывает ее транзакцию.
+    """
+    unit = _current.get()
+    if unit is None or unit.task is not asyncio.current_task():
+        async with AsyncSessionLocal() as session:
+            yield session
+        return
+
+    session = await unit.get_session()
+    try:
+        yield session
+    except BaseException:
+        await session.rollback()
+        raise
@@ -0,0 +1,118 @@
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import select, func, case
+
+from db.models import Resident, Contractor, PermanentPass, TemporaryPass, ReadSessionLocal
+
+
+# Материализованные счетчики для экрана статистики: (раздел, статус) -> количество.
+# Разделы: 'resident' и 'contractor' (статус True/False), 'permanent' и 'temporary' (статус заявки).
+# Счетчики пропусков обновляются обработчиками через count_pass после коммита.
+# Изменения резидентов и подрядчиков сбрасывают счетчики целиком (invalidate_statistics),
+# TTL - страховка на случай изменений в обход бота (import.py, ручные правки БД).
+STATISTICS_TTL = 3600
+PASS_STATUSES = ('pending', 'approved', 'rejected')
+
+_counters: Optional[Counter] = None
+_loaded_at = 0.0
+
+
+@dataclass
+class Statistics:
+    total_residents: int
+    registered_residents: int
+    total_contractors: int
+    registered_contractors: int
+    permanent: dict[str, int]
+    temporary: dict[str, int]
+
+    @property
+    def unregistered_residents(self) -> int:
+        return self.total_residents - self.registered_residents
+
+    @property
+    def unregistered_contractors(self) -> int:
+        return self.total_contractors - self.registered_contractors
+
+    @property
+    def total_permanent(self) -> int:
+        return sum(self.permanent.values())
+
+    @property
+    def total_temporary(self) -> int:
+        return sum(self.temporary.values())
+
+    def passes(self, status: str) -> int:
+        """Постоянные и временные пропуска с указанным статусом"""
+        return self.permanent.get(status, 0) + self.temporary.get(status, 0)
+
+
+async def _count_users(session, model) -> tuple[int, int]:
+    """Всего и зарегистрированных - одним проходом по таблице"""
+    row = (await session.execute(
+        select(func.count(model.id), func.sum(case((model.status == True, 1), else_=0)))
+    )).one()
+    return row[0], row[1] or 0
+
+
+async def _count_passes(session, model) -> dict[str, int]:
+    result = await session.execute(select(model.status, func.count(model.id)).group_by(model.status))
+    return dict(result.all())
+
+
+async def load_statistics():
+    """Пересчитывает все счетчики: по одному агрегирующему запросу на таблицу"""
+    global _counters, _loaded_at
+    counters = Counter()
+    async with ReadSessionLocal() as session:
+        for section, model in (('resident', Resident), ('contractor', Contractor)):
+            total, registered = await _count_users(session, model)
+            counters[section, True] = registered
+            counters[section, False] = total - registered
+        for section, model in (('permanent', PermanentPass), ('temporary', TemporaryPass)):
+            for status, count in (await _count_passes(session, model)).items():
+                counters[section, status] = count
+    _counters = counters
+    _loaded_at = time.monotonic()
+
+
+def invalidate_statistics():
+    """Сбрасывает счетчики: они будут пересчитаны при следующем открытии статистики"""
+    global _counters
+    _counters = None
+
+
+def count_pass(kind: str, old_status: Optional[str], new_status: Optional[str]):
+    """
+    Учитывает смену статуса пропуска ('permanent' или 'temporary').
+    old_status=None - пропуск создан, new_status=None - пропуск удален.
+    """
+    if _counters is None or old_status == new_status:
+        return
+    if old_status is not None:
+        _counters[kind, old_status] -= 1
+    if new_status is not None:
+        _counters[kind, new_status] += 1
+
+
+def _pass_counters(kind: str) -> dict[str, int]:
+    counters = dict.fromkeys(PASS_STATUSES, 0)
+    counters.update({status: count for (section, status), count in _counters.items() if section == kind})
+    return counters
+
+
+async def get_statistics() -> Statistics:
+    """Статистика из счетчиков; БД читается только если счетчики сброшены или устарели"""
+    if _counters is None or time.monotonic() - _loaded_at > STATISTICS_TTL:
+        await load_statistics()
+    return Statistics(
+        total_residents=_counters['resident', True] + _counters['resident', False],
+        registered_residents=_counters['resident', True],
+        total_contractors=_counters['contractor', True] + _counters['contractor', False],
+        registered_contractors=_counters['contractor', True],
+        permanent=_pass_counters('permanent'),
+        temporary=_pass_counters('temporary'),
+    )
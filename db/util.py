@@ -1,48 +1,68 @@
 import datetime
 import re
+import time
 
 from sqlalchemy import select, insert, update
 
 from config import ADMIN_IDS
-from db.models import User, AsyncSessionLocal, Manager, Security
+from db.models import User, Manager, Security
+from db.session import session_scope
+from db.writer import submit_write
 
 
 async def add_user_to_db(user_id, username, first_name, last_name, time_start):
-    async with AsyncSessionLocal() as session:
-        try:
-            result = await session.execute(select(User).where(User.id == user_id))
-            if not result.scalars().first():
-                session.add(User(
-                    id=user_id,
-                    username=username,
-                    first_name=first_name,
-                    last_name=last_name,
-                    time_start=time_start
-                ))
-                await session.commit()
-        except Exception as e:
-            print(e)
-            await session.rollback()
+    async def add(session):
+        result = await session.execute(select(User).where(User.id == user_id))
+        if not result.scalars().first():
+            session.add(User(
+                id=user_id,
+                username=username,
+                first_name=first_name,
+                last_name=last_name,
+                time_start=time_start
+            ))
+
+    try:
+        await submit_write(add)
+    except Exception as e:
+        print(e)
+
+
+async def _set_user_active(id, value: bool):
+    async def set_active(session):
+        await session.execute(update(User).where(User.id == id).values(is_active=value))
+
+    try:
+        await submit_write(set_active)
+    except Exception as e:
+        print(e)
 
 
 async def update_user_blocked(id):
-    async with AsyncSessionLocal() as session:
-        try:
-            stmt = update(User).where(User.id == id).values(is_active=False)
-            session.execute(stmt)
-            session.commit()
-        except Exception as e:
-            print(e)
+    await _set_user_active(id, False)
 
 
 async def update_user_unblocked(id):
-    async with AsyncSessionLocal() as session:
-        try:
-            stmt = update(User).where(User.id == id).values(is_active=True)
-            session.execute(stmt)
-            session.commit()
-        except Exception as e:
-            print(e)
+    await _set_user_active(id, True)
+
+
+async def set_pass_status(model, pass_id: int, status: str, **values):
+    """
+    Меняет статус пропуска (и переданные поля) через писателя.
+    Возвращает (пропуск, прежний статус), если пропуск не найден - (None, None).
+    """
+    async def change(session):
+        pass_request = await session.get(model, pass_id)
+        if not pass_request:
+            return None, None
+        old_status = pass_request.status
+        pass_request.status = status
+        pass_request.time_registration = datetime.datetime.now()
+        for name, value in values.items():
+            setattr(pass_request, name, value)
+        return pass_request, old_status
+
+    return await submit_write(change)
 
 
 async def is_active(user_id: int) -> bool:
@@ -51,7 +71,7 @@ async def is_active(user_id: int) -> bool:
     Возвращает значение поля is_active (True/False)
     Если пользователь не найден - возвращает False
     """
-    async with AsyncSessionLocal() as session:
+    async with session_scope() as session:
         try:
             result = await session.execute(
                 select(User.is_active).where(User.id == int(user_id)))
@@ -62,52 +82,65 @@ async def is_active(user_id: int) -> bool:
             return False
 
 
-async def get_active_admins_and_managers_tg_ids() -> list[int]:
-    """
-    Получает список Telegram ID всех активных администраторов и менеджеров.
+# Кэш получателей уведомлений: ключ -> (момент загрузки, список tg_id).
+# Сбрасывается явно при регистрации и удалении менеджеров и СБ (invalidate_recipients),
+# TTL - страховка на случай изменений в обход бота.
+RECIPIENTS_TTL = 600
+_recipients: dict[str, tuple[float, list[int]]] = {}
+
+
+def invalidate_recipients():
+    """Сбрасывает кэш получателей. Вызывается после коммита, изменившего менеджеров или СБ."""
+    _recipients.clear()
 
-    Returns:
-        list[int]: Список уникальных Telegram ID
-    """
-    async with AsyncSessionLocal() as session:
 
-        # Запрос для менеджеров (статус True и заполненный tg_id)
-        managers_query = select(Manager.tg_id).where(
+async def _fetch_recipients(with_security: bool) -> list[int]:
+    async with session_scope() as session:
+        # Менеджеры (статус True и заполненный tg_id)
+        query = select(Manager.tg_id).where(
             Manager.status == True,
             Manager.tg_id.isnot(None)
         )
-        managers_result = await session.execute(managers_query)
-        managers_ids = managers_result.scalars().all()
+        if with_security:
+            query = query.union(
+                select(Security.tg_id).where(
+                    Security.status == True,
+                    Security.tg_id.isnot(None)
+                )
+            )
+        result = await session.execute(query)
+        staff_ids = result.scalars().all()
 
-        # Объединение и удаление дубликатов
-        all_ids = set(ADMIN_IDS) | set(managers_ids)
-        return list(all_ids)
+    # Объединение и удаление дубликатов
+    return list(set(ADMIN_IDS) | set(staff_ids))
 
 
-async def get_active_admins_managers_sb_tg_ids() -> list[int]:
+async def _get_recipients(key: str, with_security: bool) -> list[int]:
+    cached = _recipients.get(key)
+    if cached and time.monotonic() - cached[0] < RECIPIENTS_TTL:
+        return cached[1]
+    tg_ids = await _fetch_recipients(with_security)
+    _recipients[key] = (time.monotonic(), tg_ids)
+    return tg_ids
+
+
+async def get_active_admins_and_managers_tg_ids() -> list[int]:
     """
     Получает список Telegram ID всех активных администраторов и менеджеров.
+    Список кэшируется, см. invalidate_recipients.
 
     Returns:
         list[int]: Список уникальных Telegram ID
     """
-    async with AsyncSessionLocal() as session:
+    return await _get_recipients('admins_managers', with_security=False)
 
-        # Запрос для менеджеров (статус True и заполненный tg_id)
-        managers_query = select(Manager.tg_id).where(
-            Manager.status == True,
-            Manager.tg_id.isnot(None)
-        )
-        managers_result = await session.execute(managers_query)
-        managers_ids = managers_result.scalars().all()
 
-        security_query = select(Security.tg_id).where(
-            Security.status == True,
-            Security.tg_id.isnot(None)
-        )
-        security_result = await session.execute(security_query)
-        security_ids = security_result.scalars().all()
+async def get_active_admins_managers_sb_tg_ids() -> list[int]:
+    """
+    Получает список Telegram ID всех активных администраторов, менеджеров и СБ.
+    Список кэшируется, см. invalidate_recipients.
 
-        # Объединение и удаление дубликатов
-        all_ids = set(ADMIN_IDS) | set(managers_ids) | set(security_ids)
-        return list(all_ids)
+    Returns:
+        list[int]: Список уникальных Telegram ID
+    """
+    return await _get_recipients('admins_managers_sb', with_security=True)
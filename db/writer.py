@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from db.engine import create_engine
+
+
+# Единственный писатель SQLite с групповыми коммитами.
+# Хендлеры не пишут в БД параллельно и не дерутся за блокировку записи: операции записи
+# ставятся в очередь, а одна задача выполняет их пачками - все операции, накопившиеся за
+# WRITE_WINDOW, в одной транзакции с одним COMMIT. Каждая операция выполняется в своем SAVEPOINT,
+# поэтому ошибка одной операции откатывает только ее, а не всю пачку.
+#
+#   async def save(session):
+#       session.add(new_pass)
+#   await submit_write(save)
+#
+# Операция получает сессию писателя и не должна ждать ничего, кроме запросов к БД
+# (никаких сообщений в Telegram): пока она выполняется, остальные записи ждут.
+
+# Сколько ждать следующие операции, прежде чем закоммитить пачку (секунды)
+WRITE_WINDOW = 0.002
+MAX_BATCH = 200
+QUEUE_SIZE = 10000
+
+T = TypeVar('T')
+
+# Отдельное соединение писателя. pysqlite сам не открывает транзакцию до первого изменения
+# и ломает SAVEPOINT, поэтому транзакцию открываем явно: BEGIN IMMEDIATE сразу берет
+# блокировку записи и не дает транзакции упасть с "database is locked" посередине пачки.
+_engine = create_engine(pool_size=1, max_overflow=0)
+
+
+@event.listens_for(_engine.sync_engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(_engine.sync_engine, 'begin')
+def _on_begin(conn):
+    conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+_Session = async_sessionmaker(_engine, expire_on_commit=False)
+
+
+@dataclass
+class _Write:
+    operation: Callable[[AsyncSession], Awaitable[Any]]
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+_queue: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+_task: Optional[asyncio.Task] = None
+
+
+async def submit_write(operation: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """
+    Выполняет operation(session) в очередной пачке писателя и возвращает ее результат после коммита.
+    Возвращенные ORM-объекты отсоединены от сессии, загруженные атрибуты доступны.
+    """
+    write = _Write(operation)
+    await _queue.put(write)
+    return await write.future
+
+
+async def _collect_batch() -> list[_Write]:
+    batch = [await _queue.get()]
+    deadline = asyncio.get_running_loop().time() + WRITE_WINDOW
+    while len(batch) < MAX_BATCH:
+        if _queue.empty():
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        else:
+            batch.append(_queue.get_nowait())
+    return batch
+
+
+async def _commit_batch(batch: list[_Write]):
+    try:
+        async with _Session() as session:
+            async with session.begin():
+                for write in batch:
+                    if write.future.cancelled():
+                        continue
+                    try:
+                        async with session.begin_nested():
+                            write.result = await write.operation(session)
+                    except Exception as e:
+                        write.error = e
+    except Exception as e:
+        # Не удался сам коммит: ни одна операция пачки не сохранена
+        logging.error(f'Групповой коммит из {len(batch)} операций не удался: {e}')
+        for write in batch:
+            if write.error is None:
+                write.error = e
+
+    for write in batch:
+        if write.future.done():
+            continue
+        if write.error is not None:
+            write.future.set_exception(write.error)
+        else:
+            write.future.set_result(write.result)
+
+
+async def _run():
+    while True:
+        batch = await _collect_batch()
+        try:
+            await _commit_batch(batch)
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def start_writer():
+    """Запускает писателя. Вызывается один раз при старте бота."""
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_run())
+
+
+async def stop_writer():
+    """Дописывает очередь и останавливает писателя"""
+    global _task
+    if _task is None:
+        return
+    await _queue.join()
+    _task.cancel()
+    _task = None
+    await _engine.dispose()
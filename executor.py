@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+# Общие пулы для тяжелой работы, которую нельзя выполнять в event loop бота:
+# - потоки - для работы с файлами и библиотеками, отпускающими GIL (запись xlsx, сохранение файлов);
+# - процессы - для чистого Python-форматирования больших объемов текста.
+# Число одновременно поставленных задач ограничено: лишние ждут места в очереди,
+# и время ожидания входит в таймаут задачи.
+THREAD_WORKERS = 4
+PROCESS_WORKERS = 2
+# Сколько задач может ждать свободного воркера сверх числа воркеров
+QUEUE_LIMIT = 32
+# Таймаут задачи по умолчанию (секунды)
+DEFAULT_TIMEOUT = 300
+# Как часто метрики пулов пишутся в лог (секунды)
+METRICS_LOG_INTERVAL = 600
+
+
+@dataclass
+class PoolMetrics:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    queued: int = 0
+    running: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.completed if self.completed else 0.0
+
+    def summary(self) -> str:
+        return (f'задач {self.submitted}, выполнено {self.completed}, ошибок {self.failed}, '
+                f'таймаутов {self.timed_out}, в очереди {self.queued}, выполняется {self.running}, '
+                f'время среднее {self.avg_time:.2f} с, максимальное {self.max_time:.2f} с')
+
+
+class _Pool:
+    def __init__(self, name: str, workers: int, factory: Callable[[int], Executor]):
+        self.name = name
+        self.workers = workers
+        self.factory = factory
+        self.executor: Optional[Executor] = None
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.metrics = PoolMetrics()
+
+    def _ensure_started(self):
+        if self.executor is None:
+            self.executor = self.factory(self.workers)
+            self.slots = asyncio.Semaphore(self.workers + QUEUE_LIMIT)
+
+    async def _run(self, func: Callable, args: tuple):
+        self.metrics.queued += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.metrics.queued -= 1
+        slots = self.slots
+        self.metrics.running += 1
+        started_at = time.monotonic()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        except BaseException:
+            self.metrics.running -= 1
+            slots.release()
+            raise
+        # Место в очереди освобождается, когда задача действительно завершилась в пуле, а не когда
+        # вызывающий код перестал ее ждать: по таймауту отменяется только ожидание (shield), не задача
+        future.add_done_callback(lambda done: self._finished(done, slots, started_at))
+        return await asyncio.shield(future)
+
+    def _finished(self, future: asyncio.Future, slots: asyncio.Semaphore, started_at: float):
+        self.metrics.running -= 1
+        slots.release()
+        if future.cancelled() or future.exception() is not None:
+            return
+        elapsed = time.monotonic() - started_at
+        self.metrics.completed += 1
+        self.metrics.total_time += elapsed
+        self.metrics.max_time = max(self.metrics.max_time, elapsed)
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = DEFAULT_TIMEOUT):
+        self._ensure_started()
+        self.metrics.submitted += 1
+        try:
+            return await asyncio.wait_for(self._run(func, args), timeout)
+        except asyncio.TimeoutError:
+            # Уже запущенную в пуле задачу прервать нельзя, вызывающий код просто перестает ее ждать
+            self.metrics.timed_out += 1
+            logging.error(f'Пул {self.name}: задача {getattr(func, "__name__", func)} превысила таймаут {timeout} с')
+            raise
+        except Exception:
+            self.metrics.failed += 1
+            raise
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            self.slots = None
+
+
+_threads = _Pool('threads', THREAD_WORKERS, lambda workers: ThreadPoolExecutor(workers, thread_name_prefix='bot-worker'))
+# spawn: дочерние процессы не наследуют состояние event loop и открытые соединения с БД
+_processes = _Pool(
+    'processes', PROCESS_WORKERS,
+    lambda workers: ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+)
+
+
+async def run_in_thread(func: Callable, *args, timeout: Optional[float] = DEFAULT_TIMEOUT):
+    """Выполняет func(*args) в общем пуле потоков"""
+    return await _threads.run(func, *args, timeout=timeout)
+
+
+async def run_in_process(func: Callable, *args, timeout: Optional[float] = DEFAULT_TIMEOUT):
+    """
+    Выполняет func(*args) в общем пуле процессов.
+    func должна быть функцией уровня модуля, аргументы и результат - сериализуемыми (pickle).
+    """
+    return await _processes.run(func, *args, timeout=timeout)
+
+
+def get_metrics() -> dict[str, PoolMetrics]:
+    return {pool.name: pool.metrics for pool in (_threads, _processes)}
+
+
+async def log_metrics():
+    """Фоновая задача: периодически пишет метрики пулов в лог, если в пулы что-то ставилось"""
+    while True:
+        await asyncio.sleep(METRICS_LOG_INTERVAL)
+        for name, metrics in get_metrics().items():
+            if metrics.submitted:
+                logging.info(f'Пул {name}: {metrics.summary()}')
+
+
+def shutdown_executors():
+    """Останавливает пулы. Вызывается при остановке бота."""
+    for pool in (_threads, _processes):
+        pool.shutdown()
@@ -1,40 +1,229 @@
+import argparse
 import asyncio
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import select
-import pandas as pd
+import csv
+import datetime
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union
+
+from openpyxl import Workbook
+from sqlalchemy import select, Boolean, Date, DateTime, Float, Integer, Table
 
 from db import models
+from db.engine import create_engine
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# Выгрузка таблиц БД в файлы.
+# Таблицы читаются пачками (server-side stream) и пишутся по мере чтения, каждая таблица -
+# в отдельном процессе. В режиме --since выгружаются только строки, созданные или измененные
+# после указанного момента (колонка updated_at, есть во всех таблицах); --since last - после прошлой
+# выгрузки этой же таблицы, метки хранятся по таблицам в WATERMARK_FILE.
+#
+#   python export.py                         # все таблицы в export_import/*.xlsx
+#   python export.py --format csv --since last
+#   python export.py --format parquet --tables temporary_pass permanent_pass --output dumps
+
+EXPORT_DIR = "export_import"
+CHUNK_SIZE = 5000
+# Время начала последней выгрузки каждой таблицы - для --since last: {таблица: ISO-время}
+WATERMARK_FILE = ".last_export.json"
+# Значение since: с прошлой выгрузки каждой таблицы
+SINCE_LAST = "last"
+FORMATS = ("xlsx", "csv", "parquet")
+
+
+class XlsxWriter:
+    def __init__(self, path: str, table: Table):
+        self.path = path
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet(table.name)
+        self.ws.append([column.name for column in table.columns])
+
+    def write(self, rows):
+        for row in rows:
+            self.ws.append(tuple(row))
+
+    def close(self):
+        self.wb.save(self.path)
+
+
+class CsvWriter:
+    def __init__(self, path: str, table: Table):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([column.name for column in table.columns])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column.type, Integer):
+        return pyarrow.int64()
+    if isinstance(column.type, Float):
+        return pyarrow.float64()
+    if isinstance(column.type, DateTime):
+        return pyarrow.timestamp("us")
+    if isinstance(column.type, Date):
+        return pyarrow.date32()
+    return pyarrow.string()
+
+
+class ParquetWriter:
+    def __init__(self, path: str, table: Table):
+        self.schema = pyarrow.schema([(column.name, _arrow_type(column)) for column in table.columns])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        # Пачка разворачивается по колонкам и пишется одной row group
+        columns = list(zip(*rows))
+        arrays = [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)]
+        self.writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"xlsx": XlsxWriter, "csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def _changed_since(table: Table, since: datetime.datetime):
+    """Условие "строка создана или изменена после since" """
+    return table.c.updated_at > since
+
+
+async def _export_table(table_name: str, path: str, file_format: str, since: Optional[datetime.datetime]) -> int:
+    table = models.Base.metadata.tables[table_name]
+    query = select(table).order_by(*table.primary_key.columns)
+    if since is not None:
+        query = query.where(_changed_since(table, since))
+
+    engine = create_engine(read_only=True)
+    # Пишем во временный файл и переименовываем в конце, чтобы не оставить обрезанный файл
+    tmp_path = f"{path}.tmp"
+    writer = WRITERS[file_format](tmp_path, table)
+    count = 0
+    try:
+        async with engine.connect() as conn:
+            result = await conn.stream(query.execution_options(yield_per=CHUNK_SIZE))
+            async for rows in result.partitions():
+                writer.write(rows)
+                count += len(rows)
+        writer.close()
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        await engine.dispose()
+    return count
+
+
+def export_table(table_name: str, path: str, file_format: str, since: Optional[datetime.datetime]) -> tuple:
+    """Выгружает одну таблицу (выполняется в отдельном процессе). Возвращает (таблица, строк, секунд)."""
+    started_at = time.monotonic()
+    count = asyncio.run(_export_table(table_name, path, file_format, since))
+    return table_name, count, time.monotonic() - started_at
+
+
+def _read_watermarks(output: str) -> dict[str, datetime.datetime]:
+    path = os.path.join(output, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        return {table_name: datetime.datetime.fromisoformat(moment) for table_name, moment in json.load(file).items()}
+
+
+def _write_watermarks(output: str, watermarks: dict[str, datetime.datetime]):
+    path = os.path.join(output, WATERMARK_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+        json.dump({table_name: moment.isoformat() for table_name, moment in sorted(watermarks.items())},
+                  file, indent=1)
+    os.replace(f"{path}.tmp", path)
+
+
+def _file_name(table_name: str, file_format: str, since: Optional[datetime.datetime]) -> str:
+    """Полная выгрузка - table.xlsx (ее читает import.py), инкрементальная - с меткой watermark"""
+    if since is None:
+        return f"{table_name}.{file_format}"
+    return f"{table_name}_since_{since:%Y%m%d_%H%M%S}.{file_format}"
+
+
+def export_tables(output: str = EXPORT_DIR, file_format: str = "xlsx", tables: Optional[list] = None,
+                  since: Union[datetime.datetime, str, None] = None, jobs: Optional[int] = None):
+    """since - момент, SINCE_LAST (с прошлой выгрузки каждой таблицы) или None (все строки)"""
+    if file_format == "parquet" and pyarrow is None:
+        raise SystemExit("Для формата parquet нужен пакет pyarrow")
+
+    os.makedirs(output, exist_ok=True)
+    table_names = tables or [table.name for table in models.Base.metadata.sorted_tables]
+    unknown = set(table_names) - set(models.Base.metadata.tables)
+    if unknown:
+        raise SystemExit(f"Нет таблиц: {', '.join(sorted(unknown))}")
 
+    watermarks = _read_watermarks(output)
+    if since == SINCE_LAST:
+        table_since = {table_name: watermarks.get(table_name) for table_name in table_names}
+        never_exported = [table_name for table_name, moment in table_since.items() if moment is None]
+        if never_exported:
+            print(f"Прошлая выгрузка не найдена, выгружаем все строки: {', '.join(never_exported)}")
+    else:
+        table_since = dict.fromkeys(table_names, since)
 
-async def export_tables_to_excel():
-    # Создаем асинхронное подключение к БД
-    engine = create_async_engine(models.con_string)
-    AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    started = datetime.datetime.now()
+    started_at = time.monotonic()
+    with ProcessPoolExecutor(jobs) as pool:
+        futures = [
+            pool.submit(export_table, table_name,
+                        os.path.join(output, _file_name(table_name, file_format, table_since[table_name])),
+                        file_format, table_since[table_name])
+            for table_name in table_names
+        ]
+        total = 0
+        for future in futures:
+            table_name, count, elapsed = future.result()
+            total += count
+            print(f"Таблица {table_name}: {count} строк за {elapsed:.2f} с")
 
-    async with AsyncSessionLocal() as session:
-        # Получаем список всех таблиц из метаданных
-        tables = models.Base.metadata.tables
+    # Метка таблицы сдвигается, только если выгрузка не оставила пропуска после прошлой метки
+    for table_name, moment in table_since.items():
+        previous = watermarks.get(table_name)
+        if moment is None or (previous is not None and moment <= previous):
+            watermarks[table_name] = started
+    _write_watermarks(output, watermarks)
+    print(f"Экспортировано {total} строк в {output} за {time.monotonic() - started_at:.2f} с")
 
-        for table_name, table_obj in tables.items():
-            # Формируем запрос для выбора всех данных из таблицы
-            query = select(table_obj)
-            result = await session.execute(query)
-            rows = result.mappings().all()
 
-            if rows:
-                # Конвертируем в DataFrame
-                df = pd.DataFrame(rows)
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка таблиц БД")
+    parser.add_argument("--format", choices=FORMATS, default="xlsx", dest="file_format")
+    parser.add_argument("--output", default=EXPORT_DIR, help="каталог для файлов (создается при необходимости)")
+    parser.add_argument("--tables", nargs="+", help="какие таблицы выгружать (по умолчанию все)")
+    parser.add_argument("--since", help="только строки, созданные или измененные после даты "
+                                        "(YYYY-MM-DD[THH:MM:SS]) или после прошлой выгрузки каждой таблицы (last)")
+    parser.add_argument("--jobs", type=int, help="число процессов (по умолчанию по числу ядер)")
+    args = parser.parse_args()
 
-                # Сохраняем в Excel
-                excel_file = f"export_import/{table_name}.xlsx"
-                df.to_excel(excel_file, index=False)
-                print(f"Таблица {table_name} экспортирована в {excel_file}")
-            else:
-                print(f"Таблица {table_name} пуста")
+    since = args.since
+    if since and since != SINCE_LAST:
+        since = datetime.datetime.fromisoformat(since)
 
-    await engine.dispose()
+    export_tables(args.output, args.file_format, args.tables, since, args.jobs)
 
 
 if __name__ == "__main__":
-    asyncio.run(export_tables_to_excel())
\ No newline at end of file
+    main()
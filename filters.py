@@ -1,89 +1,33 @@
 from aiogram.filters import BaseFilter
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, InlineQuery
 from typing import Union
-from sqlalchemy import select
 
-from config import ADMIN_IDS
-from db.models import (
-    AsyncSessionLocal,
-    Manager,
-    Security,
-    Resident,
-    Contractor
-)
+from db.roles import STAFF
 
 
-class IsAdminOrManager(BaseFilter):
-    async def __call__(self, event: Union[Message, CallbackQuery]) -> bool:
-        user_id = event.from_user.id
+# Роли отправителя уже определены RoleMiddleware (routing.py) и переданы в data['roles']
 
-        # Проверка на администратора
-        if user_id in ADMIN_IDS:
-            return True
 
-        # Проверка на менеджера
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(Manager)
-                .where(
-                    Manager.tg_id == user_id,
-                    Manager.status == True
-                )
-            )
-            return result.scalar() is not None
+class IsAdminOrManager(BaseFilter):
+    async def __call__(self, event: Union[Message, CallbackQuery], roles: frozenset[str] = frozenset()) -> bool:
+        return STAFF in roles
 
 
 class IsManager(BaseFilter):
-    async def __call__(self, event: Union[Message, CallbackQuery]) -> bool:
-        user_id = event.from_user.id
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(Manager)
-                .where(
-                    Manager.tg_id == user_id,
-                    Manager.status == True
-                )
-            )
-            return result.scalar() is not None
+    async def __call__(self, event: Union[Message, CallbackQuery], roles: frozenset[str] = frozenset()) -> bool:
+        return 'manager' in roles
 
 
 class IsSecurity(BaseFilter):
-    async def __call__(self, event: Union[Message, CallbackQuery]) -> bool:
-        user_id = event.from_user.id
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(Security)
-                .where(
-                    Security.tg_id == user_id,
-                    Security.status == True
-                )
-            )
-            return result.scalar() is not None
+    async def __call__(self, event: Union[Message, CallbackQuery, InlineQuery], roles: frozenset[str] = frozenset()) -> bool:
+        return 'security' in roles
 
 
 class IsResident(BaseFilter):
-    async def __call__(self, event: Union[Message, CallbackQuery]) -> bool:
-        user_id = event.from_user.id
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(Resident)
-                .where(
-                    Resident.tg_id == user_id,
-                    Resident.status == True
-                )
-            )
-            return result.scalar() is not None
+    async def __call__(self, event: Union[Message, CallbackQuery], roles: frozenset[str] = frozenset()) -> bool:
+        return 'resident' in roles
 
 
 class IsContractor(BaseFilter):
-    async def __call__(self, event: Union[Message, CallbackQuery]) -> bool:
-        user_id = event.from_user.id
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(Contractor)
-                .where(
-                    Contractor.tg_id == user_id,
-                    Contractor.status == True
-                )
-            )
-            return result.scalar() is not None
\ No newline at end of file
+    async def __call__(self, event: Union[Message, CallbackQuery], roles: frozenset[str] = frozenset()) -> bool:
+        return 'contractor' in roles
@@ -0,0 +1,85 @@
+from itertools import combinations
+
+
+# Нечеткий поиск строк по расстоянию Левенштейна - индекс симметричных удалений.
+# Каждая строка хранится под всеми вариантами, получаемыми удалением до max_distance символов.
+# Две строки на расстоянии не больше d имеют общий вариант с удалением не больше d символов
+# с каждой стороны, поэтому кандидаты находятся несколькими десятками обращений к словарю,
+# а точное расстояние считается только для них.
+# BK-дерево для номеров не подходит: номера короткие, попарные расстояния почти все 5-8,
+# и окно [k - 2, k + 2] почти не отсекает ветви - поиск сводится к перебору.
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Расстояние Левенштейна: вставки, удаления и замены символов"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def deletions(word: str, depth: int) -> set[str]:
+    """Строка и все варианты, получаемые удалением до depth символов"""
+    variants = {word}
+    for count in range(1, min(depth, len(word)) + 1):
+        for positions in combinations(range(len(word)), count):
+            variants.add(''.join(char for i, char in enumerate(word) if i not in positions))
+    return variants
+
+
+class DeletionIndex:
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        # Вариант с удалениями -> строки, из которых он получается
+        self._variants: dict[str, set[str]] = {}
+        self._words: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._words
+
+    def add(self, word: str):
+        if word in self._words:
+            return
+        self._words.add(word)
+        for variant in deletions(word, self.max_distance):
+            self._variants.setdefault(variant, set()).add(word)
+
+    def remove(self, word: str):
+        if word not in self._words:
+            return
+        self._words.discard(word)
+        for variant in deletions(word, self.max_distance):
+            words = self._variants.get(variant)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self._variants[variant]
+
+    def search(self, word: str, max_distance: int) -> list[tuple[int, str]]:
+        """Строки на расстоянии не больше max_distance: [(расстояние, строка)] по возрастанию расстояния"""
+        max_distance = min(max_distance, self.max_distance)
+        candidates = set()
+        for variant in deletions(word, max_distance):
+            candidates |= self._variants.get(variant, set())
+
+        found = []
+        for candidate in candidates:
+            if abs(len(candidate) - len(word)) > max_distance:
+                continue
+            distance = levenshtein(word, candidate)
+            if distance <= max_distance:
+                found.append((distance, candidate))
+        found.sort()
+        return found
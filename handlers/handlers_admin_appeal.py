@@ -7,11 +7,13 @@ from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from sqlalchemy import select, func
+from sqlalchemy import select
 
 from bot import bot
-from config import PAGE_SIZE, RAZRAB
-from db.models import AsyncSessionLocal, Appeal, Resident, User
+from config import RAZRAB
+from db.models import Appeal, Resident, User
+from db.pagination import fetch_page
+from db.session import session_scope
 from filters import IsAdminOrManager
 
 router = Router()
@@ -48,7 +50,7 @@ async def appeals_management(callback: CallbackQuery):
 async def show_active_appeals(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_state(AppealViewStates.VIEWING_ACTIVE)
-        await state.update_data(appeal_page=0, appeal_status=False)
+        await state.update_data(appeal_cursor=None, appeal_status=False)
         await show_appeals(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -60,7 +62,7 @@ async def show_active_appeals(callback: CallbackQuery, state: FSMContext):
 async def show_closed_appeals(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_state(AppealViewStates.VIEWING_CLOSED)
-        await state.update_data(appeal_page=0, appeal_status=True)
+        await state.update_data(appeal_cursor=None, appeal_status=True)
         await show_appeals(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -71,25 +73,13 @@ async def show_closed_appeals(callback: CallbackQuery, state: FSMContext):
 async def show_appeals(message: Union[Message, CallbackQuery], state: FSMContext):
     try:
         data = await state.get_data()
-        page = data.get('appeal_page', 0)
+        cursor = data.get('appeal_cursor')
         status = data.get('appeal_status', False)
 
-        async with AsyncSessionLocal() as session:
-            # Получаем обращения
-            total_count = await session.scalar(
-                select(func.count(Appeal.id))
-                .where(Appeal.status == status)
-            )
-
+        async with session_scope() as session:
             # Получаем обращения для текущей страницы
-            result = await session.execute(
-                select(Appeal)
-                .where(Appeal.status == status)
-                .order_by(Appeal.created_at.desc())
-                .offset(page * PAGE_SIZE)
-                .limit(PAGE_SIZE)
-            )
-            appeals = result.scalars().all()
+            page = await fetch_page(session, select(Appeal).where(Appeal.status == status), Appeal, cursor)
+        appeals = page.rows
 
         if not appeals:
             text = "Нет обращений в этом разделе"
@@ -112,14 +102,14 @@ async def show_appeals(message: Union[Message, CallbackQuery], state: FSMContext
 
         # Кнопки пагинации
         pagination_buttons = []
-        if page > 0:
+        if page.has_prev:
             pagination_buttons.append(
-                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data="appeal_prev")
+                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"appeal_prev_{page.prev_cursor}")
             )
 
-        if (page + 1) * PAGE_SIZE < total_count:
+        if page.has_next:
             pagination_buttons.append(
-                InlineKeyboardButton(text="Следующие ➡️", callback_data="appeal_next")
+                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"appeal_next_{page.next_cursor}")
             )
 
         if pagination_buttons:
@@ -141,32 +131,19 @@ async def show_appeals(message: Union[Message, CallbackQuery], state: FSMContext
                 text,
                 reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
 
+        # Запоминаем страницу, чтобы вернуться на нее из карточки обращения
+        await state.update_data(appeal_cursor=page.start)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{message.from_user.id} - {str(e)}')
         await asyncio.sleep(0.05)
 
 
 # Обработчики пагинации
-@router.callback_query(F.data == "appeal_prev", StateFilter(AppealViewStates))
-async def handle_appeal_prev(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(F.data.startswith("appeal_prev_") | F.data.startswith("appeal_next_"),
+                       StateFilter(AppealViewStates))
+async def handle_appeal_pagination(callback: CallbackQuery, state: FSMContext):
     try:
-        data = await state.get_data()
-        current_page = data.get('appeal_page', 0)
-        if current_page > 0:
-            await state.update_data(appeal_page=current_page - 1)
-            await show_appeals(callback, state)
-        await callback.answer()
-    except Exception as e:
-        await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
-        await asyncio.sleep(0.05)
-
-
-@router.callback_query(F.data == "appeal_next", StateFilter(AppealViewStates))
-async def handle_appeal_next(callback: CallbackQuery, state: FSMContext):
-    try:
-        data = await state.get_data()
-        current_page = data.get('appeal_page', 0)
-        await state.update_data(appeal_page=current_page + 1)
+        await state.update_data(appeal_cursor=callback.data.split("_")[-1])
         await show_appeals(callback, state)
         await callback.answer()
     except Exception as e:
@@ -181,7 +158,7 @@ async def view_appeal_details(callback: CallbackQuery, state: FSMContext):
         appeal_id = int(callback.data.split("_")[-1])
         await state.update_data(current_appeal_id=appeal_id)
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             appeal = await session.get(Appeal, appeal_id)
             if not appeal:
                 await callback.answer("Обращение не найдено")
@@ -256,7 +233,7 @@ async def save_appeal_response(message: Message, state: FSMContext):
         data = await state.get_data()
         appeal_id = data['current_appeal_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем текущего администратора (ответчика)
             result = await session.execute(
                 select(User)
@@ -1,18 +1,22 @@
 import asyncio
 import logging
-import datetime
 from typing import Union
 
 from aiogram import Router, F
 from aiogram.fsm.state import StatesGroup, State, default_state
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select, func
+from sqlalchemy import select
 
 from bot import bot
-from db.models import AsyncSessionLocal, Resident, PermanentPass
-from config import PAGE_SIZE, RAZRAB
-from db.util import get_active_admins_managers_sb_tg_ids
+from broadcast import broadcast
+from db.models import Resident, PermanentPass
+from db.pagination import fetch_page
+from db.session import session_scope
+from db.pass_index import refresh_plates
+from db.statistics import count_pass
+from config import RAZRAB
+from db.util import set_pass_status, get_active_admins_managers_sb_tg_ids
 from filters import IsAdminOrManager
 from handlers.handlers_admin_user_management import admin_reply_keyboard
 
@@ -90,25 +94,19 @@ async def show_pending_passes(message: Union[Message, CallbackQuery], state: FSM
     try:
 
         data = await state.get_data()
-        current_page = data.get('pass_current_page', 0)
-
-        async with AsyncSessionLocal() as session:
-            # Получаем общее количество заявок
-            total_count = await session.scalar(
-                select(func.count(PermanentPass.id))
-                .where(PermanentPass.status == 'pending')
-            )
+        cursor = data.get('pass_cursor')
 
+        async with session_scope() as session:
             # Получаем заявки для текущей страницы
-            result = await session.execute(
+            page = await fetch_page(
+                session,
                 select(PermanentPass, Resident.fio)
                 .join(Resident, Resident.id == PermanentPass.resident_id)
-                .where(PermanentPass.status == 'pending')
-                .order_by(PermanentPass.created_at.desc())
-                .offset(current_page * PAGE_SIZE)
-                .limit(PAGE_SIZE)
+                .where(PermanentPass.status == 'pending'),
+                PermanentPass,
+                cursor
             )
-            requests = result.all()
+        requests = page.rows
 
         if not requests:
             text = "Нет пропусков на подтверждении"
@@ -130,14 +128,14 @@ async def show_pending_passes(message: Union[Message, CallbackQuery], state: FSM
 
         # Добавляем кнопки пагинации
         pagination_buttons = []
-        if current_page > 0:
+        if page.has_prev:
             pagination_buttons.append(
-                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"pass_prev_{current_page - 1}")
+                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"pass_prev_{page.prev_cursor}")
             )
 
-        if (current_page + 1) * PAGE_SIZE < total_count:
+        if page.has_next:
             pagination_buttons.append(
-                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"pass_next_{current_page + 1}")
+                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"pass_next_{page.next_cursor}")
             )
 
         if pagination_buttons:
@@ -153,10 +151,7 @@ async def show_pending_passes(message: Union[Message, CallbackQuery], state: FSM
         else:
             await message.answer(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
 
-        await state.update_data(
-            pass_current_page=current_page,
-            pass_total_count=total_count
-        )
+        await state.update_data(pass_cursor=page.start)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{message.from_user.id} - {str(e)}')
         await asyncio.sleep(0.05)
@@ -165,9 +160,7 @@ async def show_pending_passes(message: Union[Message, CallbackQuery], state: FSM
 @router.callback_query(F.data.startswith("pass_prev_") | F.data.startswith("pass_next_"))
 async def handle_pass_pagination(callback: CallbackQuery, state: FSMContext):
     try:
-        action, page_str = callback.data.split("_")[1:3]
-        page = int(page_str)
-        await state.update_data(pass_current_page=page)
+        await state.update_data(pass_cursor=callback.data.split("_")[-1])
         await show_pending_passes(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -180,7 +173,7 @@ async def view_pass_details(callback: CallbackQuery, state: FSMContext):
         pass_id = int(callback.data.split("_")[-1])
         await state.update_data(current_pass_id=pass_id)
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем пропуск и связанного резидента
             result = await session.execute(
                 select(PermanentPass, Resident.fio)
@@ -233,18 +226,14 @@ async def approve_pass(callback: CallbackQuery, state: FSMContext):
     try:
         pass_id = int(callback.data.split("_")[-1])
 
-        async with AsyncSessionLocal() as session:
-            # Получаем пропуск
-            pass_request = await session.get(PermanentPass, pass_id)
-            if not pass_request:
-                await callback.answer("Пропуск не найден")
-                return
-
-            # Обновляем статус и время
-            pass_request.status = 'approved'
-            pass_request.time_registration = datetime.datetime.now()
-            await session.commit()
+        pass_request, old_status = await set_pass_status(PermanentPass, pass_id, 'approved')
+        if not pass_request:
+            await callback.answer("Пропуск не найден")
+            return
+        await refresh_plates(pass_request.car_number)
+        count_pass('permanent', old_status, pass_request.status)
 
+        async with session_scope() as session:
             # Получаем резидента для отправки сообщения
             resident = await session.get(Resident, pass_request.resident_id)
 
@@ -257,13 +246,11 @@ async def approve_pass(callback: CallbackQuery, state: FSMContext):
             except Exception as e:
                 logging.error(f"Не удалось отправить сообщение резиденту: {e}")
             tg_ids = await get_active_admins_managers_sb_tg_ids()
-            for tg_id in tg_ids:
-                await bot.send_message(
-                    tg_id,
-                    text=f'Постоянный пропуск от резидента {resident.fio} на машину с номером {pass_request.car_number} одобрен.',
-                    reply_markup=admin_reply_keyboard
-                )
-                await asyncio.sleep(0.05)
+            broadcast(
+                tg_ids,
+                text=f'Постоянный пропуск от резидента {resident.fio} на машину с номером {pass_request.car_number} одобрен.',
+                reply_markup=admin_reply_keyboard
+            )
             # Сообщение админу
             await callback.message.answer(
                 "Управление постоянными пропусками:",
@@ -295,20 +282,15 @@ async def process_reject_comment(message: Message, state: FSMContext):
             await state.clear()
             return
 
-        async with AsyncSessionLocal() as session:
-            # Получаем пропуск
-            pass_request = await session.get(PermanentPass, pass_id)
-            if not pass_request:
-                await message.answer("Пропуск не найден")
-                await state.clear()
-                return
-
-            # Обновляем статус и комментарий
-            pass_request.status = 'rejected'
-            pass_request.time_registration = datetime.datetime.now()
-            pass_request.resident_comment = message.text
-            await session.commit()
+        pass_request, old_status = await set_pass_status(PermanentPass, pass_id, 'rejected', resident_comment=message.text)
+        if not pass_request:
+            await message.answer("Пропуск не найден")
+            await state.clear()
+            return
+        await refresh_plates(pass_request.car_number)
+        count_pass('permanent', old_status, pass_request.status)
 
+        async with session_scope() as session:
             # Получаем резидента для отправки сообщения
             resident = await session.get(Resident, pass_request.resident_id)
 
@@ -375,7 +357,7 @@ async def finish_editing_pass(callback: CallbackQuery, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем пропуск и связанного резидента
             result = await session.execute(
                 select(PermanentPass, Resident.fio)
@@ -452,10 +434,11 @@ async def update_car_brand(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(PermanentPass, pass_id)
             pass_request.car_brand = message.text
             await session.commit()
+            await refresh_plates(pass_request.car_number)
 
             # Получаем обновленные данные
             result = await session.execute(
@@ -495,10 +478,11 @@ async def update_car_model(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(PermanentPass, pass_id)
             pass_request.car_model = message.text
             await session.commit()
+            await refresh_plates(pass_request.car_number)
 
             result = await session.execute(
                 select(PermanentPass, Resident.fio)
@@ -535,10 +519,12 @@ async def update_car_number(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(PermanentPass, pass_id)
+            old_car_number = pass_request.car_number
             pass_request.car_number = message.text.upper().strip()
             await session.commit()
+            await refresh_plates(old_car_number, pass_request.car_number)
 
             result = await session.execute(
                 select(PermanentPass, Resident.fio)
@@ -575,10 +561,11 @@ async def update_car_owner(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(PermanentPass, pass_id)
             pass_request.car_owner = message.text
             await session.commit()
+            await refresh_plates(pass_request.car_number)
 
             result = await session.execute(
                 select(PermanentPass, Resident.fio)
@@ -614,10 +601,11 @@ async def update_destination(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(PermanentPass, pass_id)
             pass_request.destination = message.text
             await session.commit()
+            await refresh_plates(pass_request.car_number)
 
             result = await session.execute(
                 select(PermanentPass, Resident.fio)
@@ -654,10 +642,11 @@ async def update_security_comment(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(PermanentPass, pass_id)
             pass_request.security_comment = message.text
             await session.commit()
+            await refresh_plates(pass_request.car_number)
 
             result = await session.execute(
                 select(PermanentPass, Resident.fio)
@@ -691,24 +680,19 @@ async def update_security_comment(message: Message, state: FSMContext):
 async def show_approved_passes(message: Union[Message, CallbackQuery], state: FSMContext):
     try:
         data = await state.get_data()
-        current_page = data.get('pass_current_page', 0)
+        cursor = data.get('pass_cursor')
 
-        async with AsyncSessionLocal() as session:
-            # Получаем общее количество заявок
-            total_count = await session.scalar(
-                select(func.count(PermanentPass.id))
-                .where(PermanentPass.status == 'approved')
-            )
-
-            # Получаем заявки для текущей страницы
-            result = await session.execute(
-                select(PermanentPass)
-                .where(PermanentPass.status == 'approved')
-                .order_by(PermanentPass.created_at.desc())
-                .offset(current_page * PAGE_SIZE)
-                .limit(PAGE_SIZE)
+        async with session_scope() as session:
+            # Получаем заявки для текущей страницы (пропуска, выписанные УК, - без резидента)
+            page = await fetch_page(
+                session,
+                select(PermanentPass, Resident.fio)
+                .outerjoin(Resident, Resident.id == PermanentPass.resident_id)
+                .where(PermanentPass.status == 'approved'),
+                PermanentPass,
+                cursor
             )
-            requests = result.scalars()
+        requests = page.rows
 
         if not requests:
             text = "Нет подтвержденных пропусков"
@@ -720,13 +704,10 @@ async def show_approved_passes(message: Union[Message, CallbackQuery], state: FS
 
         # Формируем кнопки
         buttons = []
-        for req in requests:
+        for req, resident_fio in requests:
             if req.resident_id:
-                async with AsyncSessionLocal() as session:
-                    result = await session.execute(select(Resident).where(Resident.id == req.resident_id))
-                    resident = result.scalar()
-                    fio_short = ' '.join(resident.fio.split()[:2])
-                    text = f"{fio_short}_{req.car_number}"
+                fio_short = ' '.join(resident_fio.split()[:2])
+                text = f"{fio_short}_{req.car_number}"
             else:
                 fio = req.security_comment.replace('Выписал', '')
                 if 'Администратор' in fio:
@@ -740,14 +721,14 @@ async def show_approved_passes(message: Union[Message, CallbackQuery], state: FS
 
         # Добавляем кнопки пагинации
         pagination_buttons = []
-        if current_page > 0:
+        if page.has_prev:
             pagination_buttons.append(
-                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"ap_pass_prev_{current_page - 1}")
+                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"ap_pass_prev_{page.prev_cursor}")
             )
 
-        if (current_page + 1) * PAGE_SIZE < total_count:
+        if page.has_next:
             pagination_buttons.append(
-                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"ap_pass_next_{current_page + 1}")
+                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"ap_pass_next_{page.next_cursor}")
             )
 
         if pagination_buttons:
@@ -763,22 +744,17 @@ async def show_approved_passes(message: Union[Message, CallbackQuery], state: FS
         else:
             await message.answer(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
 
-        await state.update_data(
-            pass_current_page=current_page,
-            pass_total_count=total_count
-        )
+        await state.update_data(pass_cursor=page.start)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{message.from_user.id} - {str(e)}')
         await asyncio.sleep(0.05)
 
 
 @router.callback_query(F.data.startswith("ap_pass_prev_") | F.data.startswith("ap_pass_next_"))
-async def handle_pass_pagination(callback: CallbackQuery, state: FSMContext):
+async def handle_ap_pass_pagination(callback: CallbackQuery, state: FSMContext):
     try:
-        action, page_str = callback.data.split("_")[1:3]
-        page = int(page_str)
-        await state.update_data(pass_current_page=page)
-        await show_pending_passes(callback, state)
+        await state.update_data(pass_cursor=callback.data.split("_")[-1])
+        await show_approved_passes(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
         await asyncio.sleep(0.05)
@@ -790,7 +766,7 @@ async def view_pass_details(callback: CallbackQuery, state: FSMContext):
         pass_id = int(callback.data.split("_")[-1])
         await state.update_data(current_pass_id=pass_id)
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем пропуск и связанного резидента
             result = await session.execute(
                 select(PermanentPass)
@@ -803,7 +779,7 @@ async def view_pass_details(callback: CallbackQuery, state: FSMContext):
             return
 
         if pass_request.resident_id:
-            async with AsyncSessionLocal() as session:
+            async with session_scope() as session:
                 # Получаем пропуск и связанного резидента
                 result = await session.execute(
                     select(Resident)
@@ -852,25 +828,19 @@ async def back_to_pending_list(callback: CallbackQuery, state: FSMContext):
 async def show_rejected_passes(message: Union[Message, CallbackQuery], state: FSMContext):
     try:
         data = await state.get_data()
-        current_page = data.get('pass_current_page', 0)
-
-        async with AsyncSessionLocal() as session:
-            # Получаем общее количество заявок
-            total_count = await session.scalar(
-                select(func.count(PermanentPass.id))
-                .where(PermanentPass.status == 'rejected')
-            )
+        cursor = data.get('pass_cursor')
 
+        async with session_scope() as session:
             # Получаем заявки для текущей страницы
-            result = await session.execute(
+            page = await fetch_page(
+                session,
                 select(PermanentPass, Resident.fio)
                 .join(Resident, Resident.id == PermanentPass.resident_id)
-                .where(PermanentPass.status == 'rejected')
-                .order_by(PermanentPass.created_at.desc())
-                .offset(current_page * PAGE_SIZE)
-                .limit(PAGE_SIZE)
+                .where(PermanentPass.status == 'rejected'),
+                PermanentPass,
+                cursor
             )
-            requests = result.all()
+        requests = page.rows
 
         if not requests:
             text = "Нет отклоненных пропусков"
@@ -892,14 +862,14 @@ async def show_rejected_passes(message: Union[Message, CallbackQuery], state: FS
 
         # Добавляем кнопки пагинации
         pagination_buttons = []
-        if current_page > 0:
+        if page.has_prev:
             pagination_buttons.append(
-                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"rej_pass_prev_{current_page - 1}")
+                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"rej_pass_prev_{page.prev_cursor}")
             )
 
-        if (current_page + 1) * PAGE_SIZE < total_count:
+        if page.has_next:
             pagination_buttons.append(
-                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"rej_pass_next_{current_page + 1}")
+                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"rej_pass_next_{page.next_cursor}")
             )
 
         if pagination_buttons:
@@ -915,22 +885,17 @@ async def show_rejected_passes(message: Union[Message, CallbackQuery], state: FS
         else:
             await message.answer(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
 
-        await state.update_data(
-            pass_current_page=current_page,
-            pass_total_count=total_count
-        )
+        await state.update_data(pass_cursor=page.start)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{message.from_user.id} - {str(e)}')
         await asyncio.sleep(0.05)
 
 
 @router.callback_query(F.data.startswith("rej_pass_prev_") | F.data.startswith("rej_pass_next_"))
-async def handle_pass_pagination(callback: CallbackQuery, state: FSMContext):
+async def handle_rej_pass_pagination(callback: CallbackQuery, state: FSMContext):
     try:
-        action, page_str = callback.data.split("_")[1:3]
-        page = int(page_str)
-        await state.update_data(pass_current_page=page)
-        await show_pending_passes(callback, state)
+        await state.update_data(pass_cursor=callback.data.split("_")[-1])
+        await show_rejected_passes(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
         await asyncio.sleep(0.05)
@@ -942,7 +907,7 @@ async def view_pass_details(callback: CallbackQuery, state: FSMContext):
         pass_id = int(callback.data.split("_")[-1])
         await state.update_data(current_pass_id=pass_id)
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем пропуск и связанного резидента
             result = await session.execute(
                 select(PermanentPass, Resident.fio)
@@ -10,7 +10,11 @@ from sqlalchemy import select
 from bot import bot
 from config import RAZRAB
 from db.models import Resident, Contractor, RegistrationRequest, \
-    ContractorRegistrationRequest, AsyncSessionLocal, ResidentContractorRequest, ContractorContractorRequest
+    ContractorRegistrationRequest, ResidentContractorRequest, ContractorContractorRequest
+from db.pass_index import refresh_owner_plates
+from db.session import session_scope
+from db.roles import refresh_roles
+from db.statistics import invalidate_statistics
 from filters import IsAdminOrManager
 from handlers.handlers_admin_user_management import admin_reply_keyboard
 
@@ -84,7 +88,7 @@ async def show_registration_menu(callback: CallbackQuery):
 @router.callback_query(F.data == "registration_requests")
 async def show_pending_requests(callback: CallbackQuery):
     try:
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             result = await session.execute(
                 select(RegistrationRequest)
                 .filter(RegistrationRequest.status == 'pending')
@@ -119,7 +123,7 @@ async def show_pending_requests(callback: CallbackQuery):
 @router.callback_query(F.data == "contractor_requests")
 async def show_contractor_requests(callback: CallbackQuery):
     try:
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             result = await session.execute(
                 select(ContractorRegistrationRequest)
                 .filter(ContractorRegistrationRequest.status == 'pending')
@@ -155,7 +159,7 @@ async def view_request_details(callback: CallbackQuery, state: FSMContext):
     try:
         request_id = int(callback.data.split("_")[-1])
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(RegistrationRequest, request_id)
 
             await state.update_data(current_request_id=request_id)
@@ -193,7 +197,7 @@ async def view_contractor_request(callback: CallbackQuery, state: FSMContext):
         request_id = int(callback.data.split("_")[-1])
         await state.update_data(current_contractor_request_id=request_id)
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ContractorRegistrationRequest, request_id)
             text = (
                 f"ФИО: {request.fio}\n"
@@ -223,11 +227,12 @@ async def approve_request(callback: CallbackQuery, state: FSMContext):
         data = await state.get_data()
         request_id = data['current_request_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(RegistrationRequest, request_id)
             resident = await session.get(Resident, request.resident_id)
 
             # Обновляем данные резидента
+            old_tg_id = resident.tg_id
             resident.fio = request.fio
             resident.plot_number = request.plot_number
             resident.photo_id = request.photo_id
@@ -238,6 +243,9 @@ async def approve_request(callback: CallbackQuery, state: FSMContext):
 
             request.status = 'approved'
             await session.commit()
+            await refresh_roles(old_tg_id, request.tg_id)
+            await refresh_owner_plates(resident_id=resident.id)
+            invalidate_statistics()
 
             # Отправляем уведомление пользователю
             await bot.send_message(
@@ -264,10 +272,11 @@ async def approve_contractor_request(callback: CallbackQuery, state: FSMContext)
         data = await state.get_data()
         request_id = data['current_contractor_request_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ContractorRegistrationRequest, request_id)
             contractor = await session.get(Contractor, request.contractor_id)
 
+            old_tg_id = contractor.tg_id
             contractor.fio = request.fio
             contractor.company = request.company
             contractor.position = request.position
@@ -279,6 +288,9 @@ async def approve_contractor_request(callback: CallbackQuery, state: FSMContext)
 
             request.status = 'approved'
             await session.commit()
+            await refresh_roles(old_tg_id, request.tg_id)
+            await refresh_owner_plates(contractor_id=contractor.id)
+            invalidate_statistics()
 
             await bot.send_message(
                 request.tg_id,
@@ -325,7 +337,7 @@ async def finish_editing(callback: CallbackQuery, state: FSMContext):
         data = await state.get_data()
         request_id = data['current_request_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(RegistrationRequest, request_id)
 
             # Формируем обновленное сообщение
@@ -363,7 +375,7 @@ async def finish_editing(callback: CallbackQuery, state: FSMContext):
         data = await state.get_data()
         request_id = data['current_contractor_request_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ContractorRegistrationRequest, request_id)
 
             # Формируем обновленное сообщение
@@ -436,7 +448,7 @@ async def update_fio(message: Message, state: FSMContext):
     try:
         data = await state.get_data()
         request_id = data['current_request_id']
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(RegistrationRequest, request_id)
             request.fio = message.text
             await session.commit()
@@ -462,7 +474,7 @@ async def update_fio(message: Message, state: FSMContext):
     try:
         data = await state.get_data()
         request_id = data['current_contractor_request_id']
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ContractorRegistrationRequest, request_id)
             request.fio = message.text
             await session.commit()
@@ -491,7 +503,7 @@ async def update_company(message: Message, state: FSMContext):
     try:
         data = await state.get_data()
         request_id = data['current_contractor_request_id']
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ContractorRegistrationRequest, request_id)
             request.company = message.text
             await session.commit()
@@ -519,7 +531,7 @@ async def update_position(message: Message, state: FSMContext):
     try:
         data = await state.get_data()
         request_id = data['current_contractor_request_id']
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ContractorRegistrationRequest, request_id)
             request.position = message.text
             await session.commit()
@@ -549,7 +561,7 @@ async def update_fio(message: Message, state: FSMContext):
         data = await state.get_data()
         request_id = data['current_request_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(RegistrationRequest, request_id)
             request.plot_number = message.text
             await session.commit()
@@ -588,7 +600,7 @@ async def reject_request(message: Message, state: FSMContext):
         data = await state.get_data()
         request_id = data['current_contractor_request_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ContractorRegistrationRequest, request_id)
             request.status = 'rejected'
             request.admin_comment = message.text
@@ -629,7 +641,7 @@ async def reject_request(message: Message, state: FSMContext):
         data = await state.get_data()
         request_id = data['current_request_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(RegistrationRequest, request_id)
             request.status = 'rejected'
             request.admin_comment = message.text
@@ -656,7 +668,7 @@ async def reject_request(message: Message, state: FSMContext):
 @router.callback_query(F.data == "resident_contractor_requests")
 async def show_resident_contractor_requests(callback: CallbackQuery):
     try:
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             result = await session.execute(
                 select(ResidentContractorRequest)
                 .filter(ResidentContractorRequest.status == 'pending')
@@ -691,7 +703,7 @@ async def view_resident_request(callback: CallbackQuery, state: FSMContext):
         request_id = int(callback.data.split("_")[-1])
         await state.update_data(current_resident_request_id=request_id)
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ResidentContractorRequest, request_id)
             resident = await session.get(Resident, request.resident_id)
 
@@ -719,7 +731,7 @@ async def approve_resident_request(callback: CallbackQuery, state: FSMContext):
         data = await state.get_data()
         request_id = data['current_resident_request_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ResidentContractorRequest, request_id)
             resident = await session.get(Resident, request.resident_id)
 
@@ -732,6 +744,7 @@ async def approve_resident_request(callback: CallbackQuery, state: FSMContext):
             )
             session.add(new_contractor)
             await session.commit()
+            invalidate_statistics()
 
             # Обновляем статус заявки
             request.status = 'approved'
@@ -769,7 +782,7 @@ async def process_reject_comment(message: Message, state: FSMContext):
         data = await state.get_data()
         request_id = data['current_resident_request_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ResidentContractorRequest, request_id)
             resident = await session.get(Resident, request.resident_id)
             request.status = 'rejected'
@@ -795,7 +808,7 @@ async def process_reject_comment(message: Message, state: FSMContext):
 @router.callback_query(F.data == "contractor_contractor_requests")
 async def show_subcontractor_requests(callback: CallbackQuery):
     try:
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             result = await session.execute(
                 select(ContractorContractorRequest)
                 .filter(ContractorContractorRequest.status == 'pending')
@@ -830,7 +843,7 @@ async def view_subcontractor_request(callback: CallbackQuery, state: FSMContext)
         request_id = int(callback.data.split("_")[-1])
         await state.update_data(current_subcontractor_request_id=request_id)
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ContractorContractorRequest, request_id)
             contractor = await session.get(Contractor, request.contractor_id)
 
@@ -858,7 +871,7 @@ async def approve_subcontractor_request(callback: CallbackQuery, state: FSMConte
         data = await state.get_data()
         request_id = data['current_subcontractor_request_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ContractorContractorRequest, request_id)
             contractor = await session.get(Contractor, request.contractor_id)
 
@@ -871,6 +884,7 @@ async def approve_subcontractor_request(callback: CallbackQuery, state: FSMConte
             )
             session.add(new_contractor)
             await session.commit()
+            invalidate_statistics()
 
             # Обновляем статус заявки
             request.status = 'approved'
@@ -908,7 +922,7 @@ async def process_reject_comment(message: Message, state: FSMContext):
         data = await state.get_data()
         request_id = data['current_subcontractor_request_id']
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             request = await session.get(ContractorContractorRequest, request_id)
             contractor = await session.get(Contractor, request.contractor_id)
             request.status = 'rejected'
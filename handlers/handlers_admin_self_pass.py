@@ -10,8 +10,12 @@ import datetime
 from sqlalchemy import select
 
 from bot import bot
+from broadcast import broadcast
 from config import ADMIN_IDS, RAZRAB
-from db.models import AsyncSessionLocal, TemporaryPass, Manager, PermanentPass
+from db.models import TemporaryPass, Manager, PermanentPass
+from db.session import session_scope
+from db.pass_index import refresh_plates
+from db.statistics import count_pass
 from date_parser import parse_date
 from db.util import get_active_admins_managers_sb_tg_ids
 from handlers.handlers_admin_permanent_pass import get_passes_menu
@@ -47,7 +51,7 @@ async def get_owner_info(user_id: int) -> str:
     if user_id in ADMIN_IDS:
         return f"Администратор"
 
-    async with AsyncSessionLocal() as session:
+    async with session_scope() as session:
         manager = await session.scalar(
             select(Manager)
             .where(Manager.tg_id == user_id, Manager.status == True)
@@ -208,7 +212,7 @@ async def process_self_comment_and_save(message: Message, state: FSMContext):
         # Определяем информацию о владельце
         owner_info = await get_owner_info(message.from_user.id)
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             new_pass = TemporaryPass(
                 owner_type="staff",
                 vehicle_type=data["vehicle_type"],
@@ -228,19 +232,19 @@ async def process_self_comment_and_save(message: Message, state: FSMContext):
             )
             session.add(new_pass)
             await session.commit()
+            await refresh_plates(new_pass.car_number)
+            count_pass('temporary', None, 'approved')
 
         await message.answer(
             f"✅ Временный пропуск на машину {data['car_number'].upper()} оформлен!",
             reply_markup=get_passes_menu()
         )
         tg_ids = await get_active_admins_managers_sb_tg_ids()
-        for tg_id in tg_ids:
-            await bot.send_message(
-                tg_id,
-                text=f'Пропуск от {owner_info} на машину с номером {data["car_number"].upper()} одобрен автоматически.\n(Пропуска > Временные пропуска > Подтвержденные)',
-                reply_markup=admin_reply_keyboard
-            )
-            await asyncio.sleep(0.05)
+        broadcast(
+            tg_ids,
+            text=f'Пропуск от {owner_info} на машину с номером {data["car_number"].upper()} одобрен автоматически.\n(Пропуска > Временные пропуска > Подтвержденные)',
+            reply_markup=admin_reply_keyboard
+        )
         await state.clear()
     except Exception as e:
         await message.answer(f"❌ Ошибка при оформлении пропуска: {str(e)}")
@@ -289,7 +293,7 @@ async def process_self_car_owner(message: Message, state: FSMContext):
         data = await state.get_data()
         owner_info = await get_owner_info(message.from_user.id)
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             new_pass = PermanentPass(
                 car_brand=data['car_brand'],
                 car_model=data['car_model'],
@@ -303,16 +307,16 @@ async def process_self_car_owner(message: Message, state: FSMContext):
             )
             session.add(new_pass)
             await session.commit()
+            await refresh_plates(new_pass.car_number)
+            count_pass('permanent', None, 'approved')
 
         # Уведомление админов и менеджеров
         tg_ids = await get_active_admins_managers_sb_tg_ids()
-        for tg_id in tg_ids:
-            await bot.send_message(
-                tg_id,
-                text=f'Постоянный пропуск от {owner_info} на машину {data["car_number"].upper()} одобрен автоматически.',
-                reply_markup=admin_reply_keyboard
-            )
-            await asyncio.sleep(0.05)
+        broadcast(
+            tg_ids,
+            text=f'Постоянный пропуск от {owner_info} на машину {data["car_number"].upper()} одобрен автоматически.',
+            reply_markup=admin_reply_keyboard
+        )
 
         await state.clear()
     except Exception as e:
@@ -8,13 +8,18 @@ from aiogram import Router, F
 from aiogram.fsm.state import StatesGroup, State, default_state
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select, func
+from sqlalchemy import select
 
 from bot import bot
+from broadcast import broadcast
 from date_parser import parse_date
-from db.models import AsyncSessionLocal, Resident, Contractor, TemporaryPass
-from config import ADMIN_IDS, PAGE_SIZE, RAZRAB
-from db.util import get_active_admins_managers_sb_tg_ids
+from db.models import Resident, Contractor, TemporaryPass
+from db.pagination import fetch_page
+from db.session import session_scope
+from db.pass_index import refresh_plates
+from db.statistics import count_pass
+from config import ADMIN_IDS, RAZRAB
+from db.util import set_pass_status, get_active_admins_managers_sb_tg_ids
 from filters import IsAdminOrManager
 from handlers.handlers_admin_user_management import admin_reply_keyboard
 from handlers.handlers_admin_permanent_pass import passes_menu
@@ -72,26 +77,20 @@ async def back_to_passes(callback: CallbackQuery):
 async def show_temporary_passes(message: Union[Message, CallbackQuery], state: FSMContext, status: str):
     try:
         data = await state.get_data()
-        current_page = data.get('temp_pass_current_page', 0)
-
-        async with AsyncSessionLocal() as session:
-            # Получаем общее количество заявок
-            total_count = await session.scalar(
-                select(func.count(TemporaryPass.id))
-                .where(TemporaryPass.status == status)
-            )
+        cursor = data.get('temp_pass_cursor')
 
+        async with session_scope() as session:
             # Получаем заявки для текущей страницы
-            result = await session.execute(
+            page = await fetch_page(
+                session,
                 select(TemporaryPass, Resident.fio, Contractor.fio)
                 .outerjoin(Resident, Resident.id == TemporaryPass.resident_id)
                 .outerjoin(Contractor, Contractor.id == TemporaryPass.contractor_id)
-                .where(TemporaryPass.status == status)
-                .order_by(TemporaryPass.created_at.desc())
-                .offset(current_page * PAGE_SIZE)
-                .limit(PAGE_SIZE)
+                .where(TemporaryPass.status == status),
+                TemporaryPass,
+                cursor
             )
-            requests = result.all()
+        requests = page.rows
 
         if not requests:
             text = f"Нет пропусков со статусом '{status}'"
@@ -114,14 +113,14 @@ async def show_temporary_passes(message: Union[Message, CallbackQuery], state: F
 
         # Добавляем кнопки пагинации
         pagination_buttons = []
-        if current_page > 0:
+        if page.has_prev:
             pagination_buttons.append(
-                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"temp_pass_prev_{current_page - 1}_{status}")
+                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"temp_pass_prev_{status}_{page.prev_cursor}")
             )
 
-        if (current_page + 1) * PAGE_SIZE < total_count:
+        if page.has_next:
             pagination_buttons.append(
-                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"temp_pass_next_{current_page + 1}_{status}")
+                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"temp_pass_next_{status}_{page.next_cursor}")
             )
 
         if pagination_buttons:
@@ -144,8 +143,7 @@ async def show_temporary_passes(message: Union[Message, CallbackQuery], state: F
             await message.answer(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
 
         await state.update_data(
-            temp_pass_current_page=current_page,
-            temp_pass_total_count=total_count,
+            temp_pass_cursor=page.start,
             temp_pass_status=status
         )
     except Exception as e:
@@ -156,6 +154,7 @@ async def show_temporary_passes(message: Union[Message, CallbackQuery], state: F
 @router.callback_query(F.data.startswith("pending_temporary_passes"))
 async def show_pending_passes(callback: CallbackQuery, state: FSMContext):
     try:
+        await state.update_data(temp_pass_cursor=None)
         await show_temporary_passes(callback, state, 'pending')
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -165,6 +164,7 @@ async def show_pending_passes(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("approved_temporary_passes"))
 async def show_approved_passes(callback: CallbackQuery, state: FSMContext):
     try:
+        await state.update_data(temp_pass_cursor=None)
         await show_temporary_passes(callback, state, 'approved')
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -174,6 +174,7 @@ async def show_approved_passes(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("rejected_temporary_passes"))
 async def show_rejected_passes(callback: CallbackQuery, state: FSMContext):
     try:
+        await state.update_data(temp_pass_cursor=None)
         await show_temporary_passes(callback, state, 'rejected')
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -183,11 +184,8 @@ async def show_rejected_passes(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("temp_pass_prev_") | F.data.startswith("temp_pass_next_"))
 async def handle_temp_pass_pagination(callback: CallbackQuery, state: FSMContext):
     try:
-        parts = callback.data.split("_")
-        action = parts[2]
-        page = int(parts[3])
-        status = parts[4]
-        await state.update_data(temp_pass_current_page=page)
+        status, cursor = callback.data.split("_")[3:5]
+        await state.update_data(temp_pass_cursor=cursor)
         await show_temporary_passes(callback, state, status)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -211,7 +209,7 @@ async def view_temp_pass_details(callback: CallbackQuery, state: FSMContext):
         pass_id = int(callback.data.split("_")[-1])
         await state.update_data(current_temp_pass_id=pass_id)
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(TemporaryPass, pass_id)
             if not pass_request:
                 await callback.answer("Пропуск не найден")
@@ -276,16 +274,14 @@ async def approve_temp_pass(callback: CallbackQuery, state: FSMContext):
     try:
         pass_id = int(callback.data.split("_")[-1])
 
-        async with AsyncSessionLocal() as session:
-            pass_request = await session.get(TemporaryPass, pass_id)
-            if not pass_request:
-                await callback.answer("Пропуск не найден")
-                return
-
-            pass_request.status = 'approved'
-            pass_request.time_registration = datetime.datetime.now()
-            await session.commit()
+        pass_request, old_status = await set_pass_status(TemporaryPass, pass_id, 'approved')
+        if not pass_request:
+            await callback.answer("Пропуск не найден")
+            return
+        await refresh_plates(pass_request.car_number)
+        count_pass('temporary', old_status, pass_request.status)
 
+        async with session_scope() as session:
             # Отправляем сообщение владельцу
             text_to_all = ''
             try:
@@ -310,13 +306,11 @@ async def approve_temp_pass(callback: CallbackQuery, state: FSMContext):
 
             tg_ids = await get_active_admins_managers_sb_tg_ids()
 
-            for tg_id in tg_ids:
-                await bot.send_message(
-                    tg_id,
-                    text=f'Временный пропуск {text_to_all} на машину с номером {pass_request.car_number} одобрен.',
-                    reply_markup=admin_reply_keyboard
-                )
-                await asyncio.sleep(0.05)
+            broadcast(
+                tg_ids,
+                text=f'Временный пропуск {text_to_all} на машину с номером {pass_request.car_number} одобрен.',
+                reply_markup=admin_reply_keyboard
+            )
             await callback.message.answer(
                 "Управление временными пропусками:",
                 reply_markup=get_temporary_passes_management()
@@ -348,18 +342,15 @@ async def process_temp_reject_comment(message: Message, state: FSMContext):
             await state.clear()
             return
 
-        async with AsyncSessionLocal() as session:
-            pass_request = await session.get(TemporaryPass, pass_id)
-            if not pass_request:
-                await message.answer("Пропуск не найден")
-                await state.clear()
-                return
-
-            pass_request.status = 'rejected'
-            pass_request.time_registration = datetime.datetime.now()
-            pass_request.resident_comment = message.text
-            await session.commit()
+        pass_request, old_status = await set_pass_status(TemporaryPass, pass_id, 'rejected', resident_comment=message.text)
+        if not pass_request:
+            await message.answer("Пропуск не найден")
+            await state.clear()
+            return
+        await refresh_plates(pass_request.car_number)
+        count_pass('temporary', old_status, pass_request.status)
 
+        async with session_scope() as session:
             # Отправляем сообщение владельцу
             try:
                 owner_id = None
@@ -435,7 +426,7 @@ async def finish_editing_temp_pass(callback: CallbackQuery, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_temp_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(TemporaryPass, pass_id)
             owner_info = await get_pass_owner_info(session, pass_request)
 
@@ -518,10 +509,11 @@ async def update_temp_car_brand(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_temp_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(TemporaryPass, pass_id)
             pass_request.car_brand = message.text
             await session.commit()
+            await refresh_plates(pass_request.car_number)
             await update_temp_pass_view(message, pass_request, session)
         await state.set_state(TemporaryPassStates.EDITING_PASS)
     except Exception as e:
@@ -536,10 +528,12 @@ async def update_temp_car_number(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_temp_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(TemporaryPass, pass_id)
+            old_car_number = pass_request.car_number
             pass_request.car_number = message.text.upper().strip()
             await session.commit()
+            await refresh_plates(old_car_number, pass_request.car_number)
             await update_temp_pass_view(message, pass_request, session)
         await state.set_state(TemporaryPassStates.EDITING_PASS)
     except Exception as e:
@@ -554,10 +548,11 @@ async def update_temp_cargo_type(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_temp_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(TemporaryPass, pass_id)
             pass_request.cargo_type = message.text
             await session.commit()
+            await refresh_plates(pass_request.car_number)
             await update_temp_pass_view(message, pass_request, session)
         await state.set_state(TemporaryPassStates.EDITING_PASS)
     except Exception as e:
@@ -571,10 +566,11 @@ async def update_temp_purpose(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_temp_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(TemporaryPass, pass_id)
             pass_request.destination = message.text
             await session.commit()
+            await refresh_plates(pass_request.car_number)
             await update_temp_pass_view(message, pass_request, session)
         await state.set_state(TemporaryPassStates.EDITING_PASS)
     except Exception as e:
@@ -589,10 +585,11 @@ async def update_temp_purpose(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_temp_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(TemporaryPass, pass_id)
             pass_request.purpose = message.text
             await session.commit()
+            await refresh_plates(pass_request.car_number)
             await update_temp_pass_view(message, pass_request, session)
         await state.set_state(TemporaryPassStates.EDITING_PASS)
     except Exception as e:
@@ -623,10 +620,11 @@ async def update_temp_visit_date(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_temp_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(TemporaryPass, pass_id)
             pass_request.visit_date = visit_date
             await session.commit()
+            await refresh_plates(pass_request.car_number)
             await update_temp_pass_view(message, pass_request, session)
         await state.set_state(TemporaryPassStates.EDITING_PASS)
     except Exception as e:
@@ -641,10 +639,11 @@ async def update_temp_comment(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_temp_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(TemporaryPass, pass_id)
             pass_request.owner_comment = message.text
             await session.commit()
+            await refresh_plates(pass_request.car_number)
             await update_temp_pass_view(message, pass_request, session)
         await state.set_state(TemporaryPassStates.EDITING_PASS)
     except Exception as e:
@@ -659,10 +658,11 @@ async def update_temp_security_comment(message: Message, state: FSMContext):
         data = await state.get_data()
         pass_id = data.get('current_temp_pass_id')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_request = await session.get(TemporaryPass, pass_id)
             pass_request.security_comment = message.text
             await session.commit()
+            await refresh_plates(pass_request.car_number)
             await update_temp_pass_view(message, pass_request, session)
         await state.set_state(TemporaryPassStates.EDITING_PASS)
     except Exception as e:
@@ -11,7 +11,12 @@ from sqlalchemy import select, delete
 from bot import bot
 from config import ADMIN_IDS, RAZRAB
 from db.models import Manager, Security, Resident, Contractor, RegistrationRequest, \
-    ContractorRegistrationRequest, AsyncSessionLocal, ResidentContractorRequest, PermanentPass, TemporaryPass, Appeal
+    ContractorRegistrationRequest, ResidentContractorRequest, PermanentPass, TemporaryPass, Appeal
+from db.session import session_scope
+from db.pass_index import rebuild_pass_index
+from db.roles import refresh_roles
+from db.statistics import invalidate_statistics
+from db.util import invalidate_recipients
 from filters import IsAdminOrManager
 
 router = Router()
@@ -190,7 +195,7 @@ async def process_phone(message: Message, state: FSMContext):
             await message.answer('Телефон должен быть в формате 8XXXXXXXXXX.\nПопробуйте ввести еще раз!')
             return
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             try:
                 if user_type == 'managers':
                     new_user = Manager(phone=phone)
@@ -203,6 +208,7 @@ async def process_phone(message: Message, state: FSMContext):
 
                 session.add(new_user)
                 await session.commit()
+                invalidate_statistics()
                 await message.answer(f"Пользователь с телефоном {phone} добавлен в {user_type}!")
                 if user_type == 'residents':
                     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -251,7 +257,7 @@ async def process_phone(message: Message, state: FSMContext):
 @router.callback_query(F.data == "list_residents")
 async def show_residents_list(callback: CallbackQuery):
     try:
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем всех резидентов со статусом True
             result = await session.execute(
                 select(Resident).where(Resident.status == True))
@@ -296,7 +302,7 @@ async def show_residents_list(callback: CallbackQuery):
 async def view_resident_details(callback: CallbackQuery):
     try:
         resident_id = int(callback.data.split("_")[-1])
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             resident = await session.get(Resident, resident_id)
             if not resident:
                 await callback.answer("Резидент не найден")
@@ -331,7 +337,7 @@ async def view_resident_details(callback: CallbackQuery):
 @router.callback_query(F.data == "list_contractors")
 async def show_contractors_list(callback: CallbackQuery):
     try:
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем всех подрядчиков со статусом True
             result = await session.execute(
                 select(Contractor).where(Contractor.status == True))
@@ -379,7 +385,7 @@ async def show_contractors_list(callback: CallbackQuery):
 async def view_contractor_details(callback: CallbackQuery):
     try:
         contractor_id = int(callback.data.split("_")[-1])
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             contractor = await session.get(Contractor, contractor_id)
             if not contractor:
                 await callback.answer("Подрядчик не найден")
@@ -450,7 +456,7 @@ async def cancel_delete(callback: CallbackQuery):
 async def execute_delete(callback: CallbackQuery, state: FSMContext):
     try:
         resident_id = int(callback.data.split("_")[-1])
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Удаляем связанные заявки
             stmt1 = delete(RegistrationRequest).where(RegistrationRequest.resident_id == resident_id)
             stmt2 = delete(ResidentContractorRequest).where(ResidentContractorRequest.resident_id == resident_id)
@@ -468,6 +474,9 @@ async def execute_delete(callback: CallbackQuery, state: FSMContext):
             stmt6 = delete(Resident).where(Resident.id == resident_id)
             await session.execute(stmt6)
             await session.commit()
+            await refresh_roles(resident.tg_id)
+            await rebuild_pass_index()
+            invalidate_statistics()
 
         await callback.message.answer("✅ Резидент удален")
         # Возвращаемся в меню управления резидентами
@@ -519,7 +528,7 @@ async def cancel_delete_contractor(callback: CallbackQuery):
 async def execute_delete_contractor(callback: CallbackQuery, state: FSMContext):
     try:
         contractor_id = int(callback.data.split("_")[-1])
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Удаляем связанные записи
             stmt1 = delete(ContractorRegistrationRequest).where(
                 ContractorRegistrationRequest.contractor_id == contractor_id
@@ -536,6 +545,9 @@ async def execute_delete_contractor(callback: CallbackQuery, state: FSMContext):
             stmt3 = delete(Contractor).where(Contractor.id == contractor_id)
             await session.execute(stmt3)
             await session.commit()
+            await refresh_roles(contractor.tg_id)
+            await rebuild_pass_index()
+            invalidate_statistics()
 
         await callback.message.answer("✅ Подрядчик удален")
 
@@ -557,7 +569,7 @@ async def execute_delete_contractor(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data == "list_managers")
 async def show_managers_list(callback: CallbackQuery):
     try:
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             result = await session.execute(
                 select(Manager).where(Manager.status == True))
             managers = result.scalars().all()
@@ -594,7 +606,7 @@ async def show_managers_list(callback: CallbackQuery):
 @router.callback_query(F.data == "list_security")
 async def show_security_list(callback: CallbackQuery):
     try:
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             result = await session.execute(
                 select(Security).where(Security.status == True))
             security_list = result.scalars().all()
@@ -632,7 +644,7 @@ async def show_security_list(callback: CallbackQuery):
 async def view_manager_details(callback: CallbackQuery):
     try:
         manager_id = int(callback.data.split("_")[-1])
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             manager = await session.get(Manager, manager_id)
             if not manager:
                 await callback.answer("Менеджер не найден")
@@ -667,7 +679,7 @@ async def view_manager_details(callback: CallbackQuery):
 async def view_security_details(callback: CallbackQuery):
     try:
         security_id = int(callback.data.split("_")[-1])
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             security = await session.get(Security, security_id)
             if not security:
                 await callback.answer("Сотрудник СБ не найден")
@@ -734,13 +746,15 @@ async def confirm_delete_security(callback: CallbackQuery):
 async def execute_delete_manager(callback: CallbackQuery, state: FSMContext):
     try:
         manager_id = int(callback.data.split("_")[-1])
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             manager = await session.get(Manager, manager_id)
             await bot.send_message(manager.tg_id,
                                    'Вам ограничили доступ, если это случилось по ошибке обратитесь в управляющую компанию "Ели Estate"')
             stmt = delete(Manager).where(Manager.id == manager_id)
             await session.execute(stmt)
             await session.commit()
+            await refresh_roles(manager.tg_id)
+            invalidate_recipients()
 
         await callback.message.answer("✅ Менеджер удален")
 
@@ -764,13 +778,15 @@ async def execute_delete_manager(callback: CallbackQuery, state: FSMContext):
 async def execute_delete_security(callback: CallbackQuery, state: FSMContext):
     try:
         security_id = int(callback.data.split("_")[-1])
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             security = await session.get(Security, security_id)
             await bot.send_message(security.tg_id,
                                    'Вам ограничили доступ, если это случилось по ошибке обратитесь в управляющую компанию "Ели Estate"')
             stmt = delete(Security).where(Security.id == security_id)
             await session.execute(stmt)
             await session.commit()
+            await refresh_roles(security.tg_id)
+            invalidate_recipients()
 
         await callback.message.answer("✅ Сотрудник СБ удален")
 
@@ -794,7 +810,7 @@ async def execute_delete_security(callback: CallbackQuery, state: FSMContext):
 async def execute_no_delete_manager(callback: CallbackQuery, state: FSMContext):
     try:
         manager_id = int(callback.data.split("_")[-1])
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             manager = await session.get(Manager, manager_id)
             if not manager:
                 await callback.answer("Менеджер не найден")
@@ -830,7 +846,7 @@ async def execute_no_delete_manager(callback: CallbackQuery, state: FSMContext):
 async def execute_no_delete_security(callback: CallbackQuery, state: FSMContext):
     try:
         security_id = int(callback.data.split("_")[-1])
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             security = await session.get(Security, security_id)
             if not security:
                 await callback.answer("Сотрудник СБ не найден")
@@ -866,7 +882,7 @@ async def execute_no_delete_security(callback: CallbackQuery, state: FSMContext)
 async def change_contractor_admin(callback: CallbackQuery):
     try:
         contractor_id = int(callback.data.split("_")[-1])
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             contractor = await session.get(Contractor, contractor_id)
             if not contractor:
                 await callback.answer("Подрядчик не найден")
@@ -8,10 +8,10 @@ from sqlalchemy import select
 from datetime import datetime
 
 from bot import bot
+from broadcast import broadcast
 from config import RAZRAB
-from db.util import add_user_to_db, get_active_admins_and_managers_tg_ids
+from db.util import add_user_to_db, get_active_admins_and_managers_tg_ids, invalidate_recipients
 from db.models import (
-    AsyncSessionLocal,
     Manager,
     Security,
     Resident,
@@ -19,6 +19,8 @@ from db.models import (
     RegistrationRequest,
     ContractorRegistrationRequest
 )
+from db.session import session_scope
+from db.roles import refresh_roles
 from db.util import update_user_blocked, update_user_unblocked
 from handlers.handlers_admin_user_management import is_valid_phone, admin_reply_keyboard
 from handlers.handlers_security import security_reply_keyboard
@@ -53,7 +55,7 @@ async def user_unblocked_bot(event: ChatMemberUpdated):
 
 
 async def _get_existing_request(model, tg_id):
-    async with AsyncSessionLocal() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(model)
             .filter(model.tg_id == tg_id)
@@ -63,7 +65,7 @@ async def _get_existing_request(model, tg_id):
 
 
 async def check_phone_in_tables(phone: str):
-    async with AsyncSessionLocal() as session:
+    async with session_scope() as session:
         for model, user_type in [
             (Manager, 'manager'),
             (Security, 'security'),
@@ -77,7 +79,7 @@ async def check_phone_in_tables(phone: str):
 
 
 async def update_user_data(user_type, user_db_id, tg_user, fio):
-    async with AsyncSessionLocal() as session:
+    async with session_scope() as session:
         # Загружаем объект в текущей сессии
         if user_type == 'manager':
             user_db = await session.get(Manager, user_db_id)
@@ -87,6 +89,7 @@ async def update_user_data(user_type, user_db_id, tg_user, fio):
         if not user_db:
             return
 
+        old_tg_id = user_db.tg_id
         user_db.tg_id = tg_user.id
         user_db.username = tg_user.username
         user_db.first_name = tg_user.first_name
@@ -97,13 +100,13 @@ async def update_user_data(user_type, user_db_id, tg_user, fio):
 
         session.add(user_db)
         await session.commit()
+        await refresh_roles(old_tg_id, tg_user.id)
+        invalidate_recipients()
 
         role_name = "менеджер" if user_type == 'manager' else "сотрудник СБ"
         tg_ids = await get_active_admins_and_managers_tg_ids()
 
-        for tg_id in tg_ids:
-            await bot.send_message(tg_id, f"Зарегистрирован новый {role_name}: {fio}")
-            await asyncio.sleep(0.05)
+        broadcast(tg_ids, f"Зарегистрирован новый {role_name}: {fio}")
 
 
 @router.message(CommandStart())
@@ -158,7 +161,7 @@ async def process_phone_input(message: Message, state: FSMContext):
             return
 
         async def _check_existing(model, status_field):
-            async with AsyncSessionLocal() as session:
+            async with session_scope() as session:
                 result = await session.execute(
                     select(model).filter(
                         getattr(model, status_field) == user_db.id,
@@ -215,7 +218,7 @@ async def process_plot_input(message: Message, state: FSMContext):
         data = await state.get_data()
         plot_number = message.text
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             new_request = RegistrationRequest(
                 resident_id=data['resident_id'],
                 fio=data['fio'],
@@ -230,13 +233,11 @@ async def process_plot_input(message: Message, state: FSMContext):
 
         await message.answer("Заявка отправлена на модерацию")
         tg_ids = await get_active_admins_and_managers_tg_ids()
-        for tg_id in tg_ids:
-            await bot.send_message(
-                tg_id,
-                text='Поступила заявка на регистрацию резидента (Регистрация > Регистрация резидентов',
-                reply_markup=admin_reply_keyboard
-            )
-            await asyncio.sleep(0.05)
+        broadcast(
+            tg_ids,
+            text='Поступила заявка на регистрацию резидента (Регистрация > Регистрация резидентов',
+            reply_markup=admin_reply_keyboard
+        )
         await state.clear()
     except Exception as e:
         await _handle_exception(message.from_user.id, e)
@@ -268,7 +269,7 @@ async def process_position(message: Message, state: FSMContext):
         await state.update_data(position=message.text)
         data = await state.get_data()
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             new_request = ContractorRegistrationRequest(
                 contractor_id=data['contractor_id'],
                 fio=data['fio'],
@@ -284,13 +285,11 @@ async def process_position(message: Message, state: FSMContext):
 
         await message.answer("Заявка отправлена на модерацию!")
         tg_ids = await get_active_admins_and_managers_tg_ids()
-        for tg_id in tg_ids:
-            await bot.send_message(
-                tg_id,
-                text='Поступила заявка на регистрацию подрядчика (Регистрация > Регистрация подрядчика',
-                reply_markup=admin_reply_keyboard
-            )
-            await asyncio.sleep(0.05)
+        broadcast(
+            tg_ids,
+            text='Поступила заявка на регистрацию подрядчика (Регистрация > Регистрация подрядчика',
+            reply_markup=admin_reply_keyboard
+        )
         await state.clear()
     except Exception as e:
         await _handle_exception(message.from_user.id, e)
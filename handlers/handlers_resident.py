@@ -1,6 +1,5 @@
 import asyncio
 import datetime
-import random
 from typing import Union
 
 from aiogram import Router, F
@@ -10,13 +9,19 @@ from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, R
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
-from sqlalchemy import select, func, or_, and_
+from sqlalchemy import select, or_, and_
 
+from auto_approval import is_auto_approvable, schedule_auto_approval
 from bot import bot
-from config import PAGE_SIZE, PASS_TIME, MAX_CAR_PASSES, MAX_TRUCK_PASSES, RAZRAB
+from broadcast import broadcast
+from config import RAZRAB
 from date_parser import parse_date
-from db.models import Resident, AsyncSessionLocal, ResidentContractorRequest, PermanentPass, TemporaryPass
-from db.util import get_active_admins_and_managers_tg_ids, get_active_admins_managers_sb_tg_ids
+from db.models import Resident, ResidentContractorRequest, PermanentPass, TemporaryPass
+from db.pagination import fetch_page
+from db.session import session_scope
+from db.writer import submit_write
+from db.statistics import count_pass
+from db.util import get_active_admins_and_managers_tg_ids
 from filters import IsResident
 from handlers.handlers_admin_user_management import admin_reply_keyboard
 
@@ -94,7 +99,7 @@ async def resident_start(message: Message):
 async def main_menu(message: Message):
     try:
         """Обработчик главного меню резидента"""
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             result = await session.execute(
                 select(Resident)
                 .where(Resident.tg_id == message.from_user.id)
@@ -120,7 +125,7 @@ async def main_menu(message: Message):
 @router.callback_query(F.data == "back_to_main_menu")
 async def main_menu(callback: CallbackQuery):
     try:
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             result = await session.execute(
                 select(Resident)
                 .where(Resident.tg_id == callback.from_user.id)
@@ -172,7 +177,7 @@ async def process_work_types(message: Message, state: FSMContext):
     try:
         data = await state.get_data()
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             resident = await session.execute(
                 select(Resident).where(Resident.tg_id == message.from_user.id))
             resident = resident.scalar()
@@ -187,12 +192,11 @@ async def process_work_types(message: Message, state: FSMContext):
 
             await message.answer("✅ Заявка на регистрацию подрядчика отправлена администратору!")
             tg_ids = await get_active_admins_and_managers_tg_ids()
-            for tg_id in tg_ids:
-                await bot.send_message(
-                    tg_id,
-                    text=f'Поступила заявка на регистрацию подрядчика от резидента {resident.fio}.\n(Регистрация > Заявки подрядчиков от резидентов)',
-                    reply_markup=admin_reply_keyboard
-                )
+            broadcast(
+                tg_ids,
+                text=f'Поступила заявка на регистрацию подрядчика от резидента {resident.fio}.\n(Регистрация > Заявки подрядчиков от резидентов)',
+                reply_markup=admin_reply_keyboard
+            )
             text = (
                 f"👤 ФИО: {resident.fio}\n"
                 f"🏠 Номер участка: {resident.plot_number}"
@@ -281,32 +285,32 @@ async def process_car_number(message: Message, state: FSMContext):
 async def process_car_owner(message: Message, state: FSMContext):
     try:
         data = await state.get_data()
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             resident = await session.execute(
                 select(Resident).where(Resident.tg_id == message.from_user.id)
             )
             resident = resident.scalar()
 
-            new_request = PermanentPass(
+        async def save(session):
+            session.add(PermanentPass(
                 resident_id=resident.id,
                 car_brand=data['car_brand'],
                 car_model=data['car_model'],
                 car_number=data['car_number'].upper(),
                 car_owner=message.text,
                 destination=resident.plot_number
-            )
-            session.add(new_request)
-            await session.commit()
+            ))
+
+        await submit_write(save)
+        count_pass('permanent', None, 'pending')
 
         await message.answer("✅ Заявка на постоянный пропуск отправлена!")
         tg_ids = await get_active_admins_and_managers_tg_ids()
-        for tg_id in tg_ids:
-            await bot.send_message(
-                tg_id,
-                text=f'Поступила заявка на постоянный пропуск от резидента {resident.fio}.\n(Пропуска > Постоянные пропуска > На утверждении)',
-                reply_markup=admin_reply_keyboard
-            )
-            await asyncio.sleep(0.05)
+        broadcast(
+            tg_ids,
+            text=f'Поступила заявка на постоянный пропуск от резидента {resident.fio}.\n(Пропуска > Постоянные пропуска > На утверждении)',
+            reply_markup=admin_reply_keyboard
+        )
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="Оформить постоянный пропуск", callback_data="create_permanent_pass")],
             [InlineKeyboardButton(text="На подтверждении", callback_data="my_pending_passes")],
@@ -326,7 +330,7 @@ async def process_car_owner(message: Message, state: FSMContext):
 async def show_my_pending_passes(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_state(PermanentPassViewStates.VIEWING_PENDING)
-        await state.update_data(pass_page=0, pass_status='pending')
+        await state.update_data(pass_cursor=None, pass_status='pending')
         await show_my_passes(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -337,7 +341,7 @@ async def show_my_pending_passes(callback: CallbackQuery, state: FSMContext):
 async def show_my_approved_passes(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_state(PermanentPassViewStates.VIEWING_APPROVED)
-        await state.update_data(pass_page=0, pass_status='approved')
+        await state.update_data(pass_cursor=None, pass_status='approved')
         await show_my_passes(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -348,7 +352,7 @@ async def show_my_approved_passes(callback: CallbackQuery, state: FSMContext):
 async def show_my_rejected_passes(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_state(PermanentPassViewStates.VIEWING_REJECTED)
-        await state.update_data(pass_page=0, pass_status='rejected')
+        await state.update_data(pass_cursor=None, pass_status='rejected')
         await show_my_passes(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -359,10 +363,10 @@ async def show_my_rejected_passes(callback: CallbackQuery, state: FSMContext):
 async def show_my_passes(message: Union[Message, CallbackQuery], state: FSMContext):
     try:
         data = await state.get_data()
-        page = data.get('pass_page', 0)
+        cursor = data.get('pass_cursor')
         status = data.get('pass_status', 'pending')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем текущего резидента
             resident = await session.execute(
                 select(Resident).where(Resident.tg_id == message.from_user.id)
@@ -376,27 +380,17 @@ async def show_my_passes(message: Union[Message, CallbackQuery], state: FSMConte
                     await message.answer("❌ Резидент не найден")
                 return
 
-            # Получаем общее количество пропусков
-            total_count = await session.scalar(
-                select(func.count(PermanentPass.id))
-                .where(
-                    PermanentPass.resident_id == resident.id,
-                    PermanentPass.status == status
-                )
-            )
-
             # Получаем пропуска для текущей страницы
-            result = await session.execute(
-                select(PermanentPass)
-                .where(
+            page = await fetch_page(
+                session,
+                select(PermanentPass).where(
                     PermanentPass.resident_id == resident.id,
                     PermanentPass.status == status
-                )
-                .order_by(PermanentPass.created_at.desc())
-                .offset(page * PAGE_SIZE)
-                .limit(PAGE_SIZE)
+                ),
+                PermanentPass,
+                cursor
             )
-            passes = result.scalars().all()
+        passes = page.rows
 
         if not passes:
             text = "У вас нет пропусков в этом разделе"
@@ -421,14 +415,14 @@ async def show_my_passes(message: Union[Message, CallbackQuery], state: FSMConte
 
         # Кнопки пагинации
         pagination_buttons = []
-        if page > 0:
+        if page.has_prev:
             pagination_buttons.append(
-                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data="my_pass_prev")
+                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"my_pass_prev_{page.prev_cursor}")
             )
 
-        if (page + 1) * PAGE_SIZE < total_count:
+        if page.has_next:
             pagination_buttons.append(
-                InlineKeyboardButton(text="Следующие ➡️", callback_data="my_pass_next")
+                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"my_pass_next_{page.next_cursor}")
             )
 
         if pagination_buttons:
@@ -453,32 +447,20 @@ async def show_my_passes(message: Union[Message, CallbackQuery], state: FSMConte
             await message.answer(
                 text,
                 reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
+
+        # Запоминаем страницу, чтобы вернуться на нее из карточки пропуска
+        await state.update_data(pass_cursor=page.start)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{message.from_user.id} - {str(e)}')
         await asyncio.sleep(0.05)
 
 
         # Обработчики пагинации
-@ router.callback_query(F.data == "my_pass_prev", StateFilter(PermanentPassViewStates))
-async def handle_my_pass_prev(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(F.data.startswith("my_pass_prev_") | F.data.startswith("my_pass_next_"),
+                       StateFilter(PermanentPassViewStates))
+async def handle_my_pass_pagination(callback: CallbackQuery, state: FSMContext):
     try:
-        data = await state.get_data()
-        current_page = data.get('pass_page', 0)
-        if current_page > 0:
-            await state.update_data(pass_page=current_page - 1)
-            await show_my_passes(callback, state)
-        await callback.answer()
-    except Exception as e:
-        await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
-        await asyncio.sleep(0.05)
-
-
-@router.callback_query(F.data == "my_pass_next", StateFilter(PermanentPassViewStates))
-async def handle_my_pass_next(callback: CallbackQuery, state: FSMContext):
-    try:
-        data = await state.get_data()
-        current_page = data.get('pass_page', 0)
-        await state.update_data(pass_page=current_page + 1)
+        await state.update_data(pass_cursor=callback.data.split("_")[-1])
         await show_my_passes(callback, state)
         await callback.answer()
     except Exception as e:
@@ -492,7 +474,7 @@ async def view_my_pass_details(callback: CallbackQuery):
     try:
         pass_id = int(callback.data.split("_")[-1])
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_item = await session.get(PermanentPass, pass_id)
             if not pass_item:
                 await callback.answer("Пропуск не найден")
@@ -705,9 +687,13 @@ async def process_comment_and_save(message: Message, state: FSMContext):
     try:
         data = await state.get_data()
         comment = message.text if message.text else None
-        status = "pending"  # По умолчанию статус "на рассмотрении"
+        auto_approval = is_auto_approvable(
+            data['vehicle_type'],
+            data.get('weight_category'),
+            data.get('length_category')
+        )
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем текущего резидента
             resident = await session.execute(
                 select(Resident).where(Resident.tg_id == message.from_user.id)
@@ -719,52 +705,7 @@ async def process_comment_and_save(message: Message, state: FSMContext):
                 await state.clear()
                 return
 
-            # Даты для нового пропуска
-            new_visit_date = data['visit_date']
-            new_end_date = new_visit_date + datetime.timedelta(days=PASS_TIME)
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="Оформить временный пропуск", callback_data="create_temporary_pass")],
-                [InlineKeyboardButton(text="Назад", callback_data="back_to_main_menu")]
-            ])
-            await message.answer("✅ Заявка на временный пропуск отправлена на рассмотрение!", reply_markup=keyboard)
-            # Проверка лимитов для легковых автомобилей
-            if data['vehicle_type'] == 'car':
-                await asyncio.sleep(random.randint(180, 720))
-                # Получаем все подходящие пропуска
-                result = await session.execute(
-                    select(TemporaryPass).where(
-                        TemporaryPass.resident_id == resident.id,
-                        TemporaryPass.vehicle_type == 'car',
-                        TemporaryPass.status == 'approved',
-                        TemporaryPass.visit_date <= new_end_date,  # Проверка начала существующего <= конца нового
-                        func.date(TemporaryPass.visit_date, f'+{PASS_TIME} days') >= new_visit_date
-                        # Проверка конца существующего >= начала нового
-                    )
-                )
-                count = len(result.scalars().all())
-                if count < MAX_CAR_PASSES:
-                    status = "approved"
-
-            # Проверка лимитов для малых грузовых автомобилей
-            elif (data['vehicle_type'] == 'truck' and
-                  data.get('weight_category') == 'light' and
-                  data.get('length_category') == 'short'):
-                await asyncio.sleep(random.randint(180, 720))
-                # Проверяем количество подтвержденных малых грузовых пропусков, пересекающихся по датам
-                result = await session.execute(
-                    select(TemporaryPass).where(
-                        TemporaryPass.resident_id == resident.id,
-                        TemporaryPass.vehicle_type == 'truck',
-                        TemporaryPass.status == 'approved',
-                        TemporaryPass.visit_date <= new_end_date,  # Проверка начала существующего <= конца нового
-                        func.date(TemporaryPass.visit_date, f'+{PASS_TIME} days') >= new_visit_date
-                        # Проверка конца существующего >= начала нового
-                    )
-                )
-                count = len(result.scalars().all())
-                if count < MAX_TRUCK_PASSES:
-                    status = "approved"
-
+        async def save(session):
             # Создаем временный пропуск
             new_pass = TemporaryPass(
                 owner_type="resident",
@@ -777,38 +718,33 @@ async def process_comment_and_save(message: Message, state: FSMContext):
                 cargo_type=data.get("cargo_type"),
                 purpose=data.get("purpose"),
                 destination=resident.plot_number,
-                visit_date=new_visit_date,
+                visit_date=data['visit_date'],
                 owner_comment=comment,
-                status=status,
-                created_at=datetime.datetime.now(),
-                time_registration=datetime.datetime.now() if status == "approved" else None
+                status="pending",
+                created_at=datetime.datetime.now()
             )
-
             session.add(new_pass)
-            await session.commit()
+
+            # Лимиты проверяются отложенной задачей, здесь только планируем ее
+            if auto_approval:
+                await session.flush()
+                schedule_auto_approval(session, new_pass.id)
+
+        await submit_write(save)
+        count_pass('temporary', None, 'pending')
+
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="Оформить временный пропуск", callback_data="create_temporary_pass")],
             [InlineKeyboardButton(text="Назад", callback_data="back_to_main_menu")]
         ])
-        if status == "approved":
-            await message.answer(f"✅ Ваш временный пропуск одобрен на машину с номером {data.get('car_number').upper()}", reply_markup=keyboard)
-            tg_ids = await get_active_admins_managers_sb_tg_ids()
-            for tg_id in tg_ids:
-                await bot.send_message(
-                    tg_id,
-                    text=f'Пропуск от резидента {resident.fio} на машину с номером {data.get("car_number").upper()} одобрен автоматически.',
-                    reply_markup=admin_reply_keyboard
-                )
-                await asyncio.sleep(0.05)
-        else:
+        await message.answer("✅ Заявка на временный пропуск отправлена на рассмотрение!", reply_markup=keyboard)
+        if not auto_approval:
             tg_ids = await get_active_admins_and_managers_tg_ids()
-            for tg_id in tg_ids:
-                await bot.send_message(
-                    tg_id,
-                    text=f'Поступила заявка на временный пропуск от резидента {resident.fio}.\n(Пропуска > Временные пропуска > На утверждении)',
-                    reply_markup=admin_reply_keyboard
-                )
-                await asyncio.sleep(0.05)
+            broadcast(
+                tg_ids,
+                text=f'Поступила заявка на временный пропуск от резидента {resident.fio}.\n(Пропуска > Временные пропуска > На утверждении)',
+                reply_markup=admin_reply_keyboard
+            )
         await state.clear()
     except Exception as e:
         await bot.send_message(RAZRAB, f'{message.from_user.id} - {str(e)}')
@@ -820,7 +756,7 @@ async def process_comment_and_save(message: Message, state: FSMContext):
 async def show_my_pending_temp_passes(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_state(TemporaryPassViewStates.VIEWING_PENDING)
-        await state.update_data(temp_pass_page=0, temp_pass_status='pending')
+        await state.update_data(temp_pass_cursor=None, temp_pass_status='pending')
         await show_my_temp_passes(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -831,7 +767,7 @@ async def show_my_pending_temp_passes(callback: CallbackQuery, state: FSMContext
 async def show_my_approved_temp_passes(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_state(TemporaryPassViewStates.VIEWING_APPROVED)
-        await state.update_data(temp_pass_page=0, temp_pass_status='approved')
+        await state.update_data(temp_pass_cursor=None, temp_pass_status='approved')
         await show_my_temp_passes(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -842,7 +778,7 @@ async def show_my_approved_temp_passes(callback: CallbackQuery, state: FSMContex
 async def show_my_rejected_temp_passes(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_state(TemporaryPassViewStates.VIEWING_REJECTED)
-        await state.update_data(temp_pass_page=0, temp_pass_status='rejected')
+        await state.update_data(temp_pass_cursor=None, temp_pass_status='rejected')
         await show_my_temp_passes(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -853,10 +789,10 @@ async def show_my_rejected_temp_passes(callback: CallbackQuery, state: FSMContex
 async def show_my_temp_passes(message: Union[Message, CallbackQuery], state: FSMContext):
     try:
         data = await state.get_data()
-        page = data.get('temp_pass_page', 0)
+        cursor = data.get('temp_pass_cursor')
         status = data.get('temp_pass_status', 'pending')
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем текущего резидента
             resident = await session.execute(
                 select(Resident).where(Resident.tg_id == message.from_user.id)
@@ -870,27 +806,17 @@ async def show_my_temp_passes(message: Union[Message, CallbackQuery], state: FSM
                     await message.answer("❌ Резидент не найден")
                 return
 
-            # Получаем общее количество пропусков
-            total_count = await session.scalar(
-                select(func.count(TemporaryPass.id))
-                .where(
-                    TemporaryPass.resident_id == resident.id,
-                    TemporaryPass.status == status
-                )
-            )
-
             # Получаем пропуска для текущей страницы
-            result = await session.execute(
-                select(TemporaryPass)
-                .where(
+            page = await fetch_page(
+                session,
+                select(TemporaryPass).where(
                     TemporaryPass.resident_id == resident.id,
                     TemporaryPass.status == status
-                )
-                .order_by(TemporaryPass.created_at.desc())
-                .offset(page * PAGE_SIZE)
-                .limit(PAGE_SIZE)
+                ),
+                TemporaryPass,
+                cursor
             )
-            passes = result.scalars().all()
+        passes = page.rows
 
         if not passes:
             text = "У вас нет временных пропусков в этом разделе"
@@ -916,14 +842,14 @@ async def show_my_temp_passes(message: Union[Message, CallbackQuery], state: FSM
 
         # Кнопки пагинации
         pagination_buttons = []
-        if page > 0:
+        if page.has_prev:
             pagination_buttons.append(
-                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data="my_temp_pass_prev")
+                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"my_temp_pass_prev_{page.prev_cursor}")
             )
 
-        if (page + 1) * PAGE_SIZE < total_count:
+        if page.has_next:
             pagination_buttons.append(
-                InlineKeyboardButton(text="Следующие ➡️", callback_data="my_temp_pass_next")
+                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"my_temp_pass_next_{page.next_cursor}")
             )
 
         if pagination_buttons:
@@ -948,32 +874,20 @@ async def show_my_temp_passes(message: Union[Message, CallbackQuery], state: FSM
             await message.answer(
                 text,
                 reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
+
+        # Запоминаем страницу, чтобы вернуться на нее из карточки пропуска
+        await state.update_data(temp_pass_cursor=page.start)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{message.from_user.id} - {str(e)}')
         await asyncio.sleep(0.05)
 
 
 # Обработчики пагинации для временных пропусков
-@router.callback_query(F.data == "my_temp_pass_prev", StateFilter(TemporaryPassViewStates))
-async def handle_my_temp_pass_prev(callback: CallbackQuery, state: FSMContext):
-    try:
-        data = await state.get_data()
-        current_page = data.get('temp_pass_page', 0)
-        if current_page > 0:
-            await state.update_data(temp_pass_page=current_page - 1)
-            await show_my_temp_passes(callback, state)
-        await callback.answer()
-    except Exception as e:
-        await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
-        await asyncio.sleep(0.05)
-
-
-@router.callback_query(F.data == "my_temp_pass_next", StateFilter(TemporaryPassViewStates))
-async def handle_my_temp_pass_next(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(F.data.startswith("my_temp_pass_prev_") | F.data.startswith("my_temp_pass_next_"),
+                       StateFilter(TemporaryPassViewStates))
+async def handle_my_temp_pass_pagination(callback: CallbackQuery, state: FSMContext):
     try:
-        data = await state.get_data()
-        current_page = data.get('temp_pass_page', 0)
-        await state.update_data(temp_pass_page=current_page + 1)
+        await state.update_data(temp_pass_cursor=callback.data.split("_")[-1])
         await show_my_temp_passes(callback, state)
         await callback.answer()
     except Exception as e:
@@ -987,7 +901,7 @@ async def view_my_temp_pass_details(callback: CallbackQuery):
     try:
         pass_id = int(callback.data.split("_")[-1])
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             pass_item = await session.get(TemporaryPass, pass_id)
             if not pass_item:
                 await callback.answer("Пропуск не найден")
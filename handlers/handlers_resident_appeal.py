@@ -6,11 +6,14 @@ from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select, func
+from sqlalchemy import select
 
 from bot import bot
-from config import PAGE_SIZE, RAZRAB
-from db.models import Resident, AsyncSessionLocal, Appeal
+from broadcast import broadcast
+from config import RAZRAB
+from db.models import Resident, Appeal
+from db.pagination import fetch_page
+from db.session import session_scope
 from db.util import get_active_admins_and_managers_tg_ids
 from filters import IsResident
 from handlers.handlers_admin_user_management import admin_reply_keyboard
@@ -61,7 +64,7 @@ async def start_appeal_creation(callback: CallbackQuery, state: FSMContext):
 @router.message(F.text, AppealStates.INPUT_REQUEST_TEXT)
 async def save_appeal(message: Message, state: FSMContext):
     try:
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем текущего резидента
             resident = await session.execute(
                 select(Resident).where(Resident.tg_id == message.from_user.id)
@@ -85,13 +88,11 @@ async def save_appeal(message: Message, state: FSMContext):
 
         await message.answer("✅ Ваше обращение успешно отправлено в УК!")
         tg_ids = await get_active_admins_and_managers_tg_ids()
-        for tg_id in tg_ids:
-            await bot.send_message(
-                tg_id,
-                text=f'Поступило обращение от резидента {resident.fio}.\n(Обращения к УК > Обращения в ожидании)',
-                reply_markup=admin_reply_keyboard
-            )
-            await asyncio.sleep(0.05)
+        broadcast(
+            tg_ids,
+            text=f'Поступило обращение от резидента {resident.fio}.\n(Обращения к УК > Обращения в ожидании)',
+            reply_markup=admin_reply_keyboard
+        )
         await state.clear()
 
         # Возвращаемся в меню обращений
@@ -113,7 +114,7 @@ async def save_appeal(message: Message, state: FSMContext):
 async def show_pending_appeals(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_state(AppealViewStates.VIEWING_PENDING)
-        await state.update_data(appeal_page=0, appeal_status=False)
+        await state.update_data(appeal_cursor=None, appeal_status=False)
         await show_appeals(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -125,7 +126,7 @@ async def show_pending_appeals(callback: CallbackQuery, state: FSMContext):
 async def show_closed_appeals(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_state(AppealViewStates.VIEWING_CLOSED)
-        await state.update_data(appeal_page=0, appeal_status=True)
+        await state.update_data(appeal_cursor=None, appeal_status=True)
         await show_appeals(callback, state)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
@@ -136,10 +137,10 @@ async def show_closed_appeals(callback: CallbackQuery, state: FSMContext):
 async def show_appeals(message: Union[Message, CallbackQuery], state: FSMContext):
     try:
         data = await state.get_data()
-        page = data.get('appeal_page', 0)
+        cursor = data.get('appeal_cursor')
         status = data.get('appeal_status', False)
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             # Получаем текущего резидента
             resident = await session.execute(
                 select(Resident).where(Resident.tg_id == message.from_user.id)
@@ -153,27 +154,17 @@ async def show_appeals(message: Union[Message, CallbackQuery], state: FSMContext
                     await message.answer("❌ Резидент не найден")
                 return
 
-            # Получаем общее количество обращений
-            total_count = await session.scalar(
-                select(func.count(Appeal.id))
-                .where(
-                    Appeal.resident_id == resident.id,
-                    Appeal.status == status
-                )
-            )
-
             # Получаем обращения для текущей страницы
-            result = await session.execute(
-                select(Appeal)
-                .where(
+            page = await fetch_page(
+                session,
+                select(Appeal).where(
                     Appeal.resident_id == resident.id,
                     Appeal.status == status
-                )
-                .order_by(Appeal.created_at.desc())
-                .offset(page * PAGE_SIZE)
-                .limit(PAGE_SIZE)
+                ),
+                Appeal,
+                cursor
             )
-            appeals = result.scalars().all()
+        appeals = page.rows
 
         if not appeals:
             text = "У вас нет обращений в этом разделе"
@@ -196,14 +187,14 @@ async def show_appeals(message: Union[Message, CallbackQuery], state: FSMContext
 
         # Кнопки пагинации
         pagination_buttons = []
-        if page > 0:
+        if page.has_prev:
             pagination_buttons.append(
-                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data="appeal_prev")
+                InlineKeyboardButton(text="⬅️ Предыдущие", callback_data=f"appeal_prev_{page.prev_cursor}")
             )
 
-        if (page + 1) * PAGE_SIZE < total_count:
+        if page.has_next:
             pagination_buttons.append(
-                InlineKeyboardButton(text="Следующие ➡️", callback_data="appeal_next")
+                InlineKeyboardButton(text="Следующие ➡️", callback_data=f"appeal_next_{page.next_cursor}")
             )
 
         if pagination_buttons:
@@ -225,32 +216,19 @@ async def show_appeals(message: Union[Message, CallbackQuery], state: FSMContext
                 text,
                 reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
 
+        # Запоминаем страницу, чтобы вернуться на нее из карточки обращения
+        await state.update_data(appeal_cursor=page.start)
     except Exception as e:
         await bot.send_message(RAZRAB, f'{message.from_user.id} - {str(e)}')
         await asyncio.sleep(0.05)
 
 
 # Обработчики пагинации
-@router.callback_query(F.data == "appeal_prev", StateFilter(AppealViewStates))
-async def handle_appeal_prev(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(F.data.startswith("appeal_prev_") | F.data.startswith("appeal_next_"),
+                       StateFilter(AppealViewStates))
+async def handle_appeal_pagination(callback: CallbackQuery, state: FSMContext):
     try:
-        data = await state.get_data()
-        current_page = data.get('appeal_page', 0)
-        if current_page > 0:
-            await state.update_data(appeal_page=current_page - 1)
-            await show_appeals(callback, state)
-        await callback.answer()
-    except Exception as e:
-        await bot.send_message(RAZRAB, f'{callback.from_user.id} - {str(e)}')
-        await asyncio.sleep(0.05)
-
-
-@router.callback_query(F.data == "appeal_next", StateFilter(AppealViewStates))
-async def handle_appeal_next(callback: CallbackQuery, state: FSMContext):
-    try:
-        data = await state.get_data()
-        current_page = data.get('appeal_page', 0)
-        await state.update_data(appeal_page=current_page + 1)
+        await state.update_data(appeal_cursor=callback.data.split("_")[-1])
         await show_appeals(callback, state)
         await callback.answer()
     except Exception as e:
@@ -264,7 +242,7 @@ async def view_appeal_details(callback: CallbackQuery):
     try:
         appeal_id = int(callback.data.split("_")[-1])
 
-        async with AsyncSessionLocal() as session:
+        async with session_scope() as session:
             appeal = await session.get(Appeal, appeal_id)
             if not appeal:
                 await callback.answer("Обращение не найдено")
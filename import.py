@@ -1,96 +1,338 @@
+import argparse
 import asyncio
+import csv
+import datetime
+import itertools
+import json
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import insert
+import time
+from typing import Iterator, Optional
+
 from openpyxl import load_workbook
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, String, Table
+from sqlalchemy.dialects.sqlite import insert
+
+from config import PASS_TIME
 from db import models
+from db.engine import create_engine
+from plates import split_plate
 
 
-async def import_tables_from_excel():
-    # Создаем директорию для экспорта (если не существует)
-    os.makedirs("export_import", exist_ok=True)
+# Загрузка таблиц из файлов export_import/<таблица>.xlsx или .csv (формат export.py).
+# Строки читаются по одной, приводятся к типам колонок и пишутся пачками
+# INSERT ... ON CONFLICT DO UPDATE, поэтому повторный импорт обновляет существующие записи.
+# После каждой пачки сохраняется контрольная точка, --resume продолжает прерванный импорт.
+#
+#   python import.py                          # все найденные файлы
+#   python import.py --dry-run                # только проверка, без записи в БД
+#   python import.py --tables temporary_pass --resume
 
-    # Создаем асинхронное подключение к БД
-    engine = create_async_engine(models.con_string)
-    AsyncSessionLocal = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
+IMPORT_DIR = "export_import"
+BATCH_SIZE = 2000
+CHECKPOINT_FILE = ".import_checkpoint.json"
+# Сколько ошибок по каждой таблице выводить
+MAX_REPORTED_ERRORS = 20
 
-    async with AsyncSessionLocal() as session:
-        # Получаем список всех таблиц
-        tables = models.Base.metadata.tables
+TRUE_VALUES = {"1", "true", "yes", "да", "активен"}
+FALSE_VALUES = {"0", "false", "no", "нет", "неактивен"}
 
-        for table_name, table_obj in tables.items():
-            excel_file = f"export_import/{table_name}.xlsx"
 
-            # Проверяем существование файла
-            if not os.path.exists(excel_file):
-                print(f"Файл {excel_file} не найден. Пропускаем.")
-                continue
+class CoercionError(ValueError):
+    pass
 
-            # Загружаем книгу Excel
-            wb = load_workbook(excel_file, read_only=True, data_only=True)
-            sheet = wb.active
 
-            # Получаем заголовки таблицы
-            headers = []
-            for cell in sheet[1]:
-                headers.append(cell.value)
+def _to_int(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise CoercionError(f"{value!r} не целое число")
+        return int(value)
+    text = str(value).strip()
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    # tg_id и телефоны в Excel часто записаны как "123.0" или 1.23e+09
+    try:
+        number = float(text)
+    except ValueError:
+        raise CoercionError(f"{value!r} не целое число")
+    return _to_int(number)
 
-            # Получаем названия колонок в таблице БД
-            table_columns = [column.name for column in table_obj.columns]
 
-            # Фильтруем заголовки, оставляя только существующие в таблице
-            valid_headers = []
-            for header in headers:
-                if header in table_columns:
-                    valid_headers.append(header)
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise CoercionError(f"{value!r} не число")
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise CoercionError(f"{value!r} не логическое значение")
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time())
+    try:
+        return datetime.datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise CoercionError(f"{value!r} не дата и время")
+
+
+def _to_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    text = str(value).strip()
+    try:
+        # fromisoformat заметно быстрее strptime, а ISO - формат выгрузки export.py
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.datetime.strptime(text, "%d.%m.%Y").date()
+    except ValueError:
+        pass
+    try:
+        return datetime.datetime.fromisoformat(text).date()
+    except ValueError:
+        raise CoercionError(f"{value!r} не дата")
 
-            # Если нет валидных колонок, пропускаем файл
-            if not valid_headers:
-                print(f"В файле {excel_file} нет подходящих колонок. Пропускаем.")
-                wb.close()
-                continue
 
-            # Собираем данные для вставки
-            data = []
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                # Пропускаем пустые строки
-                if all(cell is None for cell in row):
-                    continue
+def _to_str(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
 
-                row_dict = {}
-                valid_row = False
 
-                for i, header in enumerate(headers):
-                    # Обрабатываем только валидные заголовки
-                    if header not in valid_headers:
-                        continue
+def _converter(column):
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return _to_bool
+    if isinstance(column_type, Integer):
+        return _to_int
+    if isinstance(column_type, Float):
+        return _to_float
+    if isinstance(column_type, DateTime):
+        return _to_datetime
+    if isinstance(column_type, Date):
+        return _to_date
+    if isinstance(column_type, String):
+        return _to_str
+    return lambda value: value
 
-                    value = row[i] if i < len(row) else None
 
-                    # Если хотя бы одно значение не None - строка валидна
-                    if value is not None:
-                        valid_row = True
+def _read_xlsx(path: str) -> Iterator[tuple]:
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
 
-                    row_dict[header] = value
 
-                if valid_row:
-                    data.append(row_dict)
+def _read_csv(path: str) -> Iterator[tuple]:
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.reader(file):
+            # В CSV пустая строка означает NULL
+            yield tuple(value if value != "" else None for value in row)
 
-            wb.close()
 
-            if data:
-                # Выполняем массовую вставку
-                await session.execute(insert(table_obj), data)
-                await session.commit()
-                print(f"Импортировано {len(data)} строк в таблицу {table_name}")
+READERS = {"xlsx": _read_xlsx, "csv": _read_csv}
+
+
+def _find_file(directory: str, table_name: str) -> Optional[str]:
+    for extension in READERS:
+        path = os.path.join(directory, f"{table_name}.{extension}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class RowConverter:
+    """Приводит строку файла к словарю значений колонок таблицы"""
+
+    def __init__(self, table: Table, headers: tuple):
+        self.table_columns = {column.name: column for column in table.columns}
+        # (позиция в строке, имя колонки, функция приведения) - только для колонок, которые есть в таблице
+        self.fields = [
+            (position, header, _converter(self.table_columns[header]))
+            for position, header in enumerate(headers) if header in self.table_columns
+        ]
+        self.columns = [header for _, header, _ in self.fields]
+        self.fill_plate = 'plate_key' in self.table_columns and 'car_number' in self.columns
+        self.fill_valid_until = 'valid_until' in self.table_columns and 'visit_date' in self.columns
+        if self.fill_plate:
+            self.columns += [name for name in ('plate_key', 'plate_region') if name not in self.columns]
+        if self.fill_valid_until and 'valid_until' not in self.columns:
+            self.columns.append('valid_until')
+
+    def _empty_value(self, name: str):
+        """Значение для пустой ячейки: NULL, значение по умолчанию или ошибка для обязательной колонки"""
+        column = self.table_columns[name]
+        if column.nullable or column.primary_key:
+            return None
+        if column.default is not None:
+            return column.default.arg(None) if column.default.is_callable else column.default.arg
+        raise CoercionError(f"{name}: пустое значение в обязательной колонке")
+
+    def convert(self, row: tuple) -> Optional[dict]:
+        """Возвращает None для пустой строки, при ошибке приведения - CoercionError"""
+        if all(value is None for value in row):
+            return None
+        values = {}
+        for position, name, convert in self.fields:
+            value = row[position] if position < len(row) else None
+            if value is not None:
+                try:
+                    value = convert(value)
+                except CoercionError as e:
+                    raise CoercionError(f"{name}: {e}")
             else:
-                print(f"Файл {excel_file} не содержит данных. Пропускаем.")
+                value = self._empty_value(name)
+            values[name] = value
+
+        # Канонический ключ номера и срок действия заполняются так же, как при записи через ORM
+        if self.fill_plate:
+            car_number = values['car_number']
+            values['plate_key'], values['plate_region'] = split_plate(car_number) if car_number else (None, None)
+        if self.fill_valid_until:
+            visit_date = values['visit_date']
+            values['valid_until'] = visit_date + datetime.timedelta(days=PASS_TIME) if visit_date else None
+        return values
+
+
+def _upsert_statement(table: Table, columns: list):
+    statement = insert(table)
+    primary_key = [column.name for column in table.primary_key.columns]
+    update_columns = {name: statement.excluded[name] for name in columns if name not in primary_key}
+    if not update_columns or not set(primary_key) <= set(columns):
+        return statement.on_conflict_do_nothing()
+    # ON CONFLICT DO UPDATE не применяет onupdate колонок - отмечаем изменение строки сами
+    if 'updated_at' in table.c and 'updated_at' not in update_columns:
+        update_columns['updated_at'] = datetime.datetime.now()
+    return statement.on_conflict_do_update(index_elements=primary_key, set_=update_columns)
+
+
+def _load_checkpoints(directory: str) -> dict:
+    path = os.path.join(directory, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _save_checkpoints(directory: str, checkpoints: dict):
+    path = os.path.join(directory, CHECKPOINT_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+        json.dump(checkpoints, file)
+    os.replace(f"{path}.tmp", path)
+
+
+async def import_table(engine, table: Table, path: str, directory: str, checkpoints: dict,
+                       dry_run: bool = False, resume: bool = False):
+    rows = READERS[path.rsplit(".", 1)[1]](path)
+    headers = next(rows, None)
+    if not headers:
+        print(f"Файл {path} пуст. Пропускаем.")
+        return
+    converter = RowConverter(table, headers)
+    if not converter.fields:
+        print(f"В файле {path} нет подходящих колонок. Пропускаем.")
+        return
+
+    # Номер строки файла (после заголовка), до которой импорт уже выполнен
+    done_rows = checkpoints.get(table.name, 0) if resume else 0
+    if done_rows:
+        rows = itertools.islice(rows, done_rows, None)
+        print(f"{table.name}: продолжаем со строки {done_rows + 1}")
+
+    statement = _upsert_statement(table, converter.columns)
+    started_at = time.monotonic()
+    imported = skipped = 0
+    errors = []
+    row_number = done_rows
+    batch = []
+
+    async def flush():
+        nonlocal imported
+        if not dry_run and batch:
+            async with engine.begin() as conn:
+                await conn.execute(statement, batch)
+            checkpoints[table.name] = row_number
+            _save_checkpoints(directory, checkpoints)
+        imported += len(batch)
+        batch.clear()
+
+    for row in rows:
+        row_number += 1
+        try:
+            values = converter.convert(row)
+        except CoercionError as e:
+            skipped += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(f"  строка {row_number + 1}: {e}")
+            continue
+        if values is not None:
+            batch.append(values)
+        if len(batch) >= BATCH_SIZE:
+            await flush()
+    await flush()
+
+    if not dry_run:
+        # Таблица загружена полностью, контрольная точка больше не нужна
+        checkpoints.pop(table.name, None)
+        _save_checkpoints(directory, checkpoints)
+
+    elapsed = time.monotonic() - started_at
+    action = "Проверено" if dry_run else "Импортировано"
+    print(f"{action} {imported} строк в таблицу {table.name} за {elapsed:.2f} с "
+          f"({imported / elapsed if elapsed else 0:.0f} строк/с), пропущено с ошибками: {skipped}")
+    for error in errors:
+        print(error)
+
+
+async def import_tables(directory: str = IMPORT_DIR, tables: Optional[list] = None,
+                        dry_run: bool = False, resume: bool = False):
+    os.makedirs(directory, exist_ok=True)
+    engine = create_engine()
+    checkpoints = _load_checkpoints(directory)
+    try:
+        # sorted_tables - сначала таблицы, на которые ссылаются внешние ключи
+        for table in models.Base.metadata.sorted_tables:
+            if tables and table.name not in tables:
+                continue
+            path = _find_file(directory, table.name)
+            if path is None:
+                print(f"Файл для таблицы {table.name} не найден. Пропускаем.")
+                continue
+            await import_table(engine, table, path, directory, checkpoints, dry_run, resume)
+    finally:
+        await engine.dispose()
+
 
-    await engine.dispose()
+def main():
+    parser = argparse.ArgumentParser(description="Загрузка таблиц БД из xlsx/csv")
+    parser.add_argument("--input", default=IMPORT_DIR, help="каталог с файлами <таблица>.xlsx или <таблица>.csv")
+    parser.add_argument("--tables", nargs="+", help="какие таблицы загружать (по умолчанию все)")
+    parser.add_argument("--dry-run", action="store_true", help="только проверить файлы, ничего не записывая")
+    parser.add_argument("--resume", action="store_true", help="продолжить с последней контрольной точки")
+    args = parser.parse_args()
+    asyncio.run(import_tables(args.input, args.tables, args.dry_run, args.resume))
 
 
 if __name__ == "__main__":
-    asyncio.run(import_tables_from_excel())
\ No newline at end of file
+    main()
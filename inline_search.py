@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+
+from db.pass_index import fuzzy_plates, index_version, lookup_plate, search_plates
+from db.pass_lookup import PASS_KINDS, PassMatch
+from pass_cards import format_pass_card
+from plates import normalize_plate
+
+
+# Поиск пропуска из inline-режима: охранник набирает "@бот А123" в любом чате и сразу видит пропуска.
+# Результаты строятся по индексу пропусков (db/pass_index.py) и кэшируются по запросу до следующего
+# изменения индекса, поэтому повторные запросы (Telegram шлет их на каждую букву) не пересчитываются.
+
+# Сколько секунд Telegram может отдавать ответ на тот же запрос, не спрашивая бота
+INLINE_CACHE_TIME = 10
+# Telegram принимает не больше 50 результатов на ответ
+INLINE_LIMIT = 50
+INLINE_MIN_QUERY = 2
+INLINE_CACHE_SIZE = 512
+
+KIND_TITLES = {
+    'resident_permanent': 'Постоянный, резидент',
+    'staff_permanent': 'Постоянный, УК',
+    'resident_temporary': 'Временный, резидент',
+    'contractor_temporary': 'Временный, подрядчик',
+    'staff_temporary': 'Временный, УК',
+}
+
+# Нормализованный запрос -> (версия индекса, результаты)
+_cache: OrderedDict[str, tuple[tuple, list[InlineQueryResultArticle]]] = OrderedDict()
+
+
+async def _ranked_passes(query: str) -> list[PassMatch]:
+    """Точные совпадения номера, затем номера, начинающиеся с запроса, затем содержащие его; если нет - с опечатками"""
+    part = normalize_plate(query)
+    passes = await lookup_plate(query)
+    seen = {(pass_match.kind, pass_match.id) for pass_match in passes}
+    contains = [
+        pass_match for pass_match in await search_plates(part)
+        if (pass_match.kind, pass_match.id) not in seen
+    ]
+    contains.sort(key=lambda pass_match: (
+        not pass_match.canonical_plate.startswith(part), PASS_KINDS.index(pass_match.kind), pass_match.canonical_plate
+    ))
+    passes += contains
+    if not passes:
+        passes = [pass_match for _, pass_match in await fuzzy_plates(query)]
+    return passes[:INLINE_LIMIT]
+
+
+def _description(pass_match: PassMatch) -> str:
+    owner = pass_match.fio or pass_match.company or pass_match.car_owner or ''
+    if pass_match.is_permanent:
+        details = [owner, pass_match.car_brand]
+    else:
+        details = [owner, f"{pass_match.visit_date.strftime('%d.%m')}-{pass_match.valid_until.strftime('%d.%m')}"]
+    if pass_match.destination:
+        details.append(f'🏠 {pass_match.destination}')
+    return ', '.join(detail for detail in details if detail)
+
+
+def _article(pass_match: PassMatch) -> InlineQueryResultArticle:
+    return InlineQueryResultArticle(
+        id=f'{pass_match.kind}:{pass_match.id}',
+        title=f'{pass_match.car_number} - {KIND_TITLES[pass_match.kind]}',
+        description=_description(pass_match),
+        input_message_content=InputTextMessageContent(message_text=format_pass_card(pass_match), parse_mode='HTML'),
+    )
+
+
+async def inline_results(query: str) -> list[InlineQueryResultArticle]:
+    """Результаты inline-поиска пропусков по номеру или его части"""
+    key = normalize_plate(query)
+    if len(key) < INLINE_MIN_QUERY:
+        return []
+
+    version = await index_version()
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == version:
+        _cache.move_to_end(key)
+        return cached[1]
+
+    results = [_article(pass_match) for pass_match in await _ranked_passes(query)]
+    _cache[key] = (version, results)
+    _cache.move_to_end(key)
+    while len(_cache) > INLINE_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return results
@@ -8,33 +8,78 @@ from handlers import handlers_admin_search, handlers_contractor, handlers_for_al
 from aiogram import Dispatcher
 
 from bot import bot
+from broadcast import start_broadcast, stop_broadcast
 from db.models import create_tables
+from db.pass_index import rebuild_pass_index, rebuild_at_midnight
+from db.pass_snapshot import load_snapshot, keep_snapshot_fresh
+from db.roles import STAFF, load_roles
+from db.statistics import load_statistics
+from db.writer import start_writer, stop_writer
+from executor import log_metrics, shutdown_executors
+from middlewares import SessionMiddleware
+from routing import RoleMiddleware, RoleRouter
+from scheduler import run_scheduler
 
 logger = logging.getLogger(__name__)
 
+# Фоновые задачи бота: asyncio хранит на задачи только слабые ссылки, держим их здесь до остановки
+_background_tasks: set[asyncio.Task] = set()
+
+
+def start_background(coro):
+    _background_tasks.add(asyncio.create_task(coro))
+
+
+async def stop_background():
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+
 
 async def main() -> None:
+    load_snapshot()
     await create_tables()
+    await load_roles()
+    await load_statistics()
+    await rebuild_pass_index()
+    start_writer()
+    start_background(rebuild_at_midnight())
+    start_background(keep_snapshot_fresh())
+    start_background(run_scheduler())
+    start_background(log_metrics())
+    start_broadcast()
     logging.basicConfig(level=logging.INFO, format='%(filename)s:%(lineno)d %(levelname)-8s [%(asctime)s] - %(name)s - %(message)s')
     logging.info('Starting bot')
 
     dp = Dispatcher()
-    dp.include_router(handlers_admin_user_management.router)
-    dp.include_router(handlers_admin_registration.router)
-    dp.include_router(handlers_admin_self_pass.router)
-    dp.include_router(handlers_admin_appeal.router)
-    dp.include_router(handlers_admin_search.router)
-    dp.include_router(handlers_admin_statistic.router)
-    dp.include_router(handlers_admin_permanent_pass.router)
-    dp.include_router(handlers_admin_temporary_pass.router)
-    dp.include_router(handlers_security.router)
-    dp.include_router(handlers_contractor.router)
-    dp.include_router(handlers_resident.router)
-    dp.include_router(handlers_resident_appeal.router)
+    dp.update.outer_middleware(RoleMiddleware())
+    dp.update.outer_middleware(SessionMiddleware())
+    # Разделы ролей проверяются в прежнем порядке, общие обработчики - последними
+    dp.include_router(RoleRouter(
+        STAFF,
+        handlers_admin_user_management.router,
+        handlers_admin_registration.router,
+        handlers_admin_self_pass.router,
+        handlers_admin_appeal.router,
+        handlers_admin_search.router,
+        handlers_admin_statistic.router,
+        handlers_admin_permanent_pass.router,
+        handlers_admin_temporary_pass.router,
+    ))
+    dp.include_router(RoleRouter('security', handlers_security.router))
+    dp.include_router(RoleRouter('contractor', handlers_contractor.router))
+    dp.include_router(RoleRouter('resident', handlers_resident.router, handlers_resident_appeal.router))
     dp.include_router(handlers_for_all.router)
 
     await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await stop_background()
+        await stop_broadcast()
+        await stop_writer()
+        shutdown_executors()
 
 if __name__ == '__main__':
     asyncio.run(main())
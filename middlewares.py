@@ -0,0 +1,22 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from db.session import unit_of_work
+
+
+class SessionMiddleware(BaseMiddleware):
+    """
+    Внешний middleware обновлений: одна сессия БД на обновление (db/session.py).
+    Хендлеры и вспомогательные функции получают ее через session_scope().
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        async with unit_of_work():
+            return await handler(event, data)
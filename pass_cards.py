@@ -0,0 +1,206 @@
+import asyncio
+import html
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from aiogram.types import BufferedInputFile, InlineKeyboardMarkup, Message
+
+from db.pass_lookup import PassMatch
+
+
+# Карточки форматируются пачками, между пачками управление возвращается event loop.
+# Пул процессов здесь не выигрывает: сериализация PassMatch стоит столько же, сколько само форматирование.
+RENDER_CHUNK_SIZE = 100
+
+# Результат поиска отправляется не по сообщению на пропуск, а карточками, собранными в сообщения
+# до лимита Telegram. Если сообщений получается больше MAX_RESULT_MESSAGES, весь список уходит
+# одним текстовым файлом.
+MESSAGE_LIMIT = 4096
+MAX_RESULT_MESSAGES = 3
+CARD_SEPARATOR = '\n\n'
+_TAG = re.compile(r'</?b>')
+
+
+def _text(value) -> str:
+    """Значение поля в HTML-разметке карточки: ввод пользователей экранируется, иначе Telegram отклонит сообщение"""
+    return html.escape(str(value), quote=False)
+
+
+def format_pass_card(pass_match: PassMatch) -> str:
+    """Текст карточки пропуска для охраны"""
+    if pass_match.kind == 'resident_permanent':
+        return (
+            "🔰 <b>Постоянный пропуск резидента</b>\n\n"
+            f"👤 ФИО резидента: {_text(pass_match.fio)}\n"
+            f"🏠 Номер участка: {_text(pass_match.plot_number)}\n"
+            f"🚗 Марка: {_text(pass_match.car_brand)}\n"
+            f"🚙 Модель: {_text(pass_match.car_model)}\n"
+            f"🔢 Номер: {_text(pass_match.car_number)}\n"
+            f"👤 Владелец: {_text(pass_match.car_owner)}\n"
+            f"📝 Комментарий для СБ: {_text(pass_match.security_comment or 'нет')}"
+        )
+
+    if pass_match.kind == 'staff_permanent':
+        return (
+            "🔰 <b>Постоянный пропуск представителя УК</b>\n\n"
+            f"🚗 Марка: {_text(pass_match.car_brand)}\n"
+            f"🚙 Модель: {_text(pass_match.car_model)}\n"
+            f"🔢 Номер: {_text(pass_match.car_number)}\n"
+            f"🏠 Место назначения: {_text(pass_match.destination)}\n"
+            f"👤 Владелец: {_text(pass_match.car_owner)}\n"
+            f"📝 Комментарий для СБ: {_text(pass_match.security_comment or 'нет')}"
+        )
+
+    if pass_match.kind == 'resident_temporary':
+        owner_text = (
+            "⏳ <b>Временный пропуск резидента</b>\n\n"
+            f"👤 ФИО резидента: {_text(pass_match.fio)}\n"
+            f"🏠 Номер участка: {_text(pass_match.plot_number)}\n"
+        )
+    elif pass_match.kind == 'contractor_temporary':
+        owner_text = (
+            "⏳ <b>Временный пропуск подрядчика</b>\n\n"
+            f"👷 ФИО подрядчика: {_text(pass_match.fio)}\n"
+            f"🏢 Компания: {_text(pass_match.company)}\n"
+            f"💼 Должность: {_text(pass_match.position)}\n"
+        )
+    else:
+        owner_text = "⏳ <b>Временный пропуск от представителя УК</b>\n\n"
+
+    return (
+        f"{owner_text}"
+        f"🚗 Тип ТС: {'Легковой' if pass_match.vehicle_type == 'car' else 'Грузовой'}\n"
+        f"🔢 Номер: {_text(pass_match.car_number)}\n"
+        f"🚙 Марка: {_text(pass_match.car_brand)}\n"
+        f"📦 Тип груза: {_text(pass_match.cargo_type)}\n"
+        f"🏠 Место назначения: {_text(pass_match.destination)}\n"
+        f"🎯 Цель визита: {_text(pass_match.purpose)}\n"
+        f"📅 Дата визита: {pass_match.visit_date.strftime('%d.%m.%Y')} - "
+        f"{pass_match.valid_until.strftime('%d.%m.%Y')}\n"
+        f"💬 Комментарий владельца: {_text(pass_match.owner_comment or 'нет')}\n"
+        f"📝 Комментарий для СБ: {_text(pass_match.security_comment or 'нет')}"
+    )
+
+
+async def render_cards(passes: list[PassMatch]) -> list[str]:
+    """Тексты карточек пропусков, не блокируя event loop на больших списках"""
+    cards = []
+    for start in range(0, len(passes), RENDER_CHUNK_SIZE):
+        if start:
+            await asyncio.sleep(0)
+        cards.extend(format_pass_card(pass_match) for pass_match in passes[start:start + RENDER_CHUNK_SIZE])
+    return cards
+
+
+def _text_length(text: str) -> int:
+    """Длина текста так, как ее считает Telegram - в кодовых единицах UTF-16"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _split_long(text: str, limit: int) -> list[str]:
+    """Режет слишком длинную карточку по строкам (строку длиннее лимита - по символам)"""
+    parts = []
+    for line in text.split('\n'):
+        while _text_length(line) > limit:
+            cut = limit // 2
+            # Не разрываем экранированный символ (&amp;, &lt;, &gt;)
+            entity = line.rfind('&', cut - 4, cut)
+            if entity != -1 and ';' not in line[entity:cut]:
+                cut = entity
+            parts.append(line[:cut])
+            line = line[cut:]
+        parts.append(line)
+    return pack_cards(parts, limit, separator='\n')
+
+
+def pack_cards(cards: list[str], limit: int = MESSAGE_LIMIT, separator: str = CARD_SEPARATOR) -> list[str]:
+    """Собирает карточки в как можно меньшее число сообщений не длиннее limit, не разрывая карточки"""
+    messages = []
+    current = ''
+    for card in cards:
+        if _text_length(card) > limit:
+            pieces = _split_long(card, limit)
+        else:
+            pieces = [card]
+        for piece in pieces:
+            candidate = f'{current}{separator}{piece}' if current else piece
+            if _text_length(candidate) <= limit:
+                current = candidate
+            else:
+                messages.append(current)
+                current = piece
+    if current:
+        messages.append(current)
+    return messages
+
+
+def cards_document(cards: list[str]) -> bytes:
+    """Карточки одним текстовым файлом - для больших результатов"""
+    return (CARD_SEPARATOR + '-' * 40 + CARD_SEPARATOR).join(
+        html.unescape(_TAG.sub('', card)) for card in cards
+    ).encode('utf-8')
+
+
+@dataclass
+class RenderedResult:
+    """Готовый к отправке результат поиска: сообщения или, для больших результатов, файл"""
+    count: int
+    messages: list[str]
+    document: Optional[bytes] = None
+
+    @property
+    def summary(self) -> str:
+        return f"🔍 Поиск осуществлен, найдено пропусков: {self.count}"
+
+
+async def render_result(passes: list[PassMatch], title: Optional[str] = None) -> RenderedResult:
+    """title - текст перед карточками"""
+    cards = await render_cards(passes)
+    result = RenderedResult(len(cards), [])
+    if title:
+        cards.insert(0, title)
+    messages = pack_cards(cards + [result.summary])
+    if len(messages) <= MAX_RESULT_MESSAGES:
+        result.messages = messages
+    else:
+        result.document = cards_document(cards)
+    return result
+
+
+async def send_result(message: Message, result: RenderedResult, not_found_text: str,
+                      reply_markup: Optional[InlineKeyboardMarkup] = None):
+    """
+    Отправляет результат поиска: карточки, собранные в несколько сообщений, а итог и клавиатура -
+    в последнем из них. Большие результаты отправляются одним файлом.
+    """
+    if not result.count:
+        await message.answer(not_found_text, reply_markup=reply_markup)
+        return
+
+    if result.document is None:
+        for number, text in enumerate(result.messages, 1):
+            await message.answer(text, parse_mode="HTML",
+                                 reply_markup=reply_markup if number == len(result.messages) else None)
+        return
+
+    await message.answer_document(
+        document=BufferedInputFile(result.document, filename="Пропуска.txt"),
+        caption=f"{result.summary}\nСписок слишком большой для сообщений, он во вложении.",
+        reply_markup=reply_markup
+    )
+
+
+async def answer_passes(message: Message, passes: list[PassMatch], not_found_text: str,
+                        reply_markup: Optional[InlineKeyboardMarkup] = None, title: Optional[str] = None):
+    """Форматирует и отправляет результат поиска (см. send_result)"""
+    await send_result(message, await render_result(passes, title), not_found_text, reply_markup)
+
+
+def similar_plates_title(candidates: list[tuple[int, PassMatch]]) -> str:
+    """Заголовок результата нечеткого поиска: похожие номера и число отличий"""
+    plates = {}
+    for distance, pass_match in candidates:
+        plates.setdefault(pass_match.car_number, distance)
+    listed = ', '.join(f'{_text(car_number)} ({distance})' for car_number, distance in plates.items())
+    return f"⚠️ Точных совпадений нет. Похожие номера (в скобках - число отличий): {listed}"
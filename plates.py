@@ -0,0 +1,39 @@
+import re
+from typing import Optional
+
+# Латинские буквы, которые на номерах выглядят так же, как кириллические
+HOMOGLYPHS = str.maketrans('ABEKMHOPCTYX', 'АВЕКМНОРСТУХ')
+
+PLATE_LETTERS = 'АВЕКМНОРСТУХ'
+
+# Форматы российских номеров: основная часть и код региона
+PLATE_FORMATS = [
+    re.compile(rf'^([{PLATE_LETTERS}]\d{{3}}[{PLATE_LETTERS}]{{2}})(\d{{2,3}})$'),  # А123ВС77 - легковые
+    re.compile(rf'^([{PLATE_LETTERS}]{{2}}\d{{3}})(\d{{2,3}})$'),  # АВ12377 - такси
+    re.compile(rf'^([{PLATE_LETTERS}]{{2}}\d{{4}})(\d{{2,3}})$'),  # АВ123477 - прицепы
+    re.compile(rf'^(\d{{4}}[{PLATE_LETTERS}]{{2}})(\d{{2,3}})$'),  # 1234АВ77 - мотоциклы
+]
+
+
+def normalize_plate(car_number: str) -> str:
+    """
+    Приводит номер машины к каноническому виду: верхний регистр, без пробелов и дефисов,
+    латинские буквы-двойники заменены кириллическими, суффикс RUS отброшен.
+    """
+    plate = re.sub(r'[\s\-]', '', car_number).upper()
+    if plate.endswith('RUS'):
+        plate = plate[:-3]
+    return plate.translate(HOMOGLYPHS)
+
+
+def split_plate(car_number: str) -> tuple[str, Optional[str]]:
+    """
+    Возвращает ключ номера (канонический номер без региона) и код региона.
+    Если номер не похож на российский, регион не выделяется.
+    """
+    plate = normalize_plate(car_number)
+    for plate_format in PLATE_FORMATS:
+        match = plate_format.match(plate)
+        if match:
+            return match.group(1), match.group(2)
+    return plate, None
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from db.pass_index import index_version, valid_passes
+from db.pass_lookup import TEMPORARY_KINDS
+from pass_cards import RenderedResult, render_result
+
+
+# Кэш списка действующих временных пропусков (кнопка "📋 Все временные пропуска").
+# Список берется из индекса пропусков (db/pass_index.py) и хранится уже отформатированным в сообщения.
+# Индекс меняет версию при каждом коммите, затрагивающем пропуска (refresh_plates), и при смене суток,
+# поэтому повторные просмотры без изменений отдаются из памяти, а после изменения список
+# перестраивается при первом следующем просмотре.
+
+
+@dataclass
+class RosterStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+stats = RosterStats()
+_version: Optional[tuple] = None
+_result: Optional[RenderedResult] = None
+_lock = asyncio.Lock()
+
+
+async def get_temp_pass_roster() -> RenderedResult:
+    """Отформатированный список действующих временных пропусков"""
+    global _version, _result
+    if _result is not None and _version == await index_version():
+        stats.hits += 1
+        return _result
+
+    # Одновременные просмотры при пересменке перестраивают список один раз
+    async with _lock:
+        if _result is not None and _version == await index_version():
+            stats.hits += 1
+            return _result
+        stats.misses += 1
+        version, passes = await valid_passes(TEMPORARY_KINDS)
+        _result = await render_result(passes)
+        _version = version
+        logging.info(f'Список временных пропусков перестроен: {_result.count} пропусков '
+                     f'(попаданий {stats.hits}, промахов {stats.misses})')
+        return _result
@@ -0,0 +1,41 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Router
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import TelegramObject
+
+from db.roles import resolve_roles
+
+
+# Разбор обновлений по ролям.
+# RoleMiddleware один раз на обновление определяет роли отправителя и кладет их в data['roles'],
+# RoleRouter пропускает в свои роутеры только пользователей своей роли. Поэтому обновление резидента
+# не проверяется фильтрами админских роутеров, а стоимость разбора не зависит от числа роутеров.
+
+
+class RoleMiddleware(BaseMiddleware):
+    """Внешний middleware обновлений: роли отправителя по реестру ролей, без запросов к БД"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get('event_from_user')
+        data['roles'] = resolve_roles(user.id) if user else frozenset()
+        return await handler(event, data)
+
+
+class RoleRouter(Router):
+    """Роутер раздела одной роли: события пользователей без этой роли сразу возвращаются как необработанные"""
+
+    def __init__(self, role: str, *routers: Router):
+        super().__init__(name=role)
+        self.role = role
+        self.include_routers(*routers)
+
+    async def propagate_event(self, update_type: str, event: TelegramObject, **kwargs: Any) -> Any:
+        if self.role not in kwargs.get('roles', ()):
+            return UNHANDLED
+        return await super().propagate_event(update_type, event, **kwargs)
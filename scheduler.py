@@ -0,0 +1,104 @@
+import asyncio
+import datetime
+import logging
+from typing import Awaitable, Callable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import ReadSessionLocal, DeferredJob
+from db.writer import submit_write
+
+# Как часто воркер проверяет таблицу отложенных задач (секунды)
+POLL_INTERVAL = 10
+# Сколько готовых задач забирается за один проход
+BATCH_SIZE = 50
+# После стольких неудачных попыток задача помечается failed
+MAX_ATTEMPTS = 5
+# Пауза перед повтором упавшей задачи (секунды), растет с каждой попыткой
+RETRY_DELAY = 60
+
+# kind -> корутина, выполняющая задачу для object_id
+JOB_HANDLERS: dict[str, Callable[[int], Awaitable[None]]] = {}
+
+
+def job_handler(kind: str):
+    """Регистрирует обработчик отложенных задач указанного вида"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def schedule_job(session: AsyncSession, kind: str, object_id: int, run_at: datetime.datetime) -> DeferredJob:
+    """
+    Добавляет задачу в сессию вызывающего кода: задача сохраняется тем же коммитом,
+    что и объект, для которого она создана.
+    """
+    deferred_job = DeferredJob(kind=kind, object_id=object_id, run_at=run_at)
+    session.add(deferred_job)
+    return deferred_job
+
+
+async def _due_jobs() -> list[DeferredJob]:
+    async with ReadSessionLocal() as session:
+        result = await session.execute(
+            select(DeferredJob)
+            .where(DeferredJob.status == 'pending', DeferredJob.run_at <= datetime.datetime.now())
+            .order_by(DeferredJob.run_at)
+            .limit(BATCH_SIZE)
+        )
+        return list(result.scalars().all())
+
+
+async def _finish_job(job_id: int, error: Exception = None):
+    async def finish(session):
+        deferred_job = await session.get(DeferredJob, job_id)
+        deferred_job.attempts += 1
+        if error is None:
+            deferred_job.status = 'done'
+            deferred_job.finished_at = datetime.datetime.now()
+        else:
+            deferred_job.last_error = str(error)
+            if deferred_job.attempts >= MAX_ATTEMPTS:
+                deferred_job.status = 'failed'
+                deferred_job.finished_at = datetime.datetime.now()
+            else:
+                deferred_job.run_at = datetime.datetime.now() + datetime.timedelta(
+                    seconds=RETRY_DELAY * deferred_job.attempts
+                )
+
+    await submit_write(finish)
+
+
+async def run_due_jobs() -> int:
+    """Выполняет все задачи, время которых наступило. Возвращает число обработанных задач."""
+    due_jobs = await _due_jobs()
+    for deferred_job in due_jobs:
+        handler = JOB_HANDLERS.get(deferred_job.kind)
+        try:
+            if handler is None:
+                raise LookupError(f'Нет обработчика для задачи {deferred_job.kind}')
+            await handler(deferred_job.object_id)
+        except Exception as e:
+            logging.error(f'Отложенная задача {deferred_job.id} ({deferred_job.kind}) упала: {e}')
+            await _finish_job(deferred_job.id, e)
+        else:
+            await _finish_job(deferred_job.id)
+    return len(due_jobs)
+
+
+async def run_scheduler():
+    """
+    Фоновая задача: выполняет отложенные задачи из БД.
+    Задачи хранятся в таблице deferred_job, поэтому переживают перезапуск бота.
+    """
+    while True:
+        try:
+            processed = await run_due_jobs()
+        except Exception as e:
+            logging.error(f'Ошибка планировщика отложенных задач: {e}')
+            processed = 0
+        # Если забрали полную пачку, сразу проверяем следующую
+        if processed < BATCH_SIZE:
+            await asyncio.sleep(POLL_INTERVAL)
@@ -0,0 +1,207 @@
+import argparse
+import datetime
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Iterable, Optional
+
+from plates import split_plate
+
+
+# Снимок действующих пропусков для работы КПП без бота и без БД.
+# Бинарный файл, который открывается через mmap за O(1) и ищется двоичным поиском по ключу номера.
+# Модуль не импортирует SQLAlchemy и БД: снимок пишет бот (db/pass_snapshot.py), а читать его
+# можно этим же файлом из командной строки:
+#
+#   python snapshot.py А123ВС77
+#   python snapshot.py А123ВС --file /mnt/backup/passes.snapshot
+#
+# Формат (little-endian):
+#   заголовок    HEADER: сигнатура, версия формата, размер ключа, число записей, длина списка полей,
+#                время создания (unix), дата, на которую действуют пропуска (ordinal);
+#   поля         имена полей записи через \x1f;
+#   индекс       count записей ENTRY: ключ номера (UTF-8, дополнен нулями или обрезан до KEY_SIZE),
+#                смещение и длина записи; отсортирован по ключу;
+#   данные       записи: значения полей через \x1f, \x00 - отсутствующее значение.
+
+MAGIC = b'BPSNAP\x00\x00'
+FORMAT_VERSION = 1
+KEY_SIZE = 24
+HEADER = struct.Struct('<8sHHIIqI')
+ENTRY = struct.Struct(f'<{KEY_SIZE}sII')
+SEPARATOR = '\x1f'
+NONE = '\x00'
+
+# Поля записи - поля PassMatch (db/pass_lookup.py)
+FIELDS = (
+    'kind', 'id', 'car_number', 'plate_key', 'plate_region', 'car_brand', 'car_model', 'car_owner',
+    'vehicle_type', 'cargo_type', 'purpose', 'destination', 'visit_date', 'valid_until',
+    'owner_comment', 'security_comment', 'fio', 'plot_number', 'company', 'position',
+)
+INT_FIELDS = {'id'}
+DATE_FIELDS = {'visit_date', 'valid_until'}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _key_bytes(plate_key: str) -> bytes:
+    return plate_key.encode('utf-8')[:KEY_SIZE].ljust(KEY_SIZE, b'\x00')
+
+
+def _encode_value(value) -> str:
+    if value is None:
+        return NONE
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value).replace(SEPARATOR, ' ')
+
+
+def write_snapshot(path: str, passes: Iterable, built_for: datetime.date):
+    """
+    Записывает снимок пропусков (объекты с атрибутами FIELDS) атомарно:
+    во временный файл рядом, затем os.replace. Открытые читатели продолжают видеть старый файл.
+    """
+    records = []
+    for pass_match in passes:
+        if not pass_match.plate_key:
+            continue
+        record = SEPARATOR.join(_encode_value(getattr(pass_match, field)) for field in FIELDS).encode('utf-8')
+        records.append((_key_bytes(pass_match.plate_key), record))
+    records.sort(key=lambda item: item[0])
+
+    fields = SEPARATOR.join(FIELDS).encode('utf-8')
+    data_start = HEADER.size + len(fields) + ENTRY.size * len(records)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, KEY_SIZE, len(records), len(fields),
+                               int(time.time()), built_for.toordinal()))
+        file.write(fields)
+        offset = data_start
+        for key, record in records:
+            file.write(ENTRY.pack(key, offset, len(record)))
+            offset += len(record)
+        for _, record in records:
+            file.write(record)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """Снимок, открытый через mmap. Открытие не читает записи, поиск - двоичный по индексу."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise SnapshotError(f'{path}: файл снимка поврежден')
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, key_size, self.count, fields_length, generated_at, built_for = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != FORMAT_VERSION or key_size != KEY_SIZE:
+            self._mm.close()
+            raise SnapshotError(f'{path}: неизвестный формат снимка')
+        self.path = path
+        self.generated_at = datetime.datetime.fromtimestamp(generated_at)
+        self.built_for = datetime.date.fromordinal(built_for)
+        self.fields = self._mm[HEADER.size:HEADER.size + fields_length].decode('utf-8').split(SEPARATOR)
+        self._index_start = HEADER.size + fields_length
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self._mm.close()
+
+    def _key_at(self, position: int) -> bytes:
+        start = self._index_start + position * ENTRY.size
+        return self._mm[start:start + KEY_SIZE]
+
+    def _decode(self, position: int) -> dict:
+        _, offset, length = ENTRY.unpack_from(self._mm, self._index_start + position * ENTRY.size)
+        values = self._mm[offset:offset + length].decode('utf-8').split(SEPARATOR)
+        record = {}
+        for field, value in zip(self.fields, values):
+            if value == NONE:
+                value = None
+            elif field in INT_FIELDS:
+                value = int(value)
+            elif field in DATE_FIELDS:
+                value = datetime.date.fromisoformat(value)
+            record[field] = value
+        return record
+
+    def lookup(self, car_number: str) -> list[dict]:
+        """Пропуска на номер: словари полей FIELDS. Если регион не указан, подходят номера с любым регионом."""
+        plate_key, plate_region = split_plate(car_number)
+        key = _key_bytes(plate_key)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        found = []
+        while low < self.count and self._key_at(low) == key:
+            record = self._decode(low)
+            low += 1
+            # Ключ в индексе мог быть обрезан - сверяем полный
+            if record['plate_key'] != plate_key:
+                continue
+            if plate_region is None or record['plate_region'] == plate_region:
+                found.append(record)
+        return found
+
+
+def open_snapshot(path: str) -> Optional[Snapshot]:
+    """Снимок или None, если файла нет"""
+    try:
+        return Snapshot(path)
+    except FileNotFoundError:
+        return None
+
+
+def _print_record(record: dict):
+    period = ''
+    if record['visit_date']:
+        period = f", {record['visit_date']:%d.%m.%Y} - {record['valid_until']:%d.%m.%Y}"
+    owner = record['fio'] or record['company'] or record['car_owner'] or ''
+    print(f"{record['car_number']}  {record['kind']}  {owner}{period}  назначение: {record['destination'] or '-'}")
+    if record['security_comment']:
+        print(f"    комментарий для СБ: {record['security_comment']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Поиск пропуска по снимку без бота и без БД')
+    parser.add_argument('car_number', nargs='+', help='номер машины (регион можно не указывать)')
+    parser.add_argument('--file', default=os.environ.get('SNAPSHOT_PATH', 'db/passes.snapshot'),
+                        help='файл снимка')
+    args = parser.parse_args()
+
+    snapshot = open_snapshot(args.file)
+    if snapshot is None:
+        print(f'Файл снимка {args.file} не найден')
+        sys.exit(2)
+    print(f'Снимок от {snapshot.generated_at:%d.%m.%Y %H:%M:%S}, пропуска на {snapshot.built_for:%d.%m.%Y}, '
+          f'записей: {len(snapshot)}')
+    if snapshot.built_for != datetime.date.today():
+        print('⚠️ Снимок построен не на сегодня, срок действия пропусков проверяйте по датам')
+
+    car_number = ''.join(args.car_number)
+    started = time.perf_counter()
+    records = snapshot.lookup(car_number)
+    elapsed = (time.perf_counter() - started) * 1e6
+    for record in records:
+        _print_record(record)
+    if not records:
+        print('❌ Совпадений не найдено')
+    print(f'Поиск: {elapsed:.0f} мкс')
+    sys.exit(0 if records else 1)
+
+
+if __name__ == '__main__':
+    main()
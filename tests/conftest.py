@@ -0,0 +1,6 @@
+import os
+
+# config.py читает настройки из окружения при импорте
+for name, value in {'PAGE_SIZE': '5', 'ADMIN_IDS': '1', 'MAX_TRUCK_PASSES': '2', 'MAX_CAR_PASSES': '3',
+                    'PASS_TIME': '2', 'FUTURE_LIMIT': '7', 'RAZRAB': '1'}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,139 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from config import PASS_TIME
+from db import migrations
+from db.models import Base
+
+
+# Схема БД до первой миграции (user_version = 0), как ее создавал create_all исходной версии бота
+BASELINE_SCHEMA = [
+    '''CREATE TABLE user (
+        id BIGINT NOT NULL, username VARCHAR, first_name VARCHAR, last_name VARCHAR, time_start DATETIME,
+        is_active BOOLEAN NOT NULL, PRIMARY KEY (id))''',
+    *(f'''CREATE TABLE {table} (
+        id INTEGER NOT NULL, start_key VARCHAR(20), phone VARCHAR(20), fio VARCHAR, tg_id BIGINT,
+        username VARCHAR, first_name VARCHAR, last_name VARCHAR, time_add_to_db DATETIME NOT NULL,
+        time_registration DATETIME, status BOOLEAN NOT NULL, PRIMARY KEY (id))''' for table in ('manager', 'security')),
+    '''CREATE TABLE resident (
+        id INTEGER NOT NULL, start_key VARCHAR(20), phone VARCHAR(20), fio VARCHAR, plot_number VARCHAR,
+        tg_id BIGINT, username VARCHAR, first_name VARCHAR, last_name VARCHAR, time_add_to_db DATETIME NOT NULL,
+        time_registration DATETIME, status BOOLEAN NOT NULL, PRIMARY KEY (id))''',
+    '''CREATE TABLE contractor (
+        id INTEGER NOT NULL, start_key VARCHAR(20), phone VARCHAR(20), work_types VARCHAR, company VARCHAR,
+        position VARCHAR, fio VARCHAR, affiliation VARCHAR, tg_id BIGINT, username VARCHAR, first_name VARCHAR,
+        last_name VARCHAR, time_add_to_db DATETIME NOT NULL, time_registration DATETIME, status BOOLEAN NOT NULL,
+        can_add_contractor BOOLEAN NOT NULL, PRIMARY KEY (id))''',
+    '''CREATE TABLE registration_request (
+        id INTEGER NOT NULL, resident_id INTEGER NOT NULL, fio VARCHAR, plot_number VARCHAR, photo_id VARCHAR,
+        tg_id BIGINT, username VARCHAR, first_name VARCHAR, last_name VARCHAR, status VARCHAR NOT NULL,
+        admin_comment VARCHAR, created_at DATETIME NOT NULL, PRIMARY KEY (id),
+        FOREIGN KEY(resident_id) REFERENCES resident (id))''',
+    '''CREATE TABLE contractor_registration_request (
+        id INTEGER NOT NULL, company VARCHAR, position VARCHAR, contractor_id INTEGER, fio VARCHAR,
+        affiliation VARCHAR NOT NULL, tg_id BIGINT, username VARCHAR, first_name VARCHAR, last_name VARCHAR,
+        status VARCHAR NOT NULL, admin_comment VARCHAR, created_at DATETIME NOT NULL, PRIMARY KEY (id),
+        FOREIGN KEY(contractor_id) REFERENCES contractor (id))''',
+    '''CREATE TABLE resident_contractor_request (
+        id INTEGER NOT NULL, resident_id INTEGER NOT NULL, phone VARCHAR(20) NOT NULL, work_types VARCHAR,
+        status VARCHAR NOT NULL, admin_comment VARCHAR, created_at DATETIME NOT NULL, PRIMARY KEY (id),
+        FOREIGN KEY(resident_id) REFERENCES resident (id))''',
+    '''CREATE TABLE contractor_contractor_request (
+        id INTEGER NOT NULL, contractor_id INTEGER NOT NULL, phone VARCHAR(20) NOT NULL, work_types VARCHAR,
+        status VARCHAR NOT NULL, admin_comment VARCHAR, created_at DATETIME NOT NULL, PRIMARY KEY (id),
+        FOREIGN KEY(contractor_id) REFERENCES contractor (id))''',
+    '''CREATE TABLE permanent_pass (
+        id INTEGER NOT NULL, resident_id INTEGER, car_brand VARCHAR, car_model VARCHAR, car_number VARCHAR,
+        car_owner VARCHAR, status VARCHAR NOT NULL, resident_comment VARCHAR, security_comment VARCHAR,
+        destination VARCHAR, created_at DATETIME NOT NULL, time_registration DATETIME, PRIMARY KEY (id),
+        FOREIGN KEY(resident_id) REFERENCES resident (id))''',
+    '''CREATE TABLE temporary_pass (
+        id INTEGER NOT NULL, owner_type VARCHAR(20) NOT NULL, resident_id INTEGER, contractor_id INTEGER,
+        vehicle_type VARCHAR(20) NOT NULL, weight_category VARCHAR(20), length_category VARCHAR(20),
+        car_number VARCHAR(20) NOT NULL, car_brand VARCHAR(50) NOT NULL, cargo_type VARCHAR(100),
+        purpose VARCHAR(100) NOT NULL, visit_date DATE NOT NULL, owner_comment VARCHAR, resident_comment VARCHAR,
+        security_comment VARCHAR, status VARCHAR NOT NULL, destination VARCHAR, created_at DATETIME NOT NULL,
+        time_registration DATETIME, PRIMARY KEY (id), FOREIGN KEY(resident_id) REFERENCES resident (id),
+        FOREIGN KEY(contractor_id) REFERENCES contractor (id))''',
+    '''CREATE TABLE appeal (
+        id INTEGER NOT NULL, request_text VARCHAR NOT NULL, response_text VARCHAR, resident_id INTEGER NOT NULL,
+        responser_id BIGINT, created_at DATETIME NOT NULL, responsed_at DATETIME, status BOOLEAN NOT NULL,
+        PRIMARY KEY (id), FOREIGN KEY(resident_id) REFERENCES resident (id),
+        FOREIGN KEY(responser_id) REFERENCES user (id))''',
+]
+
+VISIT_DATE = datetime.date(2025, 6, 1)
+
+
+@pytest.fixture
+def baseline_engine(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "database.db"}')
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text(
+            "INSERT INTO permanent_pass (id, car_number, status, created_at) "
+            "VALUES (1, 'a123bc 77', 'approved', '2025-05-01 10:00:00')"
+        ))
+        conn.execute(text(
+            "INSERT INTO temporary_pass (id, owner_type, vehicle_type, car_number, car_brand, purpose, visit_date, "
+            "status, created_at) VALUES (1, 'resident', 'car', 'В456ОР199', 'Lada', 'Гости', :visit_date, "
+            "'approved', '2025-05-01 10:00:00')"
+        ), {'visit_date': VISIT_DATE.isoformat()})
+    yield engine
+    engine.dispose()
+
+
+def _start_bot(engine):
+    """То же, что create_tables() при старте бота"""
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        migrations.run_migrations(conn)
+
+
+def _columns(conn, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(text(f'PRAGMA table_info({table})'))}
+
+
+def _indexes(conn, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(text(f'PRAGMA index_list({table})'))}
+
+
+@pytest.mark.parametrize('applied', range(len(migrations.MIGRATIONS) + 1))
+def test_upgrade_from_every_version(baseline_engine, monkeypatch, applied):
+    # Предыдущая версия бота знала только первые applied миграций
+    with monkeypatch.context() as patch:
+        patch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS[:applied])
+        with baseline_engine.begin() as conn:
+            migrations.run_migrations(conn)
+
+    _start_bot(baseline_engine)
+
+    with baseline_engine.connect() as conn:
+        assert conn.execute(text('PRAGMA user_version')).scalar() == len(migrations.MIGRATIONS)
+        assert conn.execute(text('SELECT plate_key, plate_region FROM permanent_pass')).one() == ('А123ВС', '77')
+        plate_key, plate_region, valid_until = conn.execute(
+            text('SELECT plate_key, plate_region, valid_until FROM temporary_pass')
+        ).one()
+        assert (plate_key, plate_region) == ('В456ОР', '199')
+        assert valid_until == (VISIT_DATE + datetime.timedelta(days=PASS_TIME)).isoformat()
+
+        assert conn.execute(text('SELECT count(*) FROM temporary_pass WHERE updated_at IS NULL')).scalar() == 0
+
+        # В обновленной БД есть все колонки и индексы, которые объявлены в моделях
+        for table in Base.metadata.sorted_tables:
+            assert {column.name for column in table.columns} <= _columns(conn, table.name)
+            assert {index.name for index in table.indexes} <= _indexes(conn, table.name)
+        assert 'ix_temporary_pass_status_visit_date' not in _indexes(conn, 'temporary_pass')
+        assert conn.execute(text("SELECT count(*) FROM sqlite_master WHERE name = 'sqlite_stat1'")).scalar() == 1
+
+
+def test_restart_does_not_rerun_migrations(baseline_engine):
+    _start_bot(baseline_engine)
+    with baseline_engine.begin() as conn:
+        conn.execute(text("UPDATE temporary_pass SET valid_until = '2030-01-01'"))
+    _start_bot(baseline_engine)
+    with baseline_engine.connect() as conn:
+        assert conn.execute(text('SELECT valid_until FROM temporary_pass')).scalar() == '2030-01-01'
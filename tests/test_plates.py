@@ -0,0 +1,66 @@
+import datetime
+
+import pytest
+
+from db.models import PermanentPass, TemporaryPass
+from plates import normalize_plate, split_plate
+
+
+# (как ввели номер, ключ номера, регион)
+PLATES = [
+    ('А123ВС77', 'А123ВС', '77'),
+    ('A123BC77', 'А123ВС', '77'),  # латиница
+    ('A123ВС77', 'А123ВС', '77'),  # кириллица вперемешку с латиницей
+    ('а123вс77', 'А123ВС', '77'),  # строчные
+    ('a123bc77', 'А123ВС', '77'),
+    ('А 123 ВС 77', 'А123ВС', '77'),
+    ('А123ВС-77', 'А123ВС', '77'),
+    (' а-123-вс 77 ', 'А123ВС', '77'),
+    ('А123ВС77RUS', 'А123ВС', '77'),
+    ('А123ВС 77 rus', 'А123ВС', '77'),
+    ('Х999ХХ199', 'Х999ХХ', '199'),  # трехзначный регион
+    ('x999xx799', 'Х999ХХ', '799'),
+    ('А123ВС', 'А123ВС', None),  # без региона
+    ('a123bc', 'А123ВС', None),
+    ('АВ12377', 'АВ123', '77'),  # такси
+    ('АВ1234 177', 'АВ1234', '177'),  # прицеп
+    ('1234 AB 77', '1234АВ', '77'),  # мотоцикл
+    ('WDB 123', 'WDВ123', None),  # не российский номер: регион не выделяется, буквы-двойники заменяются
+]
+
+
+@pytest.mark.parametrize('car_number, plate_key, plate_region', PLATES)
+def test_split_plate(car_number, plate_key, plate_region):
+    assert split_plate(car_number) == (plate_key, plate_region)
+
+
+@pytest.mark.parametrize('car_number, plate_key, plate_region', PLATES)
+def test_normalize_plate_is_key_with_region(car_number, plate_key, plate_region):
+    assert normalize_plate(car_number) == plate_key + (plate_region or '')
+
+
+@pytest.mark.parametrize('first, second', [
+    ('А123ВС77', 'A123BC77'),
+    ('а123вс 77', 'A-123-BC-77'),
+    ('Х999ХХ199', 'x999xx199RUS'),
+])
+def test_same_plate_in_both_scripts(first, second):
+    assert split_plate(first) == split_plate(second)
+
+
+@pytest.mark.parametrize('car_number, plate_key, plate_region', PLATES)
+def test_validators_store_split_plate(car_number, plate_key, plate_region):
+    permanent_pass = PermanentPass(car_number=car_number)
+    temporary_pass = TemporaryPass(car_number=car_number, visit_date=datetime.date(2025, 6, 1))
+    for pass_request in (permanent_pass, temporary_pass):
+        assert (pass_request.plate_key, pass_request.plate_region) == (plate_key, plate_region)
+        # Исходный ввод хранится как есть, для показа
+        assert pass_request.car_number == car_number
+
+
+def test_validators_follow_number_change():
+    temporary_pass = TemporaryPass(car_number='A123BC77')
+    temporary_pass.car_number = 'Х999ХХ199'
+    assert (temporary_pass.plate_key, temporary_pass.plate_region) == ('Х999ХХ', '199')
+    temporary_pass.car_number = None
+    assert (temporary_pass.plate_key, temporary_pass.plate_region) == (None, None)
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import tempfile
+from typing import Callable, Optional
+
+from openpyxl import Workbook
+from sqlalchemy import select, literal
+
+from db.models import ReadSessionLocal, Resident, Contractor, PermanentPass, TemporaryPass, read_engine
+from executor import run_in_process
+
+
+# Отчет собирается потоково: строки читаются из БД пачками в виде кортежей
+# и сразу дописываются в write-only книгу, поэтому память не растет вместе с БД.
+# Вся сборка выполняется в пуле процессов (executor.py) и не занимает GIL процесса бота.
+EXPORT_BATCH_SIZE = 1000
+
+
+def _user_status(status) -> str:
+    return "Активен" if status else "Неактивен"
+
+
+def _resident_row(row) -> tuple:
+    return (*row[:5], _user_status(row[5]))
+
+
+def _contractor_row(row) -> tuple:
+    return (*row[:6], _user_status(row[6]))
+
+
+def _temporary_row(owner_type: str) -> Callable:
+    def convert(row) -> tuple:
+        *head, visit_date, status = row
+        return (head[0], owner_type, *head[1:], visit_date.strftime("%Y-%m-%d"), status)
+    return convert
+
+
+def _temporary_columns(*owner_columns) -> list:
+    return [
+        TemporaryPass.id, *owner_columns,
+        TemporaryPass.vehicle_type, TemporaryPass.weight_category, TemporaryPass.length_category,
+        TemporaryPass.car_number, TemporaryPass.car_brand, TemporaryPass.cargo_type, TemporaryPass.purpose,
+        TemporaryPass.visit_date, TemporaryPass.status
+    ]
+
+
+# (лист, заголовки, [(запрос, преобразование строки), ...])
+STATISTICS_SHEETS = [
+    (
+        "Резиденты",
+        ["ID", "Телефон", "ФИО", "Участок", "TG ID", "Статус"],
+        [(
+            select(Resident.id, Resident.phone, Resident.fio, Resident.plot_number, Resident.tg_id, Resident.status),
+            _resident_row
+        )]
+    ),
+    (
+        "Подрядчики",
+        ["ID", "Телефон", "ФИО", "Компания", "Должность", "TG ID", "Статус"],
+        [(
+            select(Contractor.id, Contractor.phone, Contractor.fio, Contractor.company, Contractor.position,
+                   Contractor.tg_id, Contractor.status),
+            _contractor_row
+        )]
+    ),
+    (
+        "Постоянные пропуска",
+        ["ID", "Резидент ID", "ФИО резидента", "Участок", "Марка", "Модель", "Номер", "Владелец", "Статус"],
+        [(
+            select(PermanentPass.id, PermanentPass.resident_id, Resident.fio, Resident.plot_number,
+                   PermanentPass.car_brand, PermanentPass.car_model, PermanentPass.car_number,
+                   PermanentPass.car_owner, PermanentPass.status)
+            .join(Resident, PermanentPass.resident_id == Resident.id),
+            None
+        )]
+    ),
+    (
+        "Временные пропуска",
+        ["ID", "Тип владельца", "ФИО", "Участок/Компания", "Должность", "Тип ТС", "Категория веса",
+         "Категория длины", "Номер авто", "Марка", "Груз", "Цель", "Дата визита", "Статус"],
+        [
+            (
+                select(*_temporary_columns(Resident.fio, Resident.plot_number, literal("")))
+                .select_from(TemporaryPass)
+                .join(Resident, TemporaryPass.resident_id == Resident.id)
+                .where(TemporaryPass.owner_type == "resident"),
+                _temporary_row("Резидент")
+            ),
+            (
+                select(*_temporary_columns(Contractor.fio, Contractor.company, Contractor.position))
+                .select_from(TemporaryPass)
+                .join(Contractor, TemporaryPass.contractor_id == Contractor.id)
+                .where(TemporaryPass.owner_type == "contractor"),
+                _temporary_row("Подрядчик")
+            ),
+        ]
+    ),
+]
+
+
+def _append_rows(ws, rows, convert: Optional[Callable]):
+    for row in rows:
+        ws.append(convert(row) if convert else tuple(row))
+
+
+async def _write_xlsx(path: str, sheets: list):
+    wb = Workbook(write_only=True)
+    async with ReadSessionLocal() as session:
+        for title, headers, queries in sheets:
+            ws = wb.create_sheet(title)
+            ws.append(headers)
+            for query, convert in queries:
+                result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+                async for rows in result.partitions():
+                    _append_rows(ws, rows, convert)
+    wb.save(path)
+
+
+def _build_statistics_file(path: str):
+    """Выполняется в процессе пула: свой event loop и свои соединения с БД"""
+    async def build():
+        try:
+            await _write_xlsx(path, STATISTICS_SHEETS)
+        finally:
+            await read_engine.dispose()
+
+    asyncio.run(build())
+
+
+async def build_statistics_xlsx() -> str:
+    """
+    Формирует отчет по резидентам, подрядчикам и пропускам во временный файл.
+    Возвращает путь к файлу, удалить его должен вызывающий код.
+    """
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        await run_in_process(_build_statistics_file, path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path